@@ -0,0 +1,62 @@
+"""Memory benchmark of the parsed intermediate representation, comparing
+the `MachineTemplate` dictionaries with `CompactMachineTemplate`.
+
+A synthetic Uppaal model with a single large agent, see
+`synthetic_model.py`, is parsed both ways, and the memory retained by the
+result is measured with tracemalloc.
+
+Run from the repository root:
+
+    python benchmarks/bench_compact_ir.py [transitions]
+"""
+import gc
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter  # noqa: E402
+from synthetic_model import synthetic_model  # noqa: E402
+
+EDGES_PER_STATE = 4
+
+
+def retained_memory(xml_file, compact):
+    gc.collect()
+    tracemalloc.start()
+    result = UppaalAdapter.get_xml_data(xml_file, compact=compact)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return retained
+
+
+def main():
+    transitions = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        xml_file = Path(temp_dir, "synthetic.xml")
+        xml_file.write_text(
+            synthetic_model(
+                locations=max(transitions // EDGES_PER_STATE, 8),
+                edges=transitions,
+                guard_terms=2,
+            ),
+        )
+        # warm the label and name caches, so both runs measure the IR only
+        UppaalAdapter.get_xml_data(xml_file)
+        dict_memory = retained_memory(xml_file, compact=False)
+        compact_memory = retained_memory(xml_file, compact=True)
+
+    print(f"transitions: {transitions}")
+    print(f"dict IR:    {dict_memory / 2**20:8.2f} MiB")
+    print(f"compact IR: {compact_memory / 2**20:8.2f} MiB")
+    print(f"savings:    {1 - compact_memory / dict_memory:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Benchmark of the generated code dialects, comparing the dependency-free
+`plain` machines with the `pytransitions` ones on a ring of states, where
+every state has a few disabled transitions before the enabled one.
+
+Three costs are measured for each dialect:
+
+- the time to import the generated module, in a fresh interpreter;
+- the memory allocated per machine instance;
+- the transitions fired per second by `next_state`.
+
+Run from the repository root:
+
+    python benchmarks/bench_dialects.py
+    python benchmarks/bench_dialects.py --states 200 --instances 500
+"""
+import argparse
+import gc
+import importlib.util
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from rich.console import Console  # noqa: E402
+from rich.table import Table  # noqa: E402
+
+from cosmic.adapter.entities.machine_template import (  # noqa: E402
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import CodeGenerator  # noqa: E402
+
+DIALECTS = ("pytransitions", "plain")
+AGENT_NAME = "Ring"
+
+
+class RingModel:
+    """Model of the ring machine: `always` enables the next transition,
+    `never` keeps the other ones disabled, and `tick` counts the fired
+    transitions.
+    """
+
+    def __init__(self):
+        self.ticks = 0
+
+    def always(self):
+        return True
+
+    def never(self):
+        return False
+
+    def tick(self):
+        self.ticks += 1
+
+
+def ring_machine(states, disabled):
+    names = [f"s{index}" for index in range(states)]
+    transitions = list()
+    for index, source in enumerate(names):
+        for skip in range(disabled):
+            dest = names[(index + skip + 2) % states]
+            transitions.append(Transition(
+                trigger=f"{source}_to_{dest}",
+                source=source,
+                dest=dest,
+                conditions=["never"],
+            ))
+        dest = names[(index + 1) % states]
+        transitions.append(Transition(
+            trigger=f"{source}_to_{dest}",
+            source=source,
+            dest=dest,
+            conditions=["always"],
+            after=["tick"],
+        ))
+    return MachineTemplate(
+        initial_state=names[0],
+        states=[State(name=name) for name in names],
+        transitions=transitions,
+        declared_functions=["always", "never", "tick"],
+    )
+
+
+def import_module(path):
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def import_time(path, repeat):
+    code = (
+        "import sys, time; sys.path.insert(0, sys.argv[1]); "
+        "start = time.perf_counter(); import ring; "
+        "print(time.perf_counter() - start)"
+    )
+    times = list()
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", code, str(path.parent)],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        times.append(float(output))
+    return min(times)
+
+
+def memory_per_instance(machine_class, instances):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    machines = [machine_class(RingModel()) for _ in range(instances)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in after.compare_to(before, "filename")
+    )
+    del machines
+    return allocated / instances
+
+
+def transitions_per_second(machine_class, steps):
+    model = RingModel()
+    machine = machine_class(model)
+    start = time.perf_counter()
+    for _ in range(steps):
+        machine.next_state()
+    elapsed = time.perf_counter() - start
+    assert model.ticks == steps
+    return steps / elapsed
+
+
+def measure(dialect, data, args, temp_dir):
+    output_dir = Path(temp_dir, dialect)
+    output_dir.mkdir()
+    CodeGenerator(
+        "uppaal",
+        dialect,
+        show_progress=False,
+    ).write_agent(AGENT_NAME, data, output_dir)
+    path = Path(output_dir, "ring.py")
+    machine_class = getattr(import_module(path), AGENT_NAME)
+    return {
+        "import": import_time(path, args.repeat),
+        "memory": memory_per_instance(machine_class, args.instances),
+        "rate": transitions_per_second(machine_class, args.steps),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--states", type=int, default=50)
+    parser.add_argument("--disabled", type=int, default=3)
+    parser.add_argument("--instances", type=int, default=200)
+    parser.add_argument("--steps", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    console = Console()
+    data = ring_machine(args.states, args.disabled)
+    results = dict()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for dialect in DIALECTS:
+            console.log(f"Measuring {dialect}...")
+            results[dialect] = measure(dialect, data, args, temp_dir)
+
+    table = Table(
+        title=(
+            f"COSMIC dialects, {args.states} states with "
+            f"{args.disabled + 1} transitions each"
+        ),
+    )
+    table.add_column("Dialect")
+    table.add_column("Import (ms)", justify="right")
+    table.add_column("Memory per instance (KiB)", justify="right")
+    table.add_column("Transitions/s", justify="right")
+    for dialect, result in results.items():
+        table.add_row(
+            dialect,
+            f"{result['import'] * 1000:.1f}",
+            f"{result['memory'] / 1024:.1f}",
+            f"{result['rate']:,.0f}",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    main()
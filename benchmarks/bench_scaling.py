@@ -0,0 +1,237 @@
+"""Scaling benchmark of the code generation, timing the parse, render and
+write phases separately over synthetic models of growing size, see
+`synthetic_model.py`.
+
+Each repeat of a phase is timed right after a fixed calibration loop,
+and divided by its time, so the results are expressed in calibration
+units and stay comparable across machines of different speeds and
+across load changes during the run. Each phase keeps the median out of
+a few repeats. The results are compared with the recorded baselines,
+and the run fails when the parse or render phase got slower than the
+baseline by more than the tolerance, 50% by default. The write phase
+depends on the disk more than on the processor, which the calibration
+does not account for, so it is reported but never fails the run.
+
+Run from the repository root:
+
+    python benchmarks/bench_scaling.py                  # compare
+    python benchmarks/bench_scaling.py --save-baseline  # record
+    python benchmarks/bench_scaling.py --sizes small medium
+
+The calibration removes most of the difference between machines, but
+not all of it (cache sizes, disk speed for the write phase), so record
+the baselines again when a machine reports unexpected regressions.
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from rich.console import Console  # noqa: E402
+from rich.table import Table  # noqa: E402
+
+from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter  # noqa: E402
+from cosmic.generator.code_generator import CodeGenerator  # noqa: E402
+from cosmic.generator.writer import write_if_changed  # noqa: E402
+from synthetic_model import synthetic_model  # noqa: E402
+
+BASELINE_FILE = Path(__file__).resolve().parent / "baselines.json"
+# the unit of the recorded phases, baselines in another unit are ignored
+UNIT = "calibration"
+CALIBRATION_ITERATIONS = 200_000
+PHASES = ("parse", "render", "write")
+# the phases failing the run when slower than their baseline
+GATED_PHASES = ("parse", "render")
+SIZES = {
+    "small": dict(
+        templates=4, locations=20, edges=60,
+        branchpoints=2, guard_terms=2,
+    ),
+    "medium": dict(
+        templates=16, locations=60, edges=250,
+        branchpoints=8, guard_terms=3,
+    ),
+    "large": dict(
+        templates=32, locations=150, edges=1000,
+        branchpoints=20, guard_terms=4,
+    ),
+    "wide": dict(
+        templates=256, locations=10, edges=30,
+        branchpoints=1, guard_terms=2,
+    ),
+    "deep": dict(
+        templates=1, locations=2000, edges=20000,
+        branchpoints=100, guard_terms=4,
+    ),
+}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def median_of(repeat, function, *args):
+    ratios, result = list(), None
+    for _ in range(repeat):
+        calibration, _ = timed(calibration_loop)
+        elapsed, result = timed(function, *args)
+        ratios.append(elapsed / calibration)
+    return statistics.median(ratios), result
+
+
+def calibration_loop():
+    # string building and dictionary lookups, like the generator itself
+    names = dict()
+    for number in range(CALIBRATION_ITERATIONS):
+        name = f"state_{number % 1000}"
+        names[name] = names.get(name, 0) + len(name)
+    return names
+
+
+def render_all(code_generator, result_dict):
+    return {
+        agent_name: code_generator.render_agent(agent_name, data)
+        for agent_name, data in result_dict.items()
+    }
+
+
+def write_all(output_dir, rendered):
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_dir.mkdir()
+    for files in rendered.values():
+        for file_name, content in files.items():
+            write_if_changed(Path(output_dir, file_name), content)
+
+
+def measure(size, spec, repeat, temp_dir):
+    xml_file = Path(temp_dir, f"{size}.xml")
+    xml_file.write_text(synthetic_model(**spec))
+    code_generator = CodeGenerator(
+        "uppaal",
+        "pytransitions",
+        cache_dir=Path(temp_dir, "cache"),
+        show_progress=False,
+    )
+    parse, result_dict = median_of(
+        repeat, UppaalAdapter.get_xml_data, xml_file, False, 1, True,
+    )
+    render, rendered = median_of(
+        repeat, render_all, code_generator, result_dict,
+    )
+    write, _ = median_of(
+        repeat, write_all, Path(temp_dir, f"{size}_output"), rendered,
+    )
+    return {
+        "transitions": sum(
+            len(data.transitions) for data in result_dict.values()
+        ),
+        "parse": parse,
+        "render": render,
+        "write": write,
+    }
+
+
+def report(results, baselines, tolerance):
+    table = Table(
+        title="COSMIC scaling benchmark",
+        caption="Times in calibration loop units",
+    )
+    table.add_column("Size")
+    table.add_column("Transitions", justify="right")
+    for phase in PHASES:
+        table.add_column(phase, justify="right")
+        table.add_column("vs base", justify="right")
+
+    regressions = list()
+    for size, result in results.items():
+        row = [size, str(result["transitions"])]
+        baseline = baselines.get(size)
+        for phase in PHASES:
+            row.append(f"{result[phase]:.4f}")
+            if baseline is None:
+                row.append("-")
+                continue
+            ratio = result[phase] / baseline[phase]
+            if ratio > 1 + tolerance and phase in GATED_PHASES:
+                regressions.append(f"{size}/{phase}")
+                row.append(f"[red]{ratio:.2f}x[/red]")
+            else:
+                row.append(f"{ratio:.2f}x")
+        table.add_row(*row)
+    return table, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", nargs="+", choices=list(SIZES), default=list(SIZES),
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5,
+        help="allowed slowdown over the baseline, 0.5 means 50%%",
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    console = Console()
+    calibration = statistics.median(
+        timed(calibration_loop)[0] for _ in range(args.repeat)
+    )
+    console.log(f"Calibration loop: {calibration:.4f}s")
+    results = dict()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            console.log(f"Measuring {size}...")
+            results[size] = measure(size, SIZES[size], args.repeat, temp_dir)
+
+    recorded = dict()
+    if args.baseline.exists():
+        recorded = json.loads(args.baseline.read_text())
+    if recorded and recorded.get("unit") != UNIT:
+        console.print(
+            "[yellow]The baselines were recorded in another unit and are "
+            "ignored, record them again.[/yellow]",
+        )
+        recorded = dict()
+    if args.save_baseline:
+        recorded = {
+            "unit": UNIT,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "calibration": calibration,
+            "sizes": dict(recorded.get("sizes", {}), **results),
+        }
+        args.baseline.write_text(json.dumps(recorded, indent=2) + "\n")
+        console.log(f"Baselines saved to {args.baseline}.")
+
+    table, regressions = report(
+        results,
+        recorded.get("sizes", {}),
+        args.tolerance,
+    )
+    console.print(table)
+    if recorded and recorded.get("machine") != platform.platform():
+        console.print(
+            "[yellow]The baselines were recorded on "
+            f"{recorded.get('machine')}.[/yellow]",
+        )
+    if regressions:
+        console.print(f"[red]Regressions: {', '.join(regressions)}[/red]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Micro-benchmark of the identifier normalization in
+`cosmic.utils.string_oper`, replaying every name normalized while parsing
+`tests/mock_files/hcl_teste.xml`.
+
+Run from the repository root:
+
+    python benchmarks/bench_string_oper.py
+"""
+import re
+import sys
+import timeit
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from num2words import num2words  # noqa: E402
+
+from cosmic.adapter.xml.uppaal_expression import (  # noqa: E402
+    compile_guard,
+    compile_updates,
+)
+from cosmic.utils import string_oper  # noqa: E402
+
+FIXTURE = ROOT / "tests" / "mock_files" / "hcl_teste.xml"
+
+
+def legacy_to_snake_case(name):
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+def legacy_generate_function_name(condition):
+    operators_map = {
+        "!=": "neq",
+        "==": "eq",
+        ">": "gt",
+        "<": "lt",
+        ">=": "gte",
+        "<=": "lte",
+        "&&": "and",
+        "||": "or",
+    }
+    if condition.startswith("!"):
+        condition = condition[1:]
+    if condition.endswith("++"):
+        condition = condition.replace("++", "_increment")
+    if condition.endswith("--"):
+        condition = condition.replace("--", "_decrement")
+    components = condition.replace("\n", "").split(" ")
+    components_processed = [None] * len(components)
+    for idx, c in enumerate(components):
+        if c.isnumeric():
+            components_processed[idx] = legacy_to_snake_case(
+                num2words(c).replace(" ", "_").replace("-", "_"),
+            )
+        else:
+            components_processed[idx] = legacy_to_snake_case(
+                operators_map.get(c, c),
+            )
+    return "_".join(components_processed)
+
+
+def collect_workload(xml_file):
+    """Returns the names and expressions normalized by the adapter, in
+    the order and with the repetitions it finds them in the file.
+    """
+    names, expressions = list(), list()
+    root = ET.parse(xml_file).getroot()
+    for template in root.iter("template"):
+        names.append(template.find("name").text)
+        for location in template.iter("location"):
+            names.append(location.find("name").text)
+        for label in template.iter("label"):
+            if label.get("kind") == "guard":
+                conditions, unless = compile_guard(label.text)
+                expressions.extend(conditions + unless)
+            elif label.get("kind") == "assignment":
+                expressions.extend(compile_updates(label.text))
+    return names, expressions
+
+
+def run(names, expressions, snake_case, function_name):
+    for name in names:
+        snake_case(name)
+    for expression in expressions:
+        snake_case(function_name(expression))
+
+
+def clear_caches():
+    string_oper.to_snake_case.cache_clear()
+    string_oper.generate_function_name.cache_clear()
+    string_oper.number_to_words.cache_clear()
+
+
+def main(repeat=2000):
+    names, expressions = collect_workload(FIXTURE)
+
+    def legacy():
+        run(names, expressions, legacy_to_snake_case,
+            legacy_generate_function_name)
+
+    def cold():
+        clear_caches()
+        run(names, expressions, string_oper.to_snake_case,
+            string_oper.generate_function_name)
+
+    def warm():
+        run(names, expressions, string_oper.to_snake_case,
+            string_oper.generate_function_name)
+
+    print(f"{len(names)} names, {len(expressions)} expressions "
+          f"from {FIXTURE.name}, {repeat} runs")
+    legacy_time = min(timeit.repeat(legacy, number=repeat, repeat=3))
+    print(f"{'legacy':<24}{legacy_time * 1e6 / repeat:10.1f} us/run")
+    for label, benchmark in (("cached (cold caches)", cold),
+                             ("cached (warm caches)", warm)):
+        elapsed = min(timeit.repeat(benchmark, number=repeat, repeat=3))
+        print(f"{label:<24}{elapsed * 1e6 / repeat:10.1f} us/run"
+              f"{legacy_time / elapsed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Generator of synthetic Uppaal models, used by the benchmarks to measure
+how cosmic scales with the size of the input.
+
+Every template gets the same shape: a ring of locations, where each edge
+leaves its source towards a different target, so no two edges of a
+template share the same source and target. Branchpoints are entered from
+a location and split into two probabilistic edges.
+
+Run from the repository root to write a model to a file:
+
+    python benchmarks/synthetic_model.py model.xml --templates 8 --edges 200
+"""
+import argparse
+import random
+from pathlib import Path
+from typing import List
+from xml.sax.saxutils import escape
+
+COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+VARIABLES = ("buffer", "count", "level", "timer", "queue")
+FUNCTIONS = ("isReady", "isBusy", "hasItem", "canMove", "isBlocked")
+
+
+def synthetic_guard(rng: random.Random, terms: int) -> str:
+    """Returns a guard with the given amount of terms, mixing comparisons
+    and function calls, some of them negated, joined by `&&` and `||`.
+    """
+    atoms = list()
+    for index in range(terms):
+        if rng.random() < 0.5:
+            atom = (
+                f"{rng.choice(VARIABLES)} {rng.choice(COMPARISONS)} "
+                f"{rng.randrange(10)}"
+            )
+        else:
+            atom = f"{rng.choice(FUNCTIONS)}()"
+            if rng.random() < 0.3:
+                atom = f"!{atom}"
+        if index > 0:
+            atoms.append("&&" if rng.random() < 0.8 else "||")
+        atoms.append(atom)
+    return " ".join(atoms)
+
+
+def synthetic_template(
+    name: str,
+    rng: random.Random,
+    locations: int,
+    edges: int,
+    branchpoints: int,
+    guard_terms: int,
+    state_labels: float,
+) -> List[str]:
+    """Returns the xml lines of a single synthetic template."""
+    if locations < 2:
+        raise ValueError("A template needs at least two locations.")
+    if edges + 2 * branchpoints > locations * (locations - 1):
+        raise ValueError(
+            f"{locations} locations fit at most "
+            f"{locations * (locations - 1)} distinct edges.",
+        )
+
+    lines = [f"<template><name>{name}</name>"]
+    for index in range(locations):
+        lines.append(f'<location id="l{index}"><name>S{index}</name>')
+        if rng.random() < state_labels:
+            lines.append(
+                '<label kind="testcodeEnter">'
+                f"logState(), enterStep{index % 5}()</label>",
+            )
+            lines.append(
+                f'<label kind="testcodeExit">exitStep{index % 5}()</label>',
+            )
+        lines.append("</location>")
+    for index in range(branchpoints):
+        lines.append(f'<branchpoint id="b{index}"/>')
+    lines.append('<init ref="l0"/>')
+
+    # each location leaves towards the next unused offset along the ring,
+    # so no (source, target) pair repeats.
+    next_offset = [1] * locations
+
+    def next_target(source: int) -> int:
+        offset = next_offset[source]
+        next_offset[source] += 1
+        return (source + offset) % locations
+
+    labels = ""
+    for index in range(edges):
+        source = index % locations
+        target = next_target(source)
+        if guard_terms > 0:
+            labels = (
+                '<label kind="guard">'
+                f"{escape(synthetic_guard(rng, guard_terms))}</label>"
+            )
+        lines.append(
+            f'<transition><source ref="l{source}"/>'
+            f'<target ref="l{target}"/>{labels}'
+            '<label kind="assignment">'
+            f"count++, notify{index % 7}()</label></transition>",
+        )
+    for index in range(branchpoints):
+        source = (edges + index) % locations
+        lines.append(
+            f'<transition><source ref="l{source}"/>'
+            f'<target ref="b{index}"/></transition>',
+        )
+        for weight in (9, 1):
+            lines.append(
+                f'<transition><source ref="b{index}"/>'
+                f'<target ref="l{next_target(source)}"/>'
+                f'<label kind="probability">{weight}</label></transition>',
+            )
+    lines.append("</template>")
+    return lines
+
+
+def synthetic_model(
+    templates: int = 1,
+    locations: int = 10,
+    edges: int = 20,
+    branchpoints: int = 0,
+    guard_terms: int = 1,
+    state_labels: float = 0.5,
+    seed: int = 0,
+) -> str:
+    """Returns a synthetic Uppaal model. The same arguments always produce
+    the same model.
+
+    Args:
+        templates (int): The amount of templates. Defaults to 1.
+        locations (int): The locations of each template. Defaults to 10.
+        edges (int): The edges between locations of each template.
+            Defaults to 20.
+        branchpoints (int): The branchpoints of each template, each one
+            adding an incoming edge and two probabilistic edges. Defaults
+            to 0.
+        guard_terms (int): The terms of each edge guard, 0 for edges
+            without guards. Defaults to 1.
+        state_labels (float): The fraction of locations with on-enter and
+            on-exit labels. Defaults to 0.5.
+        seed (int): The random seed. Defaults to 0.
+
+    Raises:
+        ValueError: If the edges do not fit the locations.
+
+    Returns:
+        str: The model xml.
+    """
+    rng = random.Random(seed)
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        "<nta><declaration>int count;</declaration>",
+    ]
+    names = [f"Agent{index}" for index in range(templates)]
+    for name in names:
+        lines.extend(
+            synthetic_template(
+                name,
+                rng,
+                locations,
+                edges,
+                branchpoints,
+                guard_terms,
+                state_labels,
+            ),
+        )
+    processes = ", ".join(f"P{index}" for index in range(templates))
+    lines.append("<system>")
+    lines.extend(f"P{index} = {name}();" for index, name in enumerate(names))
+    lines.append(f"system {processes};</system></nta>")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--templates", type=int, default=1)
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--edges", type=int, default=20)
+    parser.add_argument("--branchpoints", type=int, default=0)
+    parser.add_argument("--guard-terms", type=int, default=1)
+    parser.add_argument("--state-labels", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    args.output.write_text(
+        synthetic_model(
+            templates=args.templates,
+            locations=args.locations,
+            edges=args.edges,
+            branchpoints=args.branchpoints,
+            guard_terms=args.guard_terms,
+            state_labels=args.state_labels,
+            seed=args.seed,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
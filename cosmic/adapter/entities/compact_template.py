@@ -0,0 +1,236 @@
+import sys
+from cosmic.adapter.entities.machine_template import (
+    Parameter,
+    State,
+    Transition,
+    MachineTemplate,
+)
+from typing import Iterable, Optional, Tuple, Union
+
+
+def _intern_names(names: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    if names is None:
+        return None
+    return tuple(sys.intern(name) for name in names)
+
+
+class CompactState:
+    """Memory efficient counterpart of `State`. Names are interned and the
+    optional `on_enter` and `on_exit` actions are tuples, or None when the
+    state does not declare them.
+    """
+    __slots__ = ("name", "on_enter", "on_exit")
+
+    def __init__(
+        self,
+        name: str,
+        on_enter: Optional[Iterable[str]] = None,
+        on_exit: Optional[Iterable[str]] = None,
+    ) -> None:
+        self.name = sys.intern(name)
+        self.on_enter = _intern_names(on_enter)
+        self.on_exit = _intern_names(on_exit)
+
+    @classmethod
+    def from_dict(cls, state: State) -> "CompactState":
+        """Builds a compact state from its dictionary form.
+
+        Args:
+            state (State): The state dictionary.
+
+        Returns:
+            CompactState: The compact state.
+        """
+        return cls(
+            state["name"],
+            state.get("on_enter"),
+            state.get("on_exit"),
+        )
+
+    def to_dict(self) -> State:
+        """Converts the compact state back to its dictionary form.
+
+        Returns:
+            State: The state dictionary.
+        """
+        state = State(name=self.name)
+        if self.on_enter is not None:
+            state["on_enter"] = list(self.on_enter)
+        if self.on_exit is not None:
+            state["on_exit"] = list(self.on_exit)
+        return state
+
+
+class CompactTransition:
+    """Memory efficient counterpart of `Transition`. Names are interned,
+    and the optional guard and action lists are tuples, or None when the
+    transition does not declare them, as are the `send` and `receive`
+    channel names and the `branchpoint` and `weight` of a probabilistic
+    branch.
+    """
+    __slots__ = (
+        "trigger",
+        "source",
+        "dest",
+        "conditions",
+        "unless",
+        "after",
+        "before",
+        "send",
+        "receive",
+        "branchpoint",
+        "weight",
+    )
+    OPTIONAL_FIELDS = ("conditions", "unless", "after", "before")
+    CHANNEL_FIELDS = ("send", "receive")
+    BRANCH_FIELDS = ("branchpoint", "weight")
+
+    def __init__(
+        self,
+        trigger: str,
+        source: str,
+        dest: str,
+        conditions: Optional[Iterable[str]] = None,
+        unless: Optional[Iterable[str]] = None,
+        after: Optional[Iterable[str]] = None,
+        before: Optional[Iterable[str]] = None,
+        send: Optional[str] = None,
+        receive: Optional[str] = None,
+        branchpoint: Optional[str] = None,
+        weight: Optional[Union[int, float, str]] = None,
+    ) -> None:
+        self.trigger = sys.intern(trigger)
+        self.source = sys.intern(source)
+        self.dest = sys.intern(dest)
+        self.conditions = _intern_names(conditions)
+        self.unless = _intern_names(unless)
+        self.after = _intern_names(after)
+        self.before = _intern_names(before)
+        self.send = None if send is None else sys.intern(send)
+        self.receive = None if receive is None else sys.intern(receive)
+        self.branchpoint = None if branchpoint is None else sys.intern(
+            branchpoint,
+        )
+        self.weight = sys.intern(weight) if isinstance(weight, str) else (
+            weight
+        )
+
+    @classmethod
+    def from_dict(cls, transition: Transition) -> "CompactTransition":
+        """Builds a compact transition from its dictionary form.
+
+        Args:
+            transition (Transition): The transition dictionary.
+
+        Returns:
+            CompactTransition: The compact transition.
+        """
+        return cls(
+            transition["trigger"],
+            transition["source"],
+            transition["dest"],
+            *(transition.get(field) for field in cls.OPTIONAL_FIELDS),
+            *(transition.get(field) for field in cls.CHANNEL_FIELDS),
+            *(transition.get(field) for field in cls.BRANCH_FIELDS),
+        )
+
+    def to_dict(self) -> Transition:
+        """Converts the compact transition back to its dictionary form.
+
+        Returns:
+            Transition: The transition dictionary.
+        """
+        transition = Transition(
+            trigger=self.trigger,
+            source=self.source,
+            dest=self.dest,
+        )
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                transition[field] = list(value)
+        for field in self.CHANNEL_FIELDS + self.BRANCH_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                transition[field] = value
+        return transition
+
+
+class CompactMachineTemplate:
+    """Memory efficient counterpart of `MachineTemplate`, holding compact
+    states and transitions in tuples. The parameters are (name, type)
+    tuples, or None when the template has none. Use `to_dict` to get the
+    dictionary form expected by the code templates.
+    """
+    __slots__ = (
+        "initial_state",
+        "states",
+        "transitions",
+        "declared_functions",
+        "parameters",
+    )
+
+    def __init__(
+        self,
+        initial_state: str,
+        states: Iterable[CompactState],
+        transitions: Iterable[CompactTransition],
+        declared_functions: Optional[Iterable[str]] = None,
+        parameters: Optional[Iterable[Tuple[str, str]]] = None,
+    ) -> None:
+        self.initial_state = sys.intern(initial_state)
+        self.states = tuple(states)
+        self.transitions = tuple(transitions)
+        self.declared_functions = _intern_names(declared_functions)
+        self.parameters = None if parameters is None else tuple(
+            (sys.intern(name), type_name) for name, type_name in parameters
+        )
+
+    @classmethod
+    def from_dict(
+        cls,
+        machine_template: MachineTemplate,
+    ) -> "CompactMachineTemplate":
+        """Builds a compact machine template from its dictionary form.
+
+        Args:
+            machine_template (MachineTemplate): The machine dictionary.
+
+        Returns:
+            CompactMachineTemplate: The compact machine template.
+        """
+        return cls(
+            machine_template["initial_state"],
+            map(CompactState.from_dict, machine_template["states"]),
+            map(CompactTransition.from_dict, machine_template["transitions"]),
+            machine_template.get("declared_functions"),
+            (
+                (parameter["name"], parameter["type"])
+                for parameter in machine_template["parameters"]
+            ) if "parameters" in machine_template else None,
+        )
+
+    def to_dict(self) -> MachineTemplate:
+        """Converts the compact machine template back to its dictionary
+        form.
+
+        Returns:
+            MachineTemplate: The machine dictionary.
+        """
+        machine_template = MachineTemplate(
+            initial_state=self.initial_state,
+            states=[state.to_dict() for state in self.states],
+            transitions=[
+                transition.to_dict() for transition in self.transitions
+            ],
+        )
+        if self.declared_functions is not None:
+            machine_template["declared_functions"] = list(
+                self.declared_functions,
+            )
+        if self.parameters is not None:
+            machine_template["parameters"] = [
+                Parameter(name=name, type=type_name)
+                for name, type_name in self.parameters
+            ]
+        return machine_template
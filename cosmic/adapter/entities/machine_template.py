@@ -1,5 +1,5 @@
 # pragma: no cover
-from typing import TypedDict, List, NotRequired
+from typing import TypedDict, List, NotRequired, Union
 
 
 class State(TypedDict):
@@ -18,6 +18,11 @@ class Transition(TypedDict):
     the values of these keys are valid state names.
     The keys `conditions`, `unless`, `after`, and `before` are optional lists
     of conditions that must be met for the transition to be triggered.
+    The optional `send` and `receive` keys name the channel the transition
+    synchronises on, as the sender or as a receiver.
+    Transitions leaving a probabilistic branchpoint hold its id under the
+    `branchpoint` key, and their `weight`: a number, or the name of the
+    model function computing it.
     """
     trigger: str
     source: str  # assure that it represents a state name
@@ -26,6 +31,19 @@ class Transition(TypedDict):
     unless: NotRequired[List[str]]
     after: NotRequired[List[str]]
     before: NotRequired[List[str]]
+    send: NotRequired[str]
+    receive: NotRequired[str]
+    branchpoint: NotRequired[str]
+    weight: NotRequired[Union[int, float, str]]
+
+
+class Parameter(TypedDict):
+    """Represents a parameter of a machine template, given a value by each
+    instance of the template. The `type` key holds the declared type, such
+    as `int` or `const int &`.
+    """
+    name: str
+    type: str
 
 
 class MachineTemplate(TypedDict):
@@ -33,9 +51,11 @@ class MachineTemplate(TypedDict):
     The `initial_state` key represents the initial state of the machine.
     The `states` key is a list of states in the machine. See `State` for more
     information. The `transitions` key is a list of transitions in the machine.
-    See `Transition` for more information.
+    See `Transition` for more information. The optional `parameters` key
+    lists the template parameters, in declaration order.
     """
     initial_state: str
     states: List[State]
     transitions: List[Transition]
     declared_functions: NotRequired[List[str]]
+    parameters: NotRequired[List[Parameter]]
@@ -0,0 +1,27 @@
+from typing import Dict, List, Literal, TypedDict
+
+
+CHANNEL_KINDS = Literal["binary", "broadcast"]
+
+
+class Instance(TypedDict):
+    """Represents a process of the system, instantiating an agent.
+    The `name` key is the process name, `agent` the name of the agent it
+    instantiates, and `arguments` the text of the values given to the
+    agent parameters, in order.
+    """
+    name: str
+    agent: str
+    arguments: List[str]
+
+
+class NetworkTemplate(TypedDict):
+    """Represents the network the agents of a model belong to.
+    The `channels` key maps each declared channel name to its kind: a
+    `binary` send synchronises with exactly one receiver, while a
+    `broadcast` send synchronises with every enabled receiver, if any.
+    The `instances` key lists the processes declared by the system, in
+    order. See `Instance` for more information.
+    """
+    channels: Dict[str, CHANNEL_KINDS]
+    instances: List[Instance]
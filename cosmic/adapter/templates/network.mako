@@ -0,0 +1,275 @@
+<%!
+from mako.template import Template
+%>\
+<%
+    aw = 'await ' if asynchronous else ''
+    df = 'async def' if asynchronous else 'def'
+%>\
+% if asynchronous:
+import asyncio
+
+% endif
+from logging import Logger, getLogger
+% if not asynchronous:
+from threading import Event
+% endif
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+logger: Logger = getLogger(__name__)
+
+# the channels declared in the model, by name
+CHANNELS = {
+    % for channel, kind in channels.items():
+    '${channel}': '${kind}',
+    % endfor
+}
+
+
+class Network:
+    """Network of agents synchronising on the model channels. A transition
+    sending on a channel fires together with the transitions receiving on
+    it, which never fire on their own: a send on a binary channel needs
+    one receiver, while a broadcast send fires with every enabled receiver,
+    or alone. The receivers guards are evaluated before the sender runs
+    its callbacks.
+    Only the agents that can move on their own, through their own or their
+    sending transitions, are stepped. Agents waiting to receive are found
+    through the channel they wait on, so they do not cost any work until a
+    send reaches them.
+    """
+
+    # while no transition is enabled, `run` waits for this long, doubling
+    # the wait on every idle step up to `run`'s `max_wait`.
+    IDLE_MIN_WAIT = 0.001
+    IDLE_MAX_WAIT = 0.05
+
+    def __init__(self, agents: Dict[str, Any]) -> None:
+        """Constructor of the `Network` class. The agents must only change
+        state through the network from then on.
+
+        Args:
+            agents (Dict[str, Any]): The agent state machines, by name.
+        """
+        self.agents = dict(agents)
+        self.run_stats = dict()
+        % if asynchronous:
+        self._wakeup = asyncio.Event()
+        % else:
+        self._wakeup = Event()
+        % endif
+        # agents that can move on their own, in insertion order
+        self._active: Dict[str, None] = dict()
+        # the waiting receivers of each channel, with their triggers
+        self._receivers: Dict[str, Dict[str, Tuple[str, ...]]] = dict()
+        self._states: Dict[str, str] = dict()
+        self._plans: Dict[Tuple[type, str], Tuple] = dict()
+        for name in self.agents:
+            self._index(name)
+
+    def _plan(self, machine) -> Tuple:
+        """Method to get what an agent can do in its current state: whether
+        it can move on its own, its sends as (trigger, channel) tuples, and
+        its receiving triggers by channel. Plans are shared by the agents
+        of the same class.
+        """
+        key = (type(machine), machine.state)
+        plan = self._plans.get(key)
+        if plan is None:
+            sends, receives = list(), dict()
+            for trigger, channel, is_send in machine.SYNC_TABLE.get(
+                key[1],
+                (),
+            ):
+                if is_send:
+                    sends.append((trigger, channel))
+                else:
+                    receives.setdefault(channel, list()).append(trigger)
+            plan = self._plans[key] = (
+                bool(sends or machine.TRANSITION_TABLE.get(key[1])),
+                tuple(sends),
+                {
+                    channel: tuple(triggers)
+                    for channel, triggers in receives.items()
+                },
+            )
+        return plan
+
+    def _index(self, name: str) -> None:
+        """Method to update the active agents and the waiting receivers
+        after an agent changed state.
+        """
+        machine = self.agents[name]
+        state = machine.state
+        previous = self._states.get(name)
+        if previous == state:
+            return
+        if previous is not None:
+            self._active.pop(name, None)
+            for channel in self._plans[(type(machine), previous)][2]:
+                self._receivers[channel].pop(name, None)
+        self._states[name] = state
+        active, _, receives = self._plan(machine)
+        if active:
+            self._active[name] = None
+        for channel, triggers in receives.items():
+            self._receivers.setdefault(channel, dict())[name] = triggers
+
+    ${df} _send(self, name: str, trigger: str, channel: str) -> bool:
+        """Method to fire a sending transition along with its receivers.
+
+        Args:
+            name (str): The sending agent name.
+            trigger (str): The sending transition trigger.
+            channel (str): The channel name.
+
+        Returns:
+            bool: Whether the synchronisation fired.
+        """
+        sender = self.agents[name]
+        stepping = [sender]
+        receivers: List[Tuple[str, str]] = list()
+        broadcast = CHANNELS.get(channel) == 'broadcast'
+        sender.begin_step()
+        try:
+            if not ${aw}sender.may_trigger(trigger):
+                return False
+            for receiver_name, triggers in tuple(
+                self._receivers.get(channel, {}).items(),
+            ):
+                if receiver_name == name:
+                    continue
+                receiver = self.agents[receiver_name]
+                receiver.begin_step()
+                stepping.append(receiver)
+                for receiver_trigger in triggers:
+                    if ${aw}receiver.may_trigger(receiver_trigger):
+                        receivers.append((receiver_name, receiver_trigger))
+                        break
+                if receivers and not broadcast:
+                    break
+            if not receivers and not broadcast:
+                return False
+            # the guards hold for the whole step, so the transitions fire
+            # even if the sender changes what they read
+            ${aw}sender.trigger(trigger)
+            for receiver_name, receiver_trigger in receivers:
+                ${aw}self.agents[receiver_name].trigger(receiver_trigger)
+        finally:
+            for machine in stepping:
+                machine.end_step()
+        logger.info(
+            '[FSM] Synchronised %s on %s with %s',
+            name,
+            channel,
+            [receiver_name for receiver_name, _ in receivers],
+        )
+        self._index(name)
+        for receiver_name, _ in receivers:
+            self._index(receiver_name)
+        return True
+
+    ${df} step(self) -> int:
+        """Method to step every agent that can move on its own once. Each
+        agent fires its first enabled transition, trying its own
+        transitions before its sending ones.
+
+        Returns:
+            int: The amount of agents that moved on their own.
+        """
+        fired = 0
+        for name in tuple(self._active):
+            if name not in self._active:
+                continue
+            machine = self.agents[name]
+            if ${aw}machine.next_state():
+                self._index(name)
+                fired += 1
+                continue
+            for trigger, channel in self._plan(machine)[1]:
+                if ${aw}self._send(name, trigger, channel):
+                    fired += 1
+                    break
+        return fired
+
+    def notify(self) -> None:
+        """Method to wake up `run` while it waits for an enabled transition.
+        % if asynchronous:
+        Call it whenever the values read by the guards change. It must run
+        in the event loop of `run`; from other threads, use
+        `loop.call_soon_threadsafe(network.notify)`.
+        % else:
+        Call it, from any thread, whenever the values read by the guards
+        change.
+        % endif
+        """
+        self._wakeup.set()
+
+    ${df} run(
+        self,
+        until: Optional[Callable[[], bool]] = None,
+        max_wait: Optional[float] = IDLE_MAX_WAIT,
+    ) -> None:
+        """Method to run the network until `until` returns True, or until no
+        agent can move on its own anymore. While no transition is enabled,
+        the network waits with an exponential backoff, from
+        `IDLE_MIN_WAIT` up to `max_wait` seconds, and `notify` ends the
+        wait right away. The `run_stats` attribute holds the amount of
+        steps, of agents that moved, the idle and elapsed seconds, and the
+        steps per second of the run.
+
+        Args:
+            until (Optional[Callable[[], bool]]): The stop condition,
+                checked before every step. Defaults to None.
+            max_wait (Optional[float]): The longest wait between idle steps.
+                0 never waits, stepping continuously, and None waits until
+                `notify` is called.
+        """
+        stats = self.run_stats = {
+            'steps': 0,
+            'fired': 0,
+            'idle_time': 0.0,
+            'elapsed': 0.0,
+            'steps_per_second': 0.0,
+        }
+        min_wait = self.IDLE_MIN_WAIT
+        if max_wait is not None:
+            min_wait = min(min_wait, max_wait)
+        wait = min_wait
+        start = perf_counter()
+        try:
+            while self._active and (until is None or not until()):
+                stats['steps'] += 1
+                fired = ${aw}self.step()
+                if fired:
+                    stats['fired'] += fired
+                    wait = min_wait
+                    % if asynchronous:
+                    await asyncio.sleep(0)
+                    % endif
+                    continue
+                if max_wait == 0:
+                    % if asynchronous:
+                    await asyncio.sleep(0)
+                    % endif
+                    continue
+                idle_start = perf_counter()
+                if max_wait is None:
+                    ${aw}self._wakeup.wait()
+                else:
+                    % if asynchronous:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    % else:
+                    self._wakeup.wait(wait)
+                    % endif
+                    wait = min(wait * 2, max_wait)
+                self._wakeup.clear()
+                stats['idle_time'] += perf_counter() - idle_start
+        finally:
+            stats['elapsed'] = perf_counter() - start
+            if stats['elapsed'] > 0:
+                stats['steps_per_second'] = stats['steps'] / stats['elapsed']
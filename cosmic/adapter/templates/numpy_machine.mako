@@ -0,0 +1,407 @@
+<%!
+from mako.template import Template
+%>\
+<%
+    state_ids = {state['name']: index for index, state in enumerate(states)}
+    # channels are synchronised by the network, which drives one machine
+    # per agent, so the batch machines leave them out
+    batch_transitions = [
+        transition for transition in transitions
+        if 'send' not in transition and 'receive' not in transition
+    ]
+    steps = {state['name']: list() for state in states}
+    groups = dict()
+    for index, transition in enumerate(batch_transitions):
+        source = transition['source']
+        branchpoint = transition.get('branchpoint')
+        if branchpoint is None:
+            steps[source].append(index)
+            continue
+        if (source, branchpoint) not in groups:
+            groups[(source, branchpoint)] = list()
+            steps[source].append((source, branchpoint))
+        groups[(source, branchpoint)].append(index)
+    # the weights of each branchpoint come from `branch_table`, which lists
+    # them in the same order
+    branches = list()
+    for source, state_steps in steps.items():
+        tables = iter(
+            step for step in branch_table.get(source, ())
+            if not isinstance(step, str)
+        )
+        for position, step in enumerate(state_steps):
+            if isinstance(step, tuple):
+                _, probabilities, weights = next(tables)
+                state_steps[position] = len(batch_transitions) + len(branches)
+                branches.append((tuple(groups[step]), probabilities, weights))
+    width = max([len(state_steps) for state_steps in steps.values()] + [1])
+%>\
+<%def name="callbacks(names)">${tuple(names)}</%def>\
+from functools import partial
+from logging import Logger, getLogger
+from time import perf_counter
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+
+logger: Logger = getLogger(__name__)
+
+
+class ${agent_name}:
+    """Batch `${agent_name}` state machine, running `size` instances of the
+    automaton at once. The current state of every instance is kept in the
+    `state_ids` array, numbered by the position of the state in `STATES`,
+    and each `step` advances every instance by one transition.
+    The model callbacks are called once per transition and step, with the
+    array of the indices of the instances they apply to: the guards return
+    a boolean array, or a single boolean, for those instances, and the
+    actions update the model arrays at those indices.
+    """
+
+    STATES = (
+        % for state in states:
+        '${state['name']}',
+        % endfor
+    )
+    STATE_IDS = {name: state_id for state_id, name in enumerate(STATES)}
+    INITIAL_STATE = ${state_ids[initial_state]}
+
+    # outgoing triggers of each state, in declaration order, leaving out
+    # the transitions that synchronise on a channel
+    TRANSITION_TABLE = {
+        % for state_name, triggers in transition_table.items():
+        '${state_name}': ${triggers},
+        % endfor
+    }
+
+    # the transitions, as (trigger, source, dest, conditions, unless,
+    # before, after)
+    TRANSITIONS = (
+        % for transition in batch_transitions:
+        (
+            '${transition['trigger']}',
+            ${state_ids[transition['source']]},
+            ${state_ids[transition['dest']]},
+            ${callbacks(transition.get('conditions', ()))},
+            ${callbacks(transition.get('unless', ()))},
+            ${callbacks(transition.get('before', ()))},
+            ${callbacks(transition.get('after', ()))},
+        ),
+        % endfor
+    )
+    # the probabilistic branchpoints, as (transitions, probabilities,
+    # aliases) alias tables, or as (transitions, None, weights) when a
+    # weight is read from the model
+    BRANCHES = (
+        % for branch_transitions, probabilities, weights in branches:
+        (${branch_transitions}, ${probabilities}, ${weights}),
+        % endfor
+    )
+    # the dense step table: row `s` lists the steps tried in state `s`, in
+    # declaration order, as indices into `TRANSITIONS`, or into `BRANCHES`
+    # after the transitions, padded with -1
+    STEPS = np.array(
+        [
+            % for state in states:
+            ${steps[state['name']] + [-1] * (width - len(steps[state['name']]))},  # ${state['name']}
+            % endfor
+        ],
+        dtype=np.intp,
+    )
+    ON_ENTER = (
+        % for state in states:
+        ${callbacks(state.get('on_enter', ()))},
+        % endfor
+    )
+    ON_EXIT = (
+        % for state in states:
+        ${callbacks(state.get('on_exit', ()))},
+        % endfor
+    )
+
+    __slots__ = (
+        'model',
+        'size',
+        'state_ids',
+        'rng',
+        'run_stats',
+        '_transitions',
+        '_branches',
+        '_on_enter',
+        '_on_exit',
+    )
+
+    def __init__(
+        self,
+        model,
+        size: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> None:
+        """Constructor of the batch `${agent_name}` class. Every callback
+        named by the machine must exist in the model.
+
+        Args:
+            model: The model implementing the callbacks over its arrays.
+            size (Optional[int]): The amount of instances. Defaults to the
+                `size` attribute of the model.
+            seed (Optional[int]): The seed of the `rng` random generator,
+                which picks the probabilistic branches. Defaults to None.
+        """
+        self.model = model
+        self.size = model.size if size is None else size
+        self.state_ids = np.full(self.size, self.INITIAL_STATE, dtype=np.intp)
+        self.rng = np.random.default_rng(seed)
+        self.run_stats = dict()
+        bind = self._bind
+        self._transitions = tuple(
+            (trigger, source, dest, bind(conditions), bind(unless),
+             bind(before), bind(after))
+            for trigger, source, dest, conditions, unless, before, after
+            in self.TRANSITIONS
+        )
+        self._branches = tuple(
+            (
+                np.array(transitions, dtype=np.intp),
+                np.array(probabilities),
+                np.array(weights, dtype=np.intp),
+            ) if probabilities is not None else (
+                np.array(transitions, dtype=np.intp),
+                None,
+                tuple(
+                    bind((weight,))[0] if weight.__class__ is str
+                    else weight
+                    for weight in weights
+                ),
+            )
+            for transitions, probabilities, weights in self.BRANCHES
+        )
+        self._on_enter = tuple(bind(names) for names in self.ON_ENTER)
+        self._on_exit = tuple(bind(names) for names in self.ON_EXIT)
+
+    def _bind(self, names) -> tuple:
+        """Method to resolve model callbacks. Attributes that are not
+        callable are read on every call, at the given indices when they
+        are arrays.
+
+        Args:
+            names: The model callback names.
+
+        Returns:
+            The callables, in the same order.
+        """
+        callbacks = list()
+        for name in names:
+            value = getattr(self.model, name)
+            if not callable(value):
+                value = partial(self._read, name)
+            callbacks.append(value)
+        return tuple(callbacks)
+
+    def _read(self, name: str, index: np.ndarray):
+        value = getattr(self.model, name)
+        if isinstance(value, np.ndarray):
+            return value[index]
+        return value
+
+    def counts(self) -> Dict[str, int]:
+        """Method to count the instances in each state.
+
+        Returns:
+            Dict[str, int]: The amount of instances, by state name.
+        """
+        counts = np.bincount(self.state_ids, minlength=len(self.STATES))
+        return dict(zip(self.STATES, counts.tolist()))
+
+    def is_state(self, state: str) -> np.ndarray:
+        """Method to check which instances are in the given state.
+
+        Args:
+            state (str): The state name.
+
+        Returns:
+            np.ndarray: The boolean mask of the instances in the state.
+        """
+        return self.state_ids == self.STATE_IDS[state]
+
+    def choose_branches(
+        self,
+        branch_id: int,
+        index: np.ndarray,
+    ) -> np.ndarray:
+        """Method to pick a branch of a probabilistic branchpoint by weight
+        for each of the given instances, with the `rng` random generator.
+        Constant weights are drawn from the alias table of the branchpoint,
+        while the weights read from the model are computed for the given
+        instances on every pick.
+
+        Args:
+            branch_id (int): The branchpoint position in `BRANCHES`.
+            index (np.ndarray): The indices of the instances.
+
+        Raises:
+            ValueError: If the weights of an instance do not sum to a
+                positive number.
+
+        Returns:
+            np.ndarray: The picked transition of each instance, as an index
+                into `TRANSITIONS`.
+        """
+        transitions, probabilities, aliases = self._branches[branch_id]
+        count = index.shape[0]
+        if probabilities is None:
+            weights = np.column_stack([
+                np.broadcast_to(
+                    weight(index) if callable(weight) else weight,
+                    count,
+                ).astype(float)
+                for weight in aliases
+            ])
+            cumulative = np.cumsum(weights, axis=1)
+            if (cumulative[:, -1] <= 0).any():
+                raise ValueError('Total of weights must be greater than zero')
+            draws = self.rng.random(count) * cumulative[:, -1]
+            columns = (cumulative <= draws[:, None]).sum(axis=1)
+        else:
+            position = self.rng.random(count) * transitions.shape[0]
+            columns = position.astype(np.intp)
+            keep = position - columns < probabilities[columns]
+            columns = np.where(keep, columns, aliases[columns])
+        return transitions[columns]
+
+    def _holds(self, guard: Callable, index: np.ndarray, memo) -> np.ndarray:
+        """Method to evaluate a guard for the given instances, calling it
+        only for the instances it was not evaluated for during the step.
+        """
+        known, values = memo.get(guard, (None, None))
+        if known is None:
+            known = np.zeros(self.size, dtype=bool)
+            values = np.zeros(self.size, dtype=bool)
+            memo[guard] = (known, values)
+        missing = index[~known[index]]
+        if missing.shape[0]:
+            values[missing] = guard(missing)
+            known[missing] = True
+        return values[index]
+
+    def _enabled(
+        self,
+        transition_id: int,
+        index: np.ndarray,
+        memo,
+    ) -> np.ndarray:
+        """Method to find which of the given instances may take a
+        transition, evaluating each guard only for the instances that
+        passed the previous ones.
+        """
+        _, _, _, conditions, unless, _, _ = self._transitions[transition_id]
+        enabled = np.ones(index.shape[0], dtype=bool)
+        for guard, expected in (
+            *((guard, True) for guard in conditions),
+            *((guard, False) for guard in unless),
+        ):
+            where = np.flatnonzero(enabled)
+            if where.shape[0] == 0:
+                break
+            enabled[where] = self._holds(guard, index[where], memo) == expected
+        return enabled
+
+    def _fire(self, transition_id: int, index: np.ndarray) -> None:
+        """Method to run the callbacks of a transition for the given
+        instances and change their state, without evaluating its guards.
+        """
+        _, source, dest, _, _, before, after = self._transitions[transition_id]
+        for callback in before:
+            callback(index)
+        for callback in self._on_exit[source]:
+            callback(index)
+        self.state_ids[index] = dest
+        for callback in self._on_enter[dest]:
+            callback(index)
+        for callback in after:
+            callback(index)
+
+    def step(self) -> int:
+        """Method to advance every instance by one transition. The steps of
+        the current state of each instance are tried in declaration order,
+        through the `STEPS` table, and the first enabled one fires. The
+        branches of a probabilistic branchpoint are tried as one
+        transition, picked by weight, see `choose_branches`. Each guard is
+        evaluated at most once per instance and step, and all of them are
+        evaluated before any transition fires.
+
+        Returns:
+            int: The amount of instances that took a transition.
+        """
+        state_ids = self.state_ids
+        transition_count = len(self._transitions)
+        chosen = np.full(self.size, -1, dtype=np.intp)
+        pending = np.arange(self.size)
+        memo = dict()
+        for slot in range(self.STEPS.shape[1]):
+            step_ids = self.STEPS[state_ids[pending], slot]
+            has_step = step_ids >= 0
+            pending, step_ids = pending[has_step], step_ids[has_step]
+            if pending.shape[0] == 0:
+                break
+            for step_id in np.unique(step_ids[step_ids >= transition_count]):
+                where = np.flatnonzero(step_ids == step_id)
+                step_ids[where] = self.choose_branches(
+                    int(step_id) - transition_count,
+                    pending[where],
+                )
+            enabled = np.zeros(pending.shape[0], dtype=bool)
+            for transition_id in np.unique(step_ids):
+                where = np.flatnonzero(step_ids == transition_id)
+                enabled[where] = self._enabled(
+                    int(transition_id),
+                    pending[where],
+                    memo,
+                )
+            chosen[pending[enabled]] = step_ids[enabled]
+            pending = pending[~enabled]
+        fired = np.flatnonzero(chosen >= 0)
+        for transition_id in np.unique(chosen[fired]):
+            self._fire(
+                int(transition_id),
+                fired[chosen[fired] == transition_id],
+            )
+        return int(fired.shape[0])
+
+    def run(
+        self,
+        final_state: str = 'finished',
+        max_steps: Optional[int] = None,
+    ) -> None:
+        """Method to step the instances until all of them reach the final
+        state, no instance can move anymore, or `max_steps` steps ran. The
+        `run_stats` attribute holds the amount of steps, fired transitions,
+        the elapsed seconds and the steps per second of the run.
+
+        Args:
+            final_state (str): The machine final state.
+            max_steps (Optional[int]): The largest amount of steps. Defaults
+                to None, for no limit.
+        """
+        logger.info(f'[FSM] Running {self.size} state machines until final state: {final_state}')  # noqa
+        final_state_id = self.STATE_IDS[final_state]
+        stats = self.run_stats = {
+            'steps': 0,
+            'fired': 0,
+            'elapsed': 0.0,
+            'steps_per_second': 0.0,
+        }
+        start = perf_counter()
+        try:
+            while max_steps is None or stats['steps'] < max_steps:
+                if (self.state_ids == final_state_id).all():
+                    break
+                stats['steps'] += 1
+                fired = self.step()
+                if not fired:
+                    break
+                stats['fired'] += fired
+        finally:
+            stats['elapsed'] = perf_counter() - start
+            if stats['elapsed'] > 0:
+                stats['steps_per_second'] = stats['steps'] / stats['elapsed']
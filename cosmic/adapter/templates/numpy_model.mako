@@ -0,0 +1,39 @@
+<%!
+from mako.template import Template
+%>\
+import numpy as np
+
+
+class ${agent_name}Model:
+    # Auto generated code. Please, adjust!
+
+    # list the attributes of the model here, keeping one array of `size`
+    # values for each attribute that differs between the instances
+    __slots__ = (
+        'size',
+        % for slot in model_slots:
+        '${slot}',
+        % endfor
+    )
+
+    def __init__(self, size: int${''.join(f", {parameter['name']}" for parameter in parameters)}) -> None:
+        """Constructor of the `${agent_name}Model` class, holding the
+        arrays of `size` instances.
+
+        Args:
+            size (int): The amount of instances.
+            % for parameter in parameters:
+            ${parameter['name']}: The `${parameter['type']}` parameter, as a
+                value or as an array of `size` values.
+            % endfor
+        """
+        self.size = size
+        % for parameter in parameters:
+        self.${parameter['name']} = ${parameter['name']}
+        % endfor
+
+    % for dec_func in declared_functions:
+    def ${dec_func}(self, index: np.ndarray):
+        raise NotImplementedError('${dec_func} not implemented: Implement This Model Behavior over the instances at `index`.')
+
+    % endfor
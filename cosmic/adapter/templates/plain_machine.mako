@@ -0,0 +1,426 @@
+<%!
+from mako.template import Template
+%>\
+<%
+    state_ids = {state['name']: index for index, state in enumerate(states)}
+    outgoing = {state['name']: list() for state in states}
+    synchronising = list()
+    for transition in transitions:
+        if 'send' in transition or 'receive' in transition:
+            synchronising.append(transition)
+        else:
+            outgoing[transition['source']].append(transition)
+%>\
+<%def name="transition_tuple(transition)">\
+(
+                '${transition['trigger']}',
+                ${state_ids[transition['dest']]},
+                ${tuple(transition.get('conditions', ()))},
+                ${tuple(transition.get('unless', ()))},
+                ${tuple(transition.get('before', ()))},
+                ${tuple(transition.get('after', ()))},
+            )\
+</%def>\
+from functools import partial
+from logging import Logger, getLogger
+from random import Random
+from threading import Event
+from time import perf_counter
+from typing import Optional
+
+
+logger: Logger = getLogger(__name__)
+
+
+class ${agent_name}:
+    """Self-contained `${agent_name}` state machine. States are numbered by
+    their position in `STATES`, and the model callbacks are resolved once,
+    when the machine is built.
+    """
+
+    STATES = (
+        % for state in states:
+        '${state['name']}',
+        % endfor
+    )
+    STATE_IDS = {name: state_id for state_id, name in enumerate(STATES)}
+    INITIAL_STATE = ${state_ids[initial_state]}
+
+    # outgoing triggers of each state, in declaration order, leaving out
+    # the transitions that synchronise on a channel
+    TRANSITION_TABLE = {
+        % for state_name, triggers in transition_table.items():
+        '${state_name}': ${triggers},
+        % endfor
+    }
+    # outgoing (trigger, channel, is_send) synchronisations of each state,
+    # fired by the network
+    SYNC_TABLE = {
+        % for state_name, synchronisations in sync_table.items():
+        '${state_name}': (
+            % for synchronisation in synchronisations:
+            ${synchronisation},
+            % endfor
+        ),
+        % endfor
+    }
+
+    # steps of the states leaving through a probabilistic branchpoint: their
+    # triggers, with the branches of each branchpoint grouped into a
+    # (triggers, probabilities, aliases) alias table, or into
+    # (triggers, None, weights) when a weight is read from the model
+    BRANCH_TABLE = {
+        % for state_name, steps in branch_table.items():
+        '${state_name}': ${steps},
+        % endfor
+    }
+
+    # outgoing transitions of each state, in declaration order, as
+    # (trigger, dest, conditions, unless, before, after)
+    TRANSITIONS = (
+        % for state in states:
+        # ${state['name']}
+        (
+            % for transition in outgoing[state['name']]:
+            ${transition_tuple(transition)},
+            % endfor
+        ),
+        % endfor
+    )
+    # the transitions that synchronise on a channel, as (source, transition)
+    SYNC_TRANSITIONS = (
+        % for transition in synchronising:
+        (
+            ${state_ids[transition['source']]},
+            ${transition_tuple(transition)},
+        ),
+        % endfor
+    )
+    ON_ENTER = (
+        % for state in states:
+        ${tuple(state.get('on_enter', ()))},
+        % endfor
+    )
+    ON_EXIT = (
+        % for state in states:
+        ${tuple(state.get('on_exit', ()))},
+        % endfor
+    )
+
+    # while no transition is enabled, `run` waits for this long, doubling
+    # the wait on every idle step up to `run`'s `max_wait`.
+    IDLE_MIN_WAIT = 0.001
+    IDLE_MAX_WAIT = 0.05
+
+    __slots__ = (
+        'model',
+        'state_id',
+        'run_stats',
+        'rng',
+        '_transitions',
+        '_steps',
+        '_triggers',
+        '_on_enter',
+        '_on_exit',
+        '_wakeup',
+        '_guard_memo',
+    )
+
+    def __init__(self, model, seed: Optional[int] = None) -> None:
+        """Constructor of the base `${agent_name}` class. Every callback
+        named by the machine must exist in the model.
+
+        Args:
+            model: The model implementing the callbacks.
+            seed (Optional[int]): The seed of the `rng` random generator,
+                which picks the probabilistic branches. Defaults to None.
+        """
+        self.model = model
+        self.rng = Random(seed)
+        self.state_id = self.INITIAL_STATE
+        self.run_stats = dict()
+        self._wakeup = Event()
+        self._guard_memo = None
+        bind = self._bind
+        self._transitions = tuple(
+            tuple(
+                (trigger, dest, bind(conditions), bind(unless),
+                 bind(before), bind(after))
+                for trigger, dest, conditions, unless, before, after
+                in state_transitions
+            )
+            for state_transitions in self.TRANSITIONS
+        )
+        self._triggers = {
+            transition[0]: (source, transition)
+            for source, state_transitions in enumerate(self._transitions)
+            for transition in state_transitions
+        }
+        for source, transition in self.SYNC_TRANSITIONS:
+            trigger, dest, conditions, unless, before, after = transition
+            self._triggers[trigger] = (
+                source,
+                (trigger, dest, bind(conditions), bind(unless),
+                 bind(before), bind(after)),
+            )
+        # the transitions tried by `next_state`, where the branches of a
+        # probabilistic branchpoint are a single (triggers, ...) step
+        self._steps = tuple(
+            tuple(
+                self._triggers[step][1] if step.__class__ is str
+                else self._bind_branch(step)
+                for step in self.BRANCH_TABLE[name]
+            ) if name in self.BRANCH_TABLE else self._transitions[state_id]
+            for state_id, name in enumerate(self.STATES)
+        )
+        self._on_enter = tuple(bind(names) for names in self.ON_ENTER)
+        self._on_exit = tuple(bind(names) for names in self.ON_EXIT)
+
+    def _bind(self, names):
+        """Method to resolve model callbacks. Attributes that are not
+        callable are read on every call.
+
+        Args:
+            names: The model callback names.
+
+        Returns:
+            The callables, in the same order.
+        """
+        callbacks = list()
+        for name in names:
+            value = getattr(self.model, name)
+            if not callable(value):
+                value = partial(getattr, self.model, name)
+            callbacks.append(value)
+        return tuple(callbacks)
+
+    def _bind_branch(self, branch: tuple) -> tuple:
+        """Method to resolve the model functions computing the weights of
+        a branchpoint, see `BRANCH_TABLE`.
+        """
+        triggers, probabilities, weights = branch
+        if probabilities is not None:
+            return branch
+        return triggers, None, tuple(
+            self._bind((weight,))[0] if weight.__class__ is str else weight
+            for weight in weights
+        )
+
+    def choose_branch(self, branch: tuple) -> str:
+        """Method to pick a branch of a probabilistic branchpoint by weight,
+        with the `rng` random generator. Constant weights are drawn from
+        the alias table of the branchpoint in constant time, while the
+        weights read from the model are computed on every pick.
+
+        Args:
+            branch (tuple): The branchpoint step, see `BRANCH_TABLE`.
+
+        Returns:
+            str: The trigger of the picked branch.
+        """
+        triggers, probabilities, aliases = branch
+        rng = self.rng
+        if probabilities is None:
+            return rng.choices(
+                triggers,
+                [
+                    weight() if callable(weight) else weight
+                    for weight in aliases
+                ],
+            )[0]
+        position = rng.random() * len(triggers)
+        column = int(position)
+        if position - column < probabilities[column]:
+            return triggers[column]
+        return triggers[aliases[column]]
+
+    @property
+    def state(self) -> str:
+        """The current state name."""
+        return self.STATES[self.state_id]
+
+    def is_state(self, state: str) -> bool:
+        """Method to check whether the machine is in the given state.
+
+        Args:
+            state (str): The state name.
+
+        Returns:
+            bool: Whether the machine is in the state.
+        """
+        return self.STATES[self.state_id] == state
+
+    def _fire(self, transition) -> None:
+        """Method to run the callbacks of a transition and change state,
+        without evaluating its guards.
+        """
+        _, dest, _, _, before, after = transition
+        for callback in before:
+            callback()
+        for callback in self._on_exit[self.state_id]:
+            callback()
+        self.state_id = dest
+        for callback in self._on_enter[dest]:
+            callback()
+        for callback in after:
+            callback()
+
+    def begin_step(self) -> None:
+        """Method to start a step driven from outside the machine, such as
+        a channel synchronisation: until `end_step` is called, each guard
+        is evaluated at most once.
+        """
+        self._guard_memo = dict()
+
+    def end_step(self) -> None:
+        """Method to end a step started with `begin_step`."""
+        self._guard_memo = None
+
+    def _holds(self, guard) -> bool:
+        """Method to evaluate a guard, reusing its result while a step
+        started with `begin_step` lasts.
+        """
+        memo = self._guard_memo
+        if memo is None:
+            return bool(guard())
+        result = memo.get(guard)
+        if result is None:
+            result = memo[guard] = bool(guard())
+        return result
+
+    def may_trigger(self, trigger: str) -> bool:
+        """Method to check whether a transition leaves the current state
+        and its guards hold, without firing it.
+
+        Args:
+            trigger (str): The transition trigger.
+
+        Returns:
+            bool: Whether the transition can fire.
+        """
+        source, transition = self._triggers[trigger]
+        if source != self.state_id:
+            return False
+        _, _, conditions, unless, _, _ = transition
+        holds = self._holds
+        if not all(holds(guard) for guard in conditions):
+            return False
+        return not any(holds(guard) for guard in unless)
+
+    def trigger(self, trigger: str) -> bool:
+        """Method to fire a transition by its trigger name, if it leaves the
+        current state and its guards hold.
+
+        Args:
+            trigger (str): The transition trigger.
+
+        Returns:
+            bool: Whether the transition fired.
+        """
+        if not self.may_trigger(trigger):
+            return False
+        self._fire(self._triggers[trigger][1])
+        return True
+
+    def next_state(self) -> bool:
+        """Method for automatic execution of available transitions in each
+        of the machine states. The transitions of the current state are
+        tried in declaration order, and the first enabled one fires, ending
+        the step. The branches of a probabilistic branchpoint are tried as
+        one transition, picked by weight, see `choose_branch`. Each guard is
+        evaluated at most once per step, and the fired transition does not
+        evaluate its guards again.
+
+        Returns:
+            bool: Whether a transition fired.
+        """
+        memo = dict()
+        for transition in self._steps[self.state_id]:
+            if len(transition) == 3:
+                transition = self._triggers[self.choose_branch(transition)][1]
+            enabled = True
+            for guard in transition[2]:
+                result = memo.get(guard)
+                if result is None:
+                    result = memo[guard] = bool(guard())
+                if not result:
+                    enabled = False
+                    break
+            if enabled:
+                for guard in transition[3]:
+                    result = memo.get(guard)
+                    if result is None:
+                        result = memo[guard] = bool(guard())
+                    if result:
+                        enabled = False
+                        break
+            if enabled:
+                logger.info(
+                    '[FSM] Triggered transition: %s from state: %s',
+                    transition[0],
+                    self.STATES[self.state_id],
+                )
+                self._fire(transition)
+                return True
+        return False
+
+    def notify(self) -> None:
+        """Method to wake up `run` while it waits for an enabled transition.
+        Call it, from any thread, whenever the values read by the guards
+        change.
+        """
+        self._wakeup.set()
+
+    def run(
+        self,
+        final_state: str = 'finished',
+        max_wait: Optional[float] = IDLE_MAX_WAIT,
+    ) -> None:
+        """Method to run the state machine until it reaches the final state.
+        While no transition is enabled, the machine waits with an
+        exponential backoff, from `IDLE_MIN_WAIT` up to `max_wait` seconds,
+        and `notify` ends the wait right away. The `run_stats` attribute
+        holds the amount of steps, fired transitions, the idle and elapsed
+        seconds, and the steps per second of the run.
+
+        Args:
+            final_state (str): The machine final state.
+            max_wait (Optional[float]): The longest wait between idle steps.
+                0 never waits, stepping continuously, and None waits until
+                `notify` is called.
+        """
+        logger.info(f'[FSM] Running state machine until final state: {final_state}')  # noqa
+        final_state_id = self.STATE_IDS[final_state]
+        stats = self.run_stats = {
+            'steps': 0,
+            'fired': 0,
+            'idle_time': 0.0,
+            'elapsed': 0.0,
+            'steps_per_second': 0.0,
+        }
+        min_wait = self.IDLE_MIN_WAIT
+        if max_wait is not None:
+            min_wait = min(min_wait, max_wait)
+        wait = min_wait
+        start = perf_counter()
+        try:
+            while self.state_id != final_state_id:
+                stats['steps'] += 1
+                if self.next_state():
+                    stats['fired'] += 1
+                    wait = min_wait
+                    continue
+                if max_wait == 0:
+                    continue
+                idle_start = perf_counter()
+                if max_wait is None:
+                    self._wakeup.wait()
+                else:
+                    self._wakeup.wait(wait)
+                    wait = min(wait * 2, max_wait)
+                self._wakeup.clear()
+                stats['idle_time'] += perf_counter() - idle_start
+        finally:
+            stats['elapsed'] = perf_counter() - start
+            if stats['elapsed'] > 0:
+                stats['steps_per_second'] = stats['steps'] / stats['elapsed']
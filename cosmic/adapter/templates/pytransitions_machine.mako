@@ -1,7 +1,24 @@
 <%!
 from mako.template import Template
+
+# channels are synchronised by the network, see `SYNC_TABLE`, and the
+# branches are picked by `next_state`, see `BRANCH_TABLE`; neither is a
+# transitions keyword
+EXCLUDED_KEYS = ('send', 'receive', 'branchpoint', 'weight')
+
+
+def machine_transition(transition):
+    return {
+        key: value for key, value in transition.items()
+        if key not in EXCLUDED_KEYS
+    }
 %>\
+from functools import partial
 from logging import Logger, getLogger
+from random import Random
+from threading import Event
+from time import perf_counter
+from typing import Callable, List, Optional
 
 from transitions import State
 from transitions.extensions import GraphMachine
@@ -12,17 +29,58 @@ logger: Logger = getLogger(__name__)
 
 class ${agent_name}(GraphMachine):
 
-    def __init__(self, model) -> None:
+    # outgoing triggers of each state, in declaration order, leaving out
+    # the transitions that synchronise on a channel
+    TRANSITION_TABLE = {
+        % for state_name, triggers in transition_table.items():
+        '${state_name}': ${triggers},
+        % endfor
+    }
+    # outgoing (trigger, channel, is_send) synchronisations of each state,
+    # fired by the network
+    SYNC_TABLE = {
+        % for state_name, synchronisations in sync_table.items():
+        '${state_name}': (
+            % for synchronisation in synchronisations:
+            ${synchronisation},
+            % endfor
+        ),
+        % endfor
+    }
+    # steps of the states leaving through a probabilistic branchpoint: their
+    # triggers, with the branches of each branchpoint grouped into a
+    # (triggers, probabilities, aliases) alias table, or into
+    # (triggers, None, weights) when a weight is read from the model
+    BRANCH_TABLE = {
+        % for state_name, steps in branch_table.items():
+        '${state_name}': ${steps},
+        % endfor
+    }
+
+    # while no transition is enabled, `run` waits for this long, doubling
+    # the wait on every idle step up to `run`'s `max_wait`.
+    IDLE_MIN_WAIT = 0.001
+    IDLE_MAX_WAIT = 0.05
+
+    def __init__(self, model, seed: Optional[int] = None) -> None:
         """Constructor of the base `${agent_name}` class.
+
+        Args:
+            model: The model implementing the callbacks.
+            seed (Optional[int]): The seed of the `rng` random generator,
+                which picks the probabilistic branches. Defaults to None.
         """
+        self.rng = Random(seed)
+        self._wakeup = Event()
+        self.run_stats = dict()
         % for state in states:
         ${state['name']} = State(
             name='${state['name']}',
             % if state.get('on_enter', None) is not None:
-            on_enter=${state['on_enter']},
+            on_enter=self._bind(model, ${state['on_enter']}),
             % endif
             %if state.get('on_exit', None) is not None:
-            on_exit=${state['on_exit']},
+            on_exit=self._bind(model, ${state['on_exit']}),
             % endif
         )
         % endfor
@@ -35,9 +93,26 @@ class ${agent_name}(GraphMachine):
 
         transitions = [
             % for transition in transitions:
-            ${transition},
+            ${machine_transition(transition)},
             % endfor 
         ]
+        self._guard_memo = None
+        for transition in transitions:
+            for callbacks in ('before', 'after'):
+                if callbacks in transition:
+                    transition[callbacks] = self._bind(
+                        model,
+                        transition[callbacks],
+                    )
+            for guards in ('conditions', 'unless'):
+                if guards in transition:
+                    transition[guards] = [
+                        self._step_guard(name, callback)
+                        for name, callback in zip(
+                            transition[guards],
+                            self._bind(model, transition[guards]),
+                        )
+                    ]
 
         super().__init__(
             model=model,
@@ -45,41 +120,227 @@ class ${agent_name}(GraphMachine):
             transitions=transitions,
             initial=${initial_state},
         )
+        self._branch_table = {
+            state: tuple(
+                self._bind_branch(model, step)
+                if step.__class__ is tuple else step
+                for step in steps
+            )
+            for state, steps in self.BRANCH_TABLE.items()
+        }
+
+    def _bind(self, model, names: List[str]) -> List[Callable]:
+        """Method to resolve the model callbacks once, when the machine is
+        built, instead of looking them up by name on every call. Attributes
+        that are not callable are read on every call.
+
+        Args:
+            model: The model implementing the callbacks.
+            names (List[str]): The model callback names.
+
+        Returns:
+            List[Callable]: The callbacks, in the same order.
+        """
+        callbacks = list()
+        for name in names:
+            value = getattr(model, name)
+            if not callable(value):
+                value = partial(getattr, model, name)
+            callbacks.append(value)
+        return callbacks
+
+    def _bind_branch(self, model, branch: tuple) -> tuple:
+        """Method to resolve the model functions computing the weights of
+        a branchpoint, see `BRANCH_TABLE`.
+        """
+        triggers, probabilities, weights = branch
+        if probabilities is not None:
+            return branch
+        return triggers, None, tuple(
+            self._bind(model, [weight])[0] if weight.__class__ is str
+            else weight
+            for weight in weights
+        )
 
-    def __getattr__(self, item):
-        """Method to get unlisted attributes of the class. If the attribute
-        is not found, the method will return the class attribute.
+    def choose_branch(self, branch: tuple) -> str:
+        """Method to pick a branch of a probabilistic branchpoint by weight,
+        with the `rng` random generator. Constant weights are drawn from
+        the alias table of the branchpoint in constant time, while the
+        weights read from the model are computed on every pick.
 
         Args:
-            item: The class attribute that should be retrieved.
+            branch (tuple): The branchpoint step, see `BRANCH_TABLE`.
 
         Returns:
-            The class attribute.
+            str: The trigger of the picked branch.
         """
-        return self.model.__getattribute__(item)
+        triggers, probabilities, aliases = branch
+        rng = self.rng
+        if probabilities is None:
+            weights = list()
+            for weight in aliases:
+                if callable(weight):
+                    weight = weight()
+                weights.append(weight)
+            return rng.choices(triggers, weights)[0]
+        position = rng.random() * len(triggers)
+        column = int(position)
+        if position - column < probabilities[column]:
+            return triggers[column]
+        return triggers[aliases[column]]
+
+    def _step_guard(self, name: str, callback: Callable) -> Callable:
+        """Method to wrap a model guard, so that during a `next_state` step
+        it is evaluated at most once, and its result is reused by every
+        transition sharing it. Outside of a step, the guard is evaluated on
+        every call.
 
-    def next_state(self):
+        Args:
+            name (str): The model guard name.
+            callback (Callable): The bound model guard.
+
+        Returns:
+            The wrapped guard.
+        """
+        def guard(*args, **kwargs):
+            memo = self._guard_memo
+            if memo is not None and name in memo:
+                return memo[name]
+            result = callback(*args, **kwargs)
+            if memo is not None:
+                memo[name] = result
+            return result
+        guard.__name__ = name
+        return guard
+
+    @property
+    def state(self) -> str:
+        """The current state name."""
+        return self.model.state
+
+    def begin_step(self) -> None:
+        """Method to start a step driven from outside the machine, such as
+        a channel synchronisation: until `end_step` is called, each guard
+        is evaluated at most once.
+        """
+        self._guard_memo = dict()
+
+    def end_step(self) -> None:
+        """Method to end a step started with `begin_step`."""
+        self._guard_memo = None
+
+    def may_trigger(self, trigger: str) -> bool:
+        """Method to check whether a transition leaves the current state
+        and its guards hold, without firing it.
+
+        Args:
+            trigger (str): The transition trigger.
+
+        Returns:
+            bool: Whether the transition can fire.
+        """
+        return self.model.may_trigger(trigger)
+
+    def trigger(self, trigger: str) -> bool:
+        """Method to fire a transition by its trigger name, if it leaves the
+        current state and its guards hold.
+
+        Args:
+            trigger (str): The transition trigger.
+
+        Returns:
+            bool: Whether the transition fired.
+        """
+        return self.model.trigger(trigger)
+
+    def next_state(self) -> bool:
         """Method for automatic execution of available transitions in each
-        of the machine states.
+        of the machine states. The transitions of the current state are
+        tried in declaration order, and the first enabled one fires, ending
+        the step. The branches of a probabilistic branchpoint are tried as
+        one transition, picked by weight, see `choose_branch`. Each guard is
+        evaluated at most once per step, and the fired transition does not
+        evaluate its guards again.
+
+        Returns:
+            bool: Whether a transition fired.
         """
-        available_transitions = self.get_triggers(self.state)
-        available_transitions = available_transitions[len(self.states):]
-
-        for curr_transition in available_transitions:
-            may_method_result = self.may_trigger(curr_transition)
-            if may_method_result:
-                logger.info(
-                    f'[FSM] Triggering transition: {curr_transition} from state: {self.state}',  # noqa
-                )
-                self.trigger(curr_transition)
-
-    def run(self, final_state: str = 'finished') -> None:
+        source = self.model.state
+        trigger = self.model.trigger
+        self._guard_memo = dict()
+        try:
+            steps = self._branch_table.get(source)
+            if steps is None:
+                steps = self.TRANSITION_TABLE[source]
+            for curr_transition in steps:
+                if curr_transition.__class__ is tuple:
+                    curr_transition = self.choose_branch(curr_transition)
+                if trigger(curr_transition):
+                    logger.info(
+                        f'[FSM] Triggered transition: {curr_transition} from state: {source}',  # noqa
+                    )
+                    return True
+            return False
+        finally:
+            self._guard_memo = None
+
+    def notify(self) -> None:
+        """Method to wake up `run` while it waits for an enabled transition.
+        Call it, from any thread, whenever the values read by the guards
+        change.
+        """
+        self._wakeup.set()
+
+    def run(
+        self,
+        final_state: str = 'finished',
+        max_wait: Optional[float] = IDLE_MAX_WAIT,
+    ) -> None:
         """Method to run the state machine until it reaches the final state.
+        While no transition is enabled, the machine waits with an
+        exponential backoff, from `IDLE_MIN_WAIT` up to `max_wait` seconds,
+        and `notify` ends the wait right away. The `run_stats` attribute
+        holds the amount of steps, fired transitions, the idle and elapsed
+        seconds, and the steps per second of the run.
 
         Args:
             final_state (str): The machine final state.
+            max_wait (Optional[float]): The longest wait between idle steps.
+                0 never waits, stepping continuously, and None waits until
+                `notify` is called.
         """
         logger.info(f'[FSM] Running state machine until final state: {final_state}')  # noqa
-        final_state_func = getattr(self, f'is_{final_state}')
-        while not final_state_func():
-            self.next_state()
+        final_state_func = getattr(self.model, f'is_{final_state}')
+        stats = self.run_stats = {
+            'steps': 0,
+            'fired': 0,
+            'idle_time': 0.0,
+            'elapsed': 0.0,
+            'steps_per_second': 0.0,
+        }
+        min_wait = self.IDLE_MIN_WAIT
+        if max_wait is not None:
+            min_wait = min(min_wait, max_wait)
+        wait = min_wait
+        start = perf_counter()
+        try:
+            while not final_state_func():
+                stats['steps'] += 1
+                if self.next_state():
+                    stats['fired'] += 1
+                    wait = min_wait
+                    continue
+                if max_wait == 0:
+                    continue
+                idle_start = perf_counter()
+                if max_wait is None:
+                    self._wakeup.wait()
+                else:
+                    self._wakeup.wait(wait)
+                    wait = min(wait * 2, max_wait)
+                self._wakeup.clear()
+                stats['idle_time'] += perf_counter() - idle_start
+        finally:
+            stats['elapsed'] = perf_counter() - start
+            if stats['elapsed'] > 0:
+                stats['steps_per_second'] = stats['steps'] / stats['elapsed']
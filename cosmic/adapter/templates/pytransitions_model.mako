@@ -6,6 +6,33 @@ from mako.template import Template
 class ${agent_name}Model:
     # Auto generated code. Please, adjust!
 
+    # list the attributes of the model here, after the ones added by the
+    # state machine
+    % if model_slots:
+    __slots__ = (
+        % for slot in model_slots:
+        '${slot}',
+        % endfor
+    )
+    % else:
+    __slots__ = ()
+    % endif
+
+    % if parameters:
+    def __init__(self, ${', '.join(parameter['name'] for parameter in parameters)}) -> None:
+        """Constructor of the `${agent_name}Model` class, holding the
+        template parameters of the agent instance.
+
+        Args:
+            % for parameter in parameters:
+            ${parameter['name']}: The `${parameter['type']}` parameter.
+            % endfor
+        """
+        % for parameter in parameters:
+        self.${parameter['name']} = ${parameter['name']}
+        % endfor
+
+    % endif
     % for dec_func in declared_functions:
     def ${dec_func}(self):
         raise NotImplementedError('${dec_func} not implemented: Implement This Model Behavior.')
@@ -0,0 +1,58 @@
+<%!
+import re
+
+INTEGER_PATTERN = re.compile(r"^-?\d+$")
+
+
+def python_argument(argument):
+    if INTEGER_PATTERN.match(argument):
+        return str(int(argument))
+    if argument in ('true', 'false'):
+        return str(argument == 'true')
+    return repr(argument)
+
+
+def python_arguments(arguments):
+    values = [python_argument(argument) for argument in arguments]
+    if len(values) == 1:
+        return f'({values[0]},)'
+    return f"({', '.join(values)})"
+%>\
+from typing import Any, Dict, Tuple
+
+
+# the processes declared in the model system, as (name, agent, arguments)
+# tuples. Integer and boolean arguments are converted, while the others
+# are kept as their model text.
+INSTANCES: Tuple[Tuple[str, str, Tuple[Any, ...]], ...] = (
+    % for instance in instances:
+    (
+        '${instance['name']}',
+        '${instance['agent']}',
+        ${python_arguments(instance['arguments'])},
+    ),
+    % endfor
+)
+
+
+def build_agents(
+    machines: Dict[str, type],
+    models: Dict[str, type],
+) -> Dict[str, Any]:
+    """Builds a state machine for every process of the model system. The
+    machine and model classes are shared by the processes of the same
+    agent, so an instance only costs its model and its machine.
+
+    Args:
+        machines (Dict[str, type]): The state machine classes, by agent.
+        models (Dict[str, type]): The model classes, by agent. The models
+            are built with the process arguments.
+
+    Returns:
+        Dict[str, Any]: The state machines, by process name, as expected
+            by the `Network` class.
+    """
+    return {
+        name: machines[agent](models[agent](*arguments))
+        for name, agent, arguments in INSTANCES
+    }
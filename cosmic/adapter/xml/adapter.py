@@ -1,10 +1,16 @@
 import xml.etree.ElementTree as ET
 from abc import abstractmethod, ABC
-from typing import Dict, List
+from cosmic.adapter.entities.network_template import NetworkTemplate
+from cosmic.utils.profiler import Profiler
+from typing import Dict, Iterator, List, Optional, Tuple
 
 
 class Adapter(ABC):  # pragma: no cover
 
+    # version of the parsed data format, part of the parse cache key. Bump
+    # it whenever a change to the adapter changes the parsed data.
+    VERSION: str = "0"
+
     @staticmethod
     @abstractmethod
     def find_xml_root(self, xml_file: str) -> ET.Element:
@@ -20,12 +26,82 @@ class Adapter(ABC):  # pragma: no cover
 
     @staticmethod
     @abstractmethod
-    def get_xml_data(self, xml_file: str) -> dict:
+    def iter_xml_templates(
+        self,
+        xml_file: str,
+        declarations: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Tuple[str, ET.Element]]:
+        """Stream the agents declared in the xml file, one at a time,
+        without keeping the whole document in memory.
+
+        Args:
+            xml_file (str): Path to the xml file.
+            declarations (Optional[Dict[str, str]]): When informed, the
+                declarations shared by the agents are stored in it, to be
+                read by `parse_network`. Defaults to None.
+
+        Yields:
+            Iterator[Tuple[str, ET.Element]]: The agent name and the xml
+                element describing it.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def template_digest(self, template: ET.Element) -> str:
+        """Compute a content hash of the xml element describing an agent,
+        ignoring any data that does not change the generated code.
+
+        Args:
+            template (ET.Element): The xml element describing the agent.
+
+        Returns:
+            str: The hexadecimal digest of the agent.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def parse_template(self, template: ET.Element) -> dict:
+        """Parse a single agent from its xml element.
+
+        Args:
+            template (ET.Element): The xml element describing the agent.
+
+        Returns:
+            dict: The agent data in the Cosmic framework format.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def get_xml_data(
+        self,
+        xml_file: str,
+        streaming: bool = False,
+        jobs: int = 1,
+        compact: bool = False,
+        profiler: Optional[Profiler] = None,
+        declarations: Optional[Dict[str, str]] = None,
+    ) -> dict:
         """Extract the necessary data from the xml file, creating a dictionary
         used to create state machines in the expected Cosmic framework format.
 
         Args:
             xml_file (str): Path to the xml file.
+            streaming (bool): Parse the file one agent at a time, keeping
+                memory bounded by the largest agent instead of the whole
+                file. Defaults to False.
+            jobs (int): The amount of worker processes used to parse the
+                agents. Values lower than 1 use every available core.
+                Defaults to 1, which parses serially.
+            compact (bool): Return each agent as a compact, slotted
+                representation instead of a dictionary. Defaults to False.
+            profiler (Optional[Profiler]): Records the time spent reading
+                the file and parsing each agent. Defaults to None.
+            declarations (Optional[Dict[str, str]]): When informed, the
+                declarations shared by the agents are stored in it, to be
+                read by `parse_network`. Defaults to None.
 
         Returns:
             dict: A dictionary containing the necessary data to create state
@@ -33,6 +109,36 @@ class Adapter(ABC):  # pragma: no cover
         """
         raise NotImplementedError()
 
+    @staticmethod
+    @abstractmethod
+    def parse_network(self, declarations: Dict[str, str]) -> NetworkTemplate:
+        """Parse the data shared by the agents from the declarations
+        collected by `iter_xml_templates`.
+
+        Args:
+            declarations (Dict[str, str]): The declarations, by kind.
+
+        Returns:
+            NetworkTemplate: The network data in the Cosmic framework
+                format.
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    @abstractmethod
+    def get_network_data(self, xml_file: str) -> NetworkTemplate:
+        """Extract the data shared by the agents of the xml file, such as
+        the channels they synchronise on.
+
+        Args:
+            xml_file (str): Path to the xml file.
+
+        Returns:
+            NetworkTemplate: The network data in the Cosmic framework
+                format.
+        """
+        raise NotImplementedError()
+
     @staticmethod
     @abstractmethod
     def print_dict(self, result_dict: dict) -> None:
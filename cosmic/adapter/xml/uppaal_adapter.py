@@ -1,25 +1,99 @@
+import hashlib
+import os
 import re
 import xml.etree.ElementTree as ET
 
 from cosmic.adapter.xml.adapter import Adapter
+from cosmic.adapter.entities.compact_template import CompactMachineTemplate
 from cosmic.adapter.entities.machine_template import (
+    Parameter,
     State,
     Transition,
     MachineTemplate,
 )
-from cosmic.utils.string_oper import generate_function_name, to_snake_case
-from functools import reduce
+from cosmic.adapter.entities.network_template import (
+    CHANNEL_KINDS,
+    Instance,
+    NetworkTemplate,
+)
+from cosmic.adapter.xml.uppaal_expression import (
+    ExpressionError,
+    compile_guard,
+    compile_updates,
+    evaluate_constant,
+    parse_expression,
+    resolve_function,
+)
+from cosmic.utils.profiler import Profiler, profile_phase
+from cosmic.utils.string_oper import to_snake_case
+from concurrent.futures import ProcessPoolExecutor
 
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Any, Dict, Iterator, List, Tuple, Optional, Union
 from collections import defaultdict
 
 
+IndexedEdge = Tuple[ET.Element, str, str]
+
+_COMMENT_PATTERN = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+_CHANNEL_PATTERN = re.compile(
+    r"\b((?:urgent\s+)?(?:broadcast\s+)?)chan\s+([^;]+);",
+)
+_NAME_PATTERN = re.compile(r"[A-Za-z_]\w*")
+_PARAMETER_PATTERN = re.compile(
+    r"^(?P<type>.*?)(?P<name>[A-Za-z_]\w*)\s*(?P<dimensions>(?:\[[^\]]*\])*)$",
+    re.DOTALL,
+)
+_INSTANCE_PATTERN = re.compile(
+    r"^(?P<name>[A-Za-z_]\w*)\s*=\s*(?P<template>[A-Za-z_]\w*)\s*"
+    r"\((?P<arguments>.*)\)$",
+    re.DOTALL,
+)
+_SYSTEM_PATTERN = re.compile(r"^system\s+(?P<processes>.*)$", re.DOTALL)
+_CONSTANT_PATTERN = re.compile(
+    r"^(?:const\s+)?(?:int|double|bool)(?:\s*\[[^\]]*\])?\s+"
+    r"(?P<declarators>.+)$",
+    re.DOTALL,
+)
+_DECLARATOR_PATTERN = re.compile(
+    r"^(?P<name>[A-Za-z_]\w*)\s*(?:\[[^\]]*\]\s*)*=\s*(?P<value>.+)$",
+    re.DOTALL,
+)
+# the weight of a branch without a probability label
+DEFAULT_WEIGHT = 1
+
+
+def _split_top_level(text: str, separator: str) -> List[str]:
+    """Splits a text on the separators that are not nested in brackets or
+    parentheses, stripping each part and dropping the empty ones.
+    """
+    parts, depth, start = list(), 0, 0
+    for position, character in enumerate(text):
+        if character in "([{":
+            depth += 1
+        elif character in ")]}":
+            depth -= 1
+        elif character == separator and depth == 0:
+            parts.append(text[start:position])
+            start = position + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
 class UppaalAdapter(Adapter):
     """Adapter for Uppaal xml files. This class is responsible for parsing
     the xml file and extracting the necessary data into the general format
     that the Cosmic framework uses.
     """
 
+    VERSION: str = "5"
+    # below this amount of templates, a process pool costs more to start
+    # than it saves, so `get_xml_data` parses serially.
+    PARALLEL_MIN_TEMPLATES: int = 8
+    # attributes and elements that only describe the diagram layout, and
+    # do not change the generated code.
+    LAYOUT_ATTRIBUTES: Tuple[str, ...] = ("x", "y", "color")
+    LAYOUT_ELEMENTS: Tuple[str, ...] = ("nail",)
+
     @staticmethod
     def find_xml_root(xml_file: str) -> ET.Element:
         # documentations provided by the `Adapter` base class
@@ -46,59 +120,27 @@ class UppaalAdapter(Adapter):
                 functions.
         """
 
-        is_function = r"^\s*\w+\s*\(.*\)\s*$"
-        declared_functions = set()
+        # a dictionary keeps the functions in the order they are found, so
+        # the generated code does not depend on the string hash seed
+        declared_functions = dict()
         result_dict = defaultdict(list)
-        for condition in conditions:
-            if re.match(is_function, condition):
-                f_name = condition.split("(")[0].strip()
-                f_name = to_snake_case(f_name)
-                declared_functions.add(f_name)
-                result_dict["conditions"].append(f_name)
-            else:
-                f_name = generate_function_name(condition)
-                f_name = to_snake_case(f_name)
-                if f_name not in declared_functions:
-                    result_dict["conditions"].append(f_name)
-                    declared_functions.add(f_name)
-        for declaration in unless:
-            if re.match(is_function, declaration):
-                f_name = declaration.split("(")[0].strip()
-                f_name = to_snake_case(f_name)
-                declared_functions.add(f_name)
-                result_dict["unless"].append(f_name)
-            else:
-                f_name = generate_function_name(declaration)
-                f_name = to_snake_case(f_name)
-                if f_name not in declared_functions:
-                    result_dict["unless"].append(f_name)
-                    declared_functions.add(f_name)
+        for key, expressions in (("conditions", conditions),
+                                 ("unless", unless)):
+            for expression in expressions:
+                is_call, f_name = resolve_function(expression)
+                if is_call or f_name not in declared_functions:
+                    result_dict[key].append(f_name)
+                    declared_functions[f_name] = None
         result_dict["declared_functions"] = list(declared_functions)
         return dict(result_dict)
 
     @staticmethod
     def filter_conditions(label_text: str) -> Dict[str, List[str]]:
         # documentations provided by the `Adapter` base class
-        conditions = list()
-        unless = list()
-
-        guards_sublists = [guard.split("||")
-                           for guard in label_text.split("&&")]
-        guards = reduce(
-            lambda acc, curr: acc.extend(curr) or acc,
-            guards_sublists,
-            list(),
-        )
-        for guard in guards:
-            text = guard.strip()
-            if text.startswith("!"):
-                unless.append(text[1:])
-            else:
-                conditions.append(text)
-
+        conditions, unless = compile_guard(label_text or "", canonical=False)
         declared_functions_dict = UppaalAdapter.declare_functions(
-            conditions,
-            unless,
+            list(conditions),
+            list(unless),
         )
 
         return declared_functions_dict
@@ -114,13 +156,39 @@ class UppaalAdapter(Adapter):
         Returns:
             Dict[str, List[str]]: A dictionary containing the updates.
         """
-        updates = [updt.strip() for updt in label_text.split(",")]
-        result_dict = UppaalAdapter.declare_functions(updates, [])
+        updates = compile_updates(label_text or "", canonical=False)
+        result_dict = UppaalAdapter.declare_functions(list(updates), [])
         return {
-            "after": result_dict["conditions"],
+            "after": result_dict.get("conditions", []),
             "declared_functions": result_dict["declared_functions"],
         }
 
+    @staticmethod
+    def filter_synchronisation(label_text: str) -> Dict[str, str]:
+        """Process a synchronisation label, such as `ch!` or `ch?`,
+        returning a dictionary with the channel name under the `send` or
+        the `receive` key.
+
+        Args:
+            label_text (str): The label text to be processed.
+
+        Raises:
+            ExpressionError: If the label is neither a send nor a receive.
+
+        Returns:
+            Dict[str, str]: A dictionary containing the channel name, or
+                an empty dictionary for an empty label.
+        """
+        text = (label_text or "").strip()
+        if not text:
+            return dict()
+        channel = text[:-1].strip()
+        if text[-1] == "!" and channel:
+            return {"send": channel}
+        if text[-1] == "?" and channel:
+            return {"receive": channel}
+        raise ExpressionError(f"Invalid synchronisation: {label_text!r}")
+
     @staticmethod
     def evaluate_transition(
         transition: ET.Element,
@@ -164,13 +232,47 @@ class UppaalAdapter(Adapter):
                 result_dict = UppaalAdapter.filter_updates(label.text)
                 content["after"] = result_dict["after"]
                 declared_functions.update(result_dict["declared_functions"])
+            if label.get("kind") == "synchronisation":
+                content.update(
+                    UppaalAdapter.filter_synchronisation(label.text),
+                )
 
         return has_label, content
 
+    @staticmethod
+    def index_edges(
+        element_transitions: List[ET.Element],
+    ) -> Tuple[List[IndexedEdge], Dict[str, List[IndexedEdge]]]:
+        """Indexes the edges of a template, resolving the source and target
+        references of each edge only once.
+
+        Args:
+            element_transitions (List[ET.Element]): The list of transitions
+                in the xml file.
+
+        Returns:
+            Tuple[List[IndexedEdge], Dict[str, List[IndexedEdge]]]: A tuple
+                containing the edges in document order, as
+                `(edge, source_ref, target_ref)` tuples, and the same edges
+                grouped by their source reference.
+        """
+        edges = list()
+        edges_by_source = defaultdict(list)
+        for edge in element_transitions:
+            indexed_edge = (
+                edge,
+                edge.find("source").get("ref"),
+                edge.find("target").get("ref"),
+            )
+            edges.append(indexed_edge)
+            edges_by_source[indexed_edge[1]].append(indexed_edge)
+        return edges, dict(edges_by_source)
+
     @staticmethod
     def find_branchpoint_target(
         branchpoint_id: str,
         edges_list: List[ET.Element],
+        edges_by_source: Optional[Dict[str, List[IndexedEdge]]] = None,
     ) -> List[ET.Element]:
         """Finds all the targets of a given branchpoint id in a list of
         edges.
@@ -178,16 +280,18 @@ class UppaalAdapter(Adapter):
         Args:
             branchpoint_id (str): The branchpoint id to be searched.
             edges_list (List[ET.Element]): The list of edges in the xml file.
+            edges_by_source (Optional[Dict[str, List[IndexedEdge]]]): The
+                edges indexed by source reference, as built by
+                `index_edges`. When informed, the lookup does not scan
+                `edges_list`. Defaults to None.
 
         Returns:
             List[ET.Element]: A list of the target elements of the given
                 branchpoint id.
         """
-        targets = list(filter(
-            lambda x: x.find('source').get('ref') == branchpoint_id,
-            edges_list,
-        ))
-        return targets
+        if edges_by_source is None:
+            _, edges_by_source = UppaalAdapter.index_edges(edges_list)
+        return [edge for edge, _, _ in edges_by_source.get(branchpoint_id, [])]
 
     @staticmethod
     def build_transition(
@@ -231,14 +335,95 @@ class UppaalAdapter(Adapter):
                 transition[key] = value
         return transition
 
+    @staticmethod
+    def parse_constants(declaration_text: str) -> Dict[str, Any]:
+        """Finds the initial values of the `int`, `double` and `bool`
+        variables of a declaration, such as `int failure[2] = {1, 99};`.
+        Arrays are tuples, and the declarations whose value is not a
+        constant expression are left out.
+
+        Args:
+            declaration_text (str): The declaration text.
+
+        Returns:
+            Dict[str, Any]: The initial values, by variable name.
+        """
+        constants = dict()
+
+        def evaluate(value: str) -> Any:
+            if value.startswith("{") and value.endswith("}"):
+                return tuple(
+                    evaluate(item)
+                    for item in _split_top_level(value[1:-1], ",")
+                )
+            return evaluate_constant(parse_expression(value), constants)
+
+        text = _COMMENT_PATTERN.sub("", declaration_text or "")
+        for statement in _split_top_level(text, ";"):
+            match = _CONSTANT_PATTERN.match(statement)
+            if match is None:
+                continue
+            for declarator in _split_top_level(
+                match.group("declarators"),
+                ",",
+            ):
+                match = _DECLARATOR_PATTERN.match(declarator)
+                if match is None:
+                    continue
+                try:
+                    constants[match.group("name")] = evaluate(
+                        match.group("value").strip(),
+                    )
+                except ExpressionError:
+                    continue
+        return constants
+
+    @staticmethod
+    def evaluate_weight(
+        label_text: Optional[str],
+        constants: Dict[str, Any],
+    ) -> Union[int, float, str]:
+        """Evaluates the probability label of a branchpoint edge. Weights
+        reading only literals and constants are computed, see
+        `parse_constants`, while the others are read from a model function
+        whenever a branch is picked.
+
+        Args:
+            label_text (Optional[str]): The probability label text, or None
+                for the default weight.
+            constants (Dict[str, Any]): The constant values, by name.
+
+        Raises:
+            ExpressionError: If the label is not a valid expression, or if
+                the weight is not a non-negative number.
+
+        Returns:
+            Union[int, float, str]: The weight, or the name of the model
+                function computing it.
+        """
+        if label_text is None or not label_text.strip():
+            return DEFAULT_WEIGHT
+        node = parse_expression(label_text)
+        try:
+            weight = evaluate_constant(node, constants)
+        except ExpressionError:
+            return resolve_function(label_text)[1]
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) \
+                or weight < 0:
+            raise ExpressionError(f"Invalid weight: {label_text!r}")
+        return weight
+
     @staticmethod
     def parse_transitions(
         id_to_state: Dict[str, str],
         element_transitions: List[ET.Element],
         element_branchpoints: List[ET.Element] = list(),
+        constants: Optional[Dict[str, Any]] = None,
     ) -> List[Transition]:
         """Parses the transitions from the xml file, returning a list of
-        Transition objects.
+        Transition objects. The edges leaving a branchpoint become
+        transitions from the source of the edge reaching it, holding the
+        branchpoint id and their probability weight.
 
         Args:
             id_to_state (Dict[str, str]): A dictionary mapping the state ids
@@ -247,26 +432,27 @@ class UppaalAdapter(Adapter):
                 in the xml file.
             element_branchpoints (List[ET.Element]): The list of branchpoints.
                 Defaults to an empty list.
+            constants (Optional[Dict[str, Any]]): The constant values the
+                probability weights may read, see `parse_constants`.
+                Defaults to None.
 
         Returns:
             List[Transition]: A list of Transition objects.
         """
+        constants = constants or dict()
         transitions_list = list()
-        branchpoint_ids = [bp.get("id") for bp in element_branchpoints]
+        branchpoint_ids = {bp.get("id") for bp in element_branchpoints}
+        edges, edges_by_source = UppaalAdapter.index_edges(
+            element_transitions,
+        )
 
         visited_pairs = set()
-        for tr in element_transitions:
-            source_id = tr.find("source").get("ref")
-            target_id = tr.find("target").get("ref")
+        for tr, source_id, target_id in edges:
             if (source_id, target_id) not in visited_pairs:
                 visited_pairs.add((source_id, target_id))
                 if target_id in branchpoint_ids:
-                    target_edges = UppaalAdapter.find_branchpoint_target(
-                        target_id,
-                        element_transitions,
-                    )
-                    for edge in target_edges:
-                        branch_target_id = edge.find("target").get("ref")
+                    target_edges = edges_by_source.get(target_id, [])
+                    for edge, _, branch_target_id in target_edges:
                         visited_pairs.add((target_id, branch_target_id))
                         transition = UppaalAdapter.build_transition(
                             id_to_state_map=id_to_state,
@@ -274,6 +460,12 @@ class UppaalAdapter(Adapter):
                             source_id=source_id,
                             target_state_id=branch_target_id,
                         )
+                        probability = edge.find("label[@kind='probability']")
+                        transition["branchpoint"] = target_id
+                        transition["weight"] = UppaalAdapter.evaluate_weight(
+                            None if probability is None else probability.text,
+                            constants,
+                        )
                         transitions_list.append(transition)
                 elif source_id in branchpoint_ids:
                     continue
@@ -293,7 +485,9 @@ class UppaalAdapter(Adapter):
     ) -> Tuple[List[Transition], List[str]]:
         """Filters the declared functions from the transitions list,
         returning a tuple containing the filtered transitions and the
-        declared functions. The declared functions are unique.
+        declared functions. The declared functions are unique, in the
+        order they are first found, and include the model functions
+        computing the probability weights.
 
         Args:
             transitions_list (List[dict]): The list of transitions.
@@ -302,12 +496,14 @@ class UppaalAdapter(Adapter):
             Tuple[List[Transition], List[str]]: A tuple containing the
                 filtered transitions and the declared functions.
         """
-        declared_functions = set()
+        declared_functions = dict()
         updated_transitions = list()
         for transition in transitions_list:
             for func_list in transition.values():
                 if isinstance(func_list, list):
-                    declared_functions.update(func_list)
+                    declared_functions.update(dict.fromkeys(func_list))
+            if isinstance(transition.get('weight'), str):
+                declared_functions[transition['weight']] = None
             if transition.get('declared_functions', None) is not None:
                 del transition['declared_functions']
             updated_transitions.append(transition)
@@ -338,34 +534,68 @@ class UppaalAdapter(Adapter):
     @staticmethod
     def build_state(
         location: ET.Element,
-    ) -> Tuple[State, Set[str]]:
+    ) -> Tuple[State, List[str]]:
         """Builds a state object from the given location element.
 
         Args:
             location (ET.Element): The location element.
 
         Returns:
-            Tuple[State, Set[str]]: A tuple containing the state object
-                and a set of declared functions.
+            Tuple[State, List[str]]: A tuple containing the state object
+                and the unique declared functions, in order.
         """
         state_name = to_snake_case(location.find("name").text)
         on_enter_label = location.find('label[@kind="testcodeEnter"]')
         on_exit_label = location.find('label[@kind="testcodeExit"]')
-        declared_functions = set()
+        declared_functions = dict()
         on_enter, on_exit = None, None
         state = State(name=state_name)
         if on_enter_label is not None:
             on_enter = UppaalAdapter._format_state_functions(
                 on_enter_label.text)
-            declared_functions.update(on_enter)
+            declared_functions.update(dict.fromkeys(on_enter))
             state['on_enter'] = on_enter
 
         if on_exit_label is not None:
             on_exit = UppaalAdapter._format_state_functions(on_exit_label.text)
-            declared_functions.update(on_exit)
+            declared_functions.update(dict.fromkeys(on_exit))
             state['on_exit'] = on_exit
 
-        return state, declared_functions
+        return state, list(declared_functions)
+
+    @staticmethod
+    def parse_parameters(parameter_text: str) -> List[Parameter]:
+        """Parses the parameter list of a template, such as
+        `int sector_type, const int &limit`. Array dimensions are kept in
+        the parameter type.
+
+        Args:
+            parameter_text (str): The parameter list text.
+
+        Raises:
+            ExpressionError: If a parameter has no name.
+
+        Returns:
+            List[Parameter]: The parameters, in declaration order.
+        """
+        parameters = list()
+        text = _COMMENT_PATTERN.sub("", parameter_text or "")
+        for declaration in _split_top_level(text, ","):
+            match = _PARAMETER_PATTERN.match(declaration)
+            if match is None or not match.group("type").strip():
+                raise ExpressionError(
+                    f"Invalid parameter {declaration!r}.",
+                )
+            type_name = " ".join(
+                (match.group("type") + match.group("dimensions")).split(),
+            )
+            parameters.append(
+                Parameter(
+                    name=to_snake_case(match.group("name")),
+                    type=type_name,
+                ),
+            )
+        return parameters
 
     @staticmethod
     def parse_template(template: ET.Element) -> MachineTemplate:
@@ -385,25 +615,32 @@ class UppaalAdapter(Adapter):
 
         id_state_map = dict()
         states = list()
-        model_functions = set()
+        model_functions = dict()
         for loc in locations:
             state_name = to_snake_case(loc.find('name').text)
             state_id = loc.get('id')
             state, dec_functions = UppaalAdapter.build_state(loc)
-            model_functions.update(dec_functions)
+            model_functions.update(dict.fromkeys(dec_functions))
             id_state_map[state_id] = state_name
             states.append(state)
 
+        constants = dict()
+        if branchpoints:
+            declaration = template.find('declaration')
+            constants = UppaalAdapter.parse_constants(
+                None if declaration is None else declaration.text,
+            )
         transitions_list = UppaalAdapter.parse_transitions(
             id_to_state=id_state_map,
             element_transitions=transitions,
             element_branchpoints=branchpoints,
+            constants=constants,
         )
 
         transitions, declared_functions = UppaalAdapter.filter_declarations(
             transitions_list,
         )
-        model_functions.update(set(declared_functions))
+        model_functions.update(dict.fromkeys(declared_functions))
         initial_state = id_state_map.get(initial_state_ref)
         machine_template = MachineTemplate(
             initial_state=initial_state,
@@ -412,21 +649,342 @@ class UppaalAdapter(Adapter):
         )
         if len(model_functions) > 0:
             machine_template['declared_functions'] = list(model_functions)
+        parameter = template.find('parameter')
+        if parameter is not None and (parameter.text or "").strip():
+            machine_template['parameters'] = UppaalAdapter.parse_parameters(
+                parameter.text,
+            )
         return machine_template
 
     @staticmethod
-    def get_xml_data(xml_file: str) -> Dict[str, MachineTemplate]:
+    def get_agent_name(template: ET.Element) -> str:
+        """Resolves the agent name of a template element, which is the
+        template name without underscores.
+
+        Args:
+            template (ET.Element): The template element.
+
+        Returns:
+            str: The agent name.
+        """
+        return (template.find("name").text).replace("_", "")
+
+    @staticmethod
+    def template_digest(template: ET.Element) -> str:
+        """Computes a content hash of a template subtree. The subtree is
+        normalized before hashing: attributes are sorted, surrounding
+        whitespace is stripped and layout-only data (coordinates, colors
+        and nails) is ignored, so moving elements around in the UPPAAL
+        editor does not change the digest.
+
+        Args:
+            template (ET.Element): The template element.
+
+        Returns:
+            str: The hexadecimal sha256 digest of the template.
+        """
+        digest = hashlib.sha256()
+        pending = [template]
+        while pending:
+            element = pending.pop()
+            attributes = sorted(
+                (key, value) for key, value in element.attrib.items()
+                if key not in UppaalAdapter.LAYOUT_ATTRIBUTES
+            )
+            children = [
+                child for child in element
+                if child.tag not in UppaalAdapter.LAYOUT_ELEMENTS
+            ]
+            digest.update(repr((
+                element.tag,
+                attributes,
+                (element.text or "").strip(),
+                len(children),
+            )).encode())
+            pending.extend(reversed(children))
+        return digest.hexdigest()
+
+    # top level elements whose text `parse_network` reads
+    NETWORK_ELEMENTS: Tuple[str, ...] = ("declaration", "system")
+
+    @staticmethod
+    def _iter_top_level_elements(xml_file: str) -> Iterator[ET.Element]:
+        """Streams the top level elements of the xml file with `iterparse`.
+        Once the consumer moves on, each element is cleared and detached
+        from the root, so only the element being yielded is kept in
+        memory.
+
+        Args:
+            xml_file (str): Path to the xml file.
+
+        Yields:
+            Iterator[ET.Element]: The top level elements, in document
+                order.
+        """
+        depth = 0
+        root = None
+        for event, element in ET.iterparse(xml_file, events=("start", "end")):
+            if event == "start":
+                if root is None:
+                    root = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            yield element
+            element.clear()
+            root.remove(element)
+
+    @staticmethod
+    def iter_xml_templates(
+        xml_file: str,
+        declarations: Optional[Dict[str, str]] = None,
+    ) -> Iterator[Tuple[str, ET.Element]]:
+        """Streams the templates of the xml file, yielding one agent name
+        and its template element at a time.
+        The file is read with `iterparse`, so only the template currently
+        being yielded is kept in memory: once the consumer moves on, the
+        template subtree is cleared and detached from the root, as is any
+        other top level element (declarations, system, queries).
+
+        Args:
+            xml_file (str): Path to the xml file.
+            declarations (Optional[Dict[str, str]]): When informed, the text
+                of the global declaration and of the system declaration is
+                stored in it, by tag, as the stream reaches them, to be
+                read by `parse_network`. Defaults to None.
+
+        Yields:
+            Iterator[Tuple[str, ET.Element]]: The agent name and its
+                template element.
+        """
+        for element in UppaalAdapter._iter_top_level_elements(xml_file):
+            if element.tag == "template":
+                yield UppaalAdapter.get_agent_name(element), element
+            elif (
+                declarations is not None
+                and element.tag in UppaalAdapter.NETWORK_ELEMENTS
+            ):
+                declarations[element.tag] = element.text or ""
+
+    @staticmethod
+    def parse_channels(declaration_text: str) -> Dict[str, CHANNEL_KINDS]:
+        """Finds the channels declared in a declaration text, such as
+        `chan a, b;` or `broadcast chan c[3];`. Urgent channels are
+        treated as regular ones, and channel arrays by their name.
+
+        Args:
+            declaration_text (str): The declaration text to be processed.
+
+        Returns:
+            Dict[str, CHANNEL_KINDS]: The kind of each channel, by name.
+        """
+        channels = dict()
+        text = _COMMENT_PATTERN.sub("", declaration_text or "")
+        for prefix, names in _CHANNEL_PATTERN.findall(text):
+            kind = "broadcast" if "broadcast" in prefix else "binary"
+            for name in names.split(","):
+                match = _NAME_PATTERN.search(name)
+                if match is not None:
+                    channels[match.group()] = kind
+        return channels
+
+    @staticmethod
+    def parse_system(system_text: str) -> List[Instance]:
+        """Finds the processes of a system declaration, such as
+        `sector_icu = Sector(0); system sector_icu, Robot;`. A process is
+        either declared by instantiating a template, or is a template
+        listed in the `system` line directly. Process priorities (`<`) are
+        ignored, and so are the partial instantiations.
+
+        Args:
+            system_text (str): The system declaration text.
+
+        Raises:
+            ExpressionError: If the arguments of a process are not valid
+                expressions.
+
+        Returns:
+            List[Instance]: The processes, in the `system` line order.
+        """
+        declared, processes = dict(), list()
+        text = _COMMENT_PATTERN.sub("", system_text or "")
+        for statement in _split_top_level(text, ";"):
+            match = _INSTANCE_PATTERN.match(statement)
+            if match is not None:
+                declared[match.group("name")] = (
+                    match.group("template"),
+                    match.group("arguments"),
+                )
+                continue
+            match = _SYSTEM_PATTERN.match(statement)
+            if match is not None:
+                processes.extend(
+                    _NAME_PATTERN.findall(match.group("processes")),
+                )
+
+        instances = list()
+        for process in processes:
+            template_name, arguments = declared.get(process, (process, ""))
+            instances.append(
+                Instance(
+                    name=process,
+                    agent=template_name.replace("_", ""),
+                    arguments=list(compile_updates(arguments)),
+                ),
+            )
+        return instances
+
+    @staticmethod
+    def parse_network(declarations: Dict[str, str]) -> NetworkTemplate:
         # documentations provided by the `Adapter` base class
-        root = UppaalAdapter.find_xml_root(xml_file)
-        result = {}
+        return NetworkTemplate(
+            channels=UppaalAdapter.parse_channels(
+                declarations.get("declaration"),
+            ),
+            instances=UppaalAdapter.parse_system(declarations.get("system")),
+        )
+
+    @staticmethod
+    def get_network_data(xml_file: str) -> NetworkTemplate:
+        # documentations provided by the `Adapter` base class
+        declarations = dict()
+        for _ in UppaalAdapter.iter_xml_templates(xml_file, declarations):
+            pass
+        return UppaalAdapter.parse_network(declarations)
+
+    @staticmethod
+    def _parse_serialized_template(template_data: bytes) -> MachineTemplate:
+        """Parses a template serialized with `ET.tostring`. Used by the
+        worker processes of `get_xml_data`, since xml elements are not
+        shared across processes.
+
+        Args:
+            template_data (bytes): The serialized template element.
+
+        Returns:
+            MachineTemplate: A MachineTemplate object.
+        """
+        return UppaalAdapter.parse_template(ET.fromstring(template_data))
+
+    @staticmethod
+    def _parse_templates_in_pool(
+        templates: List[Tuple[str, bytes]],
+        jobs: int,
+    ) -> Dict[str, MachineTemplate]:
+        """Parses the serialized templates across a process pool, keeping
+        the original template order in the result.
+
+        Args:
+            templates (List[Tuple[str, bytes]]): The agent names and their
+                serialized template elements.
+            jobs (int): The maximum amount of worker processes.
 
-        for template in root.findall(".//template"):
-            # parse template
-            agent_name = (template.find("name").text).replace("_", "")
-            machine_template = UppaalAdapter.parse_template(template)
-            result[agent_name] = machine_template
+        Returns:
+            Dict[str, MachineTemplate]: The parsed templates by agent name.
+        """
+        workers = min(jobs, len(templates))
+        chunksize = max(1, len(templates) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            machine_templates = executor.map(
+                UppaalAdapter._parse_serialized_template,
+                [template_data for _, template_data in templates],
+                chunksize=chunksize,
+            )
+            return {
+                agent_name: machine_template
+                for (agent_name, _), machine_template in zip(
+                    templates,
+                    machine_templates,
+                )
+            }
 
-        return result
+    @staticmethod
+    def parse_compact_template(
+        template: ET.Element,
+    ) -> CompactMachineTemplate:
+        """Parses a template into the compact representation, so the
+        intermediate dictionaries are released right away.
+
+        Args:
+            template (ET.Element): The template element.
+
+        Returns:
+            CompactMachineTemplate: A CompactMachineTemplate object.
+        """
+        return CompactMachineTemplate.from_dict(
+            UppaalAdapter.parse_template(template),
+        )
+
+    @staticmethod
+    def get_xml_data(
+        xml_file: str,
+        streaming: bool = False,
+        jobs: int = 1,
+        compact: bool = False,
+        profiler: Optional[Profiler] = None,
+        declarations: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Union[MachineTemplate, CompactMachineTemplate]]:
+        # documentations provided by the `Adapter` base class
+        if jobs <= 0:
+            jobs = os.cpu_count() or 1
+
+        if streaming:
+            templates = UppaalAdapter.iter_xml_templates(
+                xml_file,
+                declarations,
+            )
+        else:
+            with profile_phase(profiler, "find_xml_root"):
+                root = UppaalAdapter.find_xml_root(xml_file)
+            templates = [
+                (UppaalAdapter.get_agent_name(template), template)
+                for template in root.findall(".//template")
+            ]
+            if declarations is not None:
+                for tag in UppaalAdapter.NETWORK_ELEMENTS:
+                    element = root.find(tag)
+                    if element is not None:
+                        declarations[tag] = element.text or ""
+            if len(templates) < UppaalAdapter.PARALLEL_MIN_TEMPLATES:
+                jobs = 1
+
+        if jobs == 1:
+            parse = (
+                UppaalAdapter.parse_compact_template if compact
+                else UppaalAdapter.parse_template
+            )
+            result_dict = dict()
+            for agent_name, template in templates:
+                with profile_phase(profiler, "parse_template", agent_name):
+                    result_dict[agent_name] = parse(template)
+            return result_dict
+
+        serialized_templates = [
+            (agent_name, ET.tostring(template))
+            for agent_name, template in templates
+        ]
+        if len(serialized_templates) < UppaalAdapter.PARALLEL_MIN_TEMPLATES:
+            result_dict = dict()
+            for agent_name, data in serialized_templates:
+                with profile_phase(profiler, "parse_template", agent_name):
+                    result_dict[agent_name] = (
+                        UppaalAdapter._parse_serialized_template(data)
+                    )
+        else:
+            # the workers are not profiled, so the pool counts as a whole
+            with profile_phase(profiler, "parse_templates_in_pool"):
+                result_dict = UppaalAdapter._parse_templates_in_pool(
+                    serialized_templates,
+                    jobs,
+                )
+        if compact:
+            for agent_name, machine_template in result_dict.items():
+                result_dict[agent_name] = CompactMachineTemplate.from_dict(
+                    machine_template,
+                )
+        return result_dict
 
     @staticmethod
     def print_dict(result_dict: dict) -> None:  # pragma: no cover
@@ -0,0 +1,665 @@
+import keyword
+import operator
+import re
+
+from cosmic.utils.string_oper import generate_function_name, to_snake_case
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union
+
+
+# each distinct label text is compiled only once per run; the bound keeps
+# long batch runs from growing the caches without limit.
+LABEL_CACHE_SIZE = 4096
+
+ASSIGNMENT_OPERATORS = {
+    "=", ":=", "+=", "-=", "*=", "/=", "%=", "|=", "&=", "^=", "<<=", ">>=",
+}
+# the conditional `a ? b : c` binds tighter than the assignments only, and
+# the body of a binder, such as `forall (i : int[0, 3]) ready[i]`, extends
+# as far to the right as a conditional does.
+CONDITIONAL_PRECEDENCE = 2
+BINARY_PRECEDENCE = {
+    **{operator: 1 for operator in ASSIGNMENT_OPERATORS},
+    "imply": 3,
+    "||": 4,
+    "&&": 5,
+    "|": 6,
+    "^": 7,
+    "&": 8,
+    "==": 9,
+    "!=": 9,
+    "<": 10,
+    "<=": 10,
+    ">": 10,
+    ">=": 10,
+    "<<": 11,
+    ">>": 11,
+    "+": 12,
+    "-": 12,
+    "*": 13,
+    "/": 13,
+    "%": 13,
+}
+UNARY_PRECEDENCE = 14
+POSTFIX_PRECEDENCE = 15
+BINDERS = {"forall", "exists", "sum"}
+KEYWORD_OPERATORS = {
+    "and": "&&",
+    "or": "||",
+    "not": "!",
+    "imply": "imply",
+    ":=": "=",
+}
+
+_TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<skip>\s+|//[^\n]*|/\*.*?\*/)
+    |(?P<number>\d+(?:\.\d+)?)
+    |(?P<name>[A-Za-z_]\w*)
+    |(?P<operator><<=|>>=|&&|\|\||==|!=|<=|>=|<<|>>|\+\+|--|:=|\+=|-=|\*=
+        |/=|%=|\|=|&=|\^=|[-+*/%<>!=&|^~?:.,()\[\]])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_INVALID_IDENTIFIER_PATTERN = re.compile(r"[\W_]+")
+# the operators folded by `evaluate_constant`
+_CONSTANT_UNARY = {"-": operator.neg, "+": operator.pos, "!": operator.not_}
+_CONSTANT_BINARY = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class ExpressionError(ValueError):
+    """Raised when a label text is not a valid UPPAAL expression."""
+
+
+class Token(NamedTuple):
+    """A lexical token of an UPPAAL expression. `kind` is one of
+    `number`, `name` or `operator`.
+    """
+    kind: str
+    text: str
+
+
+class Literal(NamedTuple):
+    """A numeric or boolean literal."""
+    value: str
+
+
+class Name(NamedTuple):
+    """A variable, constant or function identifier."""
+    id: str
+
+
+class Call(NamedTuple):
+    """A function call, such as `is_valid()` or `reset(queue, 0)`."""
+    func: "Node"
+    args: Tuple["Node", ...]
+
+
+class Index(NamedTuple):
+    """An array access, such as `ticket_queue[icu]`."""
+    target: "Node"
+    index: "Node"
+
+
+class Member(NamedTuple):
+    """A structure field access, such as `robot.position`."""
+    target: "Node"
+    name: str
+
+
+class Unary(NamedTuple):
+    """A prefix operation, such as `!activated()` or `++retries`."""
+    op: str
+    operand: "Node"
+
+
+class Postfix(NamedTuple):
+    """A postfix operation, such as `retries++`."""
+    op: str
+    operand: "Node"
+
+
+class Binary(NamedTuple):
+    """A binary operation, including logical connectives and
+    assignments.
+    """
+    op: str
+    left: "Node"
+    right: "Node"
+
+
+class Conditional(NamedTuple):
+    """A conditional expression, such as `busy ? wait : 0`."""
+    test: "Node"
+    body: "Node"
+    orelse: "Node"
+
+
+class Binder(NamedTuple):
+    """A `forall`, `exists` or `sum` expression binding a name over the
+    values of a type, such as `forall (i : int[0, 3]) ready[i]`. `bounds`
+    holds the lower and upper bounds of a ranged type, if any.
+    """
+    op: str
+    name: str
+    type: str
+    bounds: Tuple["Node", ...]
+    body: "Node"
+
+
+Node = Union[
+    Literal, Name, Call, Index, Member, Unary, Postfix, Binary, Conditional,
+    Binder,
+]
+
+
+def _scan(text: str) -> List[Tuple[Token, int, int]]:
+    """Splits an UPPAAL expression into tokens, along with the start and
+    end offsets of each token in the text. See `tokenize`.
+    """
+    tokens = list()
+    position = 0
+    while position < len(text):
+        match = _TOKEN_PATTERN.match(text, position)
+        if match is None:
+            raise ExpressionError(
+                f"Unexpected character {text[position]!r} in {text!r}.",
+            )
+        position = match.end()
+        kind = match.lastgroup
+        if kind == "skip":
+            continue
+        value = match.group()
+        if value in KEYWORD_OPERATORS:
+            kind, value = "operator", KEYWORD_OPERATORS[value]
+        tokens.append((Token(kind, value), match.start(), match.end()))
+    return tokens
+
+
+def tokenize(text: str) -> List[Token]:
+    """Splits an UPPAAL expression into tokens, dropping whitespace and
+    comments. The keyword operators `and`, `or`, `not` and `:=` are
+    normalized to their symbolic form.
+
+    Args:
+        text (str): The expression text.
+
+    Raises:
+        ExpressionError: If the text contains an unknown character.
+
+    Returns:
+        List[Token]: The tokens of the expression.
+    """
+    return [token for token, _, _ in _scan(text)]
+
+
+class _Parser:
+    """Precedence climbing parser for the UPPAAL guard and update
+    language. The text span of each parsed node is kept in `spans`, by
+    node id, see `source`.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        scanned = _scan(text)
+        self.tokens = [token for token, _, _ in scanned]
+        self.offsets = [(start, end) for _, start, end in scanned]
+        self.spans: Dict[int, Tuple[int, int]] = dict()
+        self.position = 0
+
+    def mark(self, node: Node, start: int) -> Node:
+        # the innermost span is kept, so parentheses are not part of it
+        self.spans.setdefault(
+            id(node),
+            (self.offsets[start][0], self.offsets[self.position - 1][1]),
+        )
+        return node
+
+    def source(self, node: Node) -> str:
+        """Returns the text of a node as written in the parsed text."""
+        start, end = self.spans[id(node)]
+        return self.text[start:end]
+
+    def peek(self) -> Optional[Token]:
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return None
+
+    def advance(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise ExpressionError(f"Unexpected end of {self.text!r}.")
+        self.position += 1
+        return token
+
+    def expect(self, text: str) -> Token:
+        token = self.advance()
+        if token.text != text:
+            raise ExpressionError(
+                f"Expected {text!r} but found {token.text!r} in "
+                f"{self.text!r}.",
+            )
+        return token
+
+    def at_operator(self, *texts: str) -> bool:
+        token = self.peek()
+        return (
+            token is not None
+            and token.kind == "operator"
+            and token.text in texts
+        )
+
+    def parse_expression(self, min_precedence: int = 1) -> Node:
+        start = self.position
+        left = self.parse_unary()
+        while True:
+            token = self.peek()
+            if token is None or token.kind != "operator":
+                return left
+            if token.text == "?":
+                if CONDITIONAL_PRECEDENCE < min_precedence:
+                    return left
+                self.advance()
+                body = self.parse_expression()
+                self.expect(":")
+                orelse = self.parse_expression(CONDITIONAL_PRECEDENCE)
+                left = self.mark(Conditional(left, body, orelse), start)
+                continue
+            precedence = BINARY_PRECEDENCE.get(token.text)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.advance()
+            if token.text in ASSIGNMENT_OPERATORS:
+                right = self.parse_expression(precedence)
+            else:
+                right = self.parse_expression(precedence + 1)
+            left = self.mark(Binary(token.text, left, right), start)
+
+    def parse_unary(self) -> Node:
+        start = self.position
+        if self.at_operator("!", "-", "+", "~", "++", "--"):
+            op = self.advance().text
+            return self.mark(Unary(op, self.parse_unary()), start)
+        return self.mark(self.parse_postfix(), start)
+
+    def at_binder(self) -> bool:
+        # binders are told apart from calls by their `(name :` opening
+        return (
+            self.position + 2 < len(self.tokens)
+            and self.tokens[self.position].text == "("
+            and self.tokens[self.position + 1].kind == "name"
+            and self.tokens[self.position + 2].text == ":"
+        )
+
+    def parse_binder(self, op: str) -> Node:
+        self.expect("(")
+        name = self.advance().text
+        self.expect(":")
+        type_token = self.advance()
+        if type_token.kind != "name":
+            raise ExpressionError(f"Expected a type name in {self.text!r}.")
+        bounds = tuple()
+        if self.at_operator("["):
+            self.advance()
+            lower = self.parse_expression()
+            self.expect(",")
+            upper = self.parse_expression()
+            self.expect("]")
+            bounds = (lower, upper)
+        self.expect(")")
+        body = self.parse_expression(CONDITIONAL_PRECEDENCE)
+        return Binder(op, name, type_token.text, bounds, body)
+
+    def parse_postfix(self) -> Node:
+        node = self.parse_primary()
+        while True:
+            if self.at_operator("("):
+                self.advance()
+                args = list()
+                if not self.at_operator(")"):
+                    args.append(self.parse_expression())
+                    while self.at_operator(","):
+                        self.advance()
+                        args.append(self.parse_expression())
+                self.expect(")")
+                node = Call(node, tuple(args))
+            elif self.at_operator("["):
+                self.advance()
+                index = self.parse_expression()
+                self.expect("]")
+                node = Index(node, index)
+            elif self.at_operator("."):
+                self.advance()
+                token = self.advance()
+                if token.kind != "name":
+                    raise ExpressionError(
+                        f"Expected a field name in {self.text!r}.",
+                    )
+                node = Member(node, token.text)
+            elif self.at_operator("++", "--"):
+                node = Postfix(self.advance().text, node)
+            else:
+                return node
+
+    def parse_primary(self) -> Node:
+        token = self.advance()
+        if token.kind == "number":
+            return Literal(token.text)
+        if token.kind == "name":
+            if token.text in ("true", "false"):
+                return Literal(token.text)
+            if token.text in BINDERS and self.at_binder():
+                return self.parse_binder(token.text)
+            return Name(token.text)
+        if token.text == "(":
+            node = self.parse_expression()
+            self.expect(")")
+            return node
+        raise ExpressionError(
+            f"Unexpected {token.text!r} in {self.text!r}.",
+        )
+
+    def parse_list(self) -> Tuple[Node, ...]:
+        """Parses a comma separated list of expressions, as found in
+        update labels. An empty text results in an empty tuple.
+        """
+        if self.peek() is None:
+            return tuple()
+        nodes = [self.parse_expression()]
+        while self.at_operator(","):
+            self.advance()
+            nodes.append(self.parse_expression())
+        self.finish()
+        return tuple(nodes)
+
+    def finish(self) -> None:
+        token = self.peek()
+        if token is not None:
+            raise ExpressionError(
+                f"Unexpected {token.text!r} in {self.text!r}.",
+            )
+
+
+def parse_expression(text: str) -> Node:
+    """Parses a single UPPAAL expression, such as a guard.
+
+    Args:
+        text (str): The expression text.
+
+    Raises:
+        ExpressionError: If the text is not a valid expression.
+
+    Returns:
+        Node: The root of the expression tree.
+    """
+    parser = _Parser(text)
+    node = parser.parse_expression()
+    parser.finish()
+    return node
+
+
+def parse_expression_list(text: str) -> Tuple[Node, ...]:
+    """Parses a comma separated list of UPPAAL expressions, such as an
+    update label. Commas nested in calls or brackets do not split the list.
+
+    Args:
+        text (str): The expression list text.
+
+    Raises:
+        ExpressionError: If the text is not a valid expression list.
+
+    Returns:
+        Tuple[Node, ...]: The root of each expression tree.
+    """
+    return _Parser(text).parse_list()
+
+
+def _precedence(node: Node) -> int:
+    if isinstance(node, (Conditional, Binder)):
+        return CONDITIONAL_PRECEDENCE
+    if isinstance(node, Binary):
+        return BINARY_PRECEDENCE[node.op]
+    if isinstance(node, Unary):
+        return UNARY_PRECEDENCE
+    if isinstance(node, Postfix):
+        return POSTFIX_PRECEDENCE
+    return POSTFIX_PRECEDENCE + 1
+
+
+def to_source(node: Node, min_precedence: int = 0) -> str:
+    """Renders an expression tree back to canonical UPPAAL text, with
+    binary operators surrounded by single spaces and parentheses only
+    where the precedence requires them.
+
+    Args:
+        node (Node): The expression tree.
+        min_precedence (int): The precedence of the enclosing operation.
+            Defaults to 0.
+
+    Returns:
+        str: The canonical expression text.
+    """
+    if isinstance(node, Literal):
+        text = node.value
+    elif isinstance(node, Name):
+        text = node.id
+    elif isinstance(node, Call):
+        arguments = ", ".join(to_source(arg) for arg in node.args)
+        text = f"{to_source(node.func, POSTFIX_PRECEDENCE)}({arguments})"
+    elif isinstance(node, Index):
+        target = to_source(node.target, POSTFIX_PRECEDENCE)
+        text = f"{target}[{to_source(node.index)}]"
+    elif isinstance(node, Member):
+        text = f"{to_source(node.target, POSTFIX_PRECEDENCE)}.{node.name}"
+    elif isinstance(node, Unary):
+        text = f"{node.op}{to_source(node.operand, UNARY_PRECEDENCE)}"
+    elif isinstance(node, Postfix):
+        text = f"{to_source(node.operand, POSTFIX_PRECEDENCE)}{node.op}"
+    elif isinstance(node, Conditional):
+        test = to_source(node.test, CONDITIONAL_PRECEDENCE + 1)
+        body = to_source(node.body)
+        orelse = to_source(node.orelse, CONDITIONAL_PRECEDENCE)
+        text = f"{test} ? {body} : {orelse}"
+    elif isinstance(node, Binder):
+        domain = node.type
+        if node.bounds:
+            bounds = ", ".join(to_source(bound) for bound in node.bounds)
+            domain = f"{domain}[{bounds}]"
+        body = to_source(node.body, CONDITIONAL_PRECEDENCE)
+        text = f"{node.op} ({node.name} : {domain}) {body}"
+    else:
+        precedence = BINARY_PRECEDENCE[node.op]
+        right_associative = node.op in ASSIGNMENT_OPERATORS
+        left = to_source(
+            node.left,
+            precedence + 1 if right_associative else precedence,
+        )
+        right = to_source(
+            node.right,
+            precedence if right_associative else precedence + 1,
+        )
+        text = f"{left} {node.op} {right}"
+    if _precedence(node) < min_precedence:
+        return f"({text})"
+    return text
+
+
+def guard_atoms(node: Node) -> List[Tuple[bool, Node]]:
+    """Flattens the `&&` and `||` connectives of a guard, returning each
+    of its atomic expressions along with a flag telling whether it is
+    negated. Negated atoms are mapped to `unless` conditions, and double
+    negations cancel each other.
+
+    Args:
+        node (Node): The guard expression tree.
+
+    Returns:
+        List[Tuple[bool, Node]]: The negation flag and node of each atom.
+    """
+    if isinstance(node, Binary) and node.op in ("&&", "||"):
+        return guard_atoms(node.left) + guard_atoms(node.right)
+    negated = False
+    while isinstance(node, Unary) and node.op == "!":
+        negated = not negated
+        node = node.operand
+    return [(negated, node)]
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def compile_guard(
+    label_text: str,
+    canonical: bool = True,
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """Compiles a guard label into the canonical text of its conditions
+    and unless (negated) conditions. Results are cached by label text.
+
+    Args:
+        label_text (str): The guard label text.
+        canonical (bool): Return the canonical text of each condition, or
+            its text as written in the label. Defaults to True.
+
+    Raises:
+        ExpressionError: If the label is not a valid expression.
+
+    Returns:
+        Tuple[Tuple[str, ...], Tuple[str, ...]]: The conditions and the
+            unless conditions.
+    """
+    conditions = list()
+    unless = list()
+    if label_text.strip():
+        parser = _Parser(label_text)
+        node = parser.parse_expression()
+        parser.finish()
+        render = to_source if canonical else parser.source
+        for negated, atom in guard_atoms(node):
+            (unless if negated else conditions).append(render(atom))
+    return tuple(conditions), tuple(unless)
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def compile_updates(
+    label_text: str,
+    canonical: bool = True,
+) -> Tuple[str, ...]:
+    """Compiles an update label into the canonical text of each of its
+    updates. Results are cached by label text.
+
+    Args:
+        label_text (str): The update label text.
+        canonical (bool): Return the canonical text of each update, or
+            its text as written in the label. Defaults to True.
+
+    Raises:
+        ExpressionError: If the label is not a valid expression list.
+
+    Returns:
+        Tuple[str, ...]: The updates.
+    """
+    parser = _Parser(label_text)
+    render = to_source if canonical else parser.source
+    return tuple(render(node) for node in parser.parse_list())
+
+
+def evaluate_constant(node: Node, constants: Dict[str, Any]) -> Any:
+    """Evaluates an expression made of literals and known constants, such
+    as the probability weight `failure[1] * 2`. Arrays are tuples, and the
+    integer division and remainder truncate towards zero, as in UPPAAL.
+
+    Args:
+        node (Node): The expression tree.
+        constants (Dict[str, Any]): The constant values, by name.
+
+    Raises:
+        ExpressionError: If the expression reads anything else than the
+            literals and the constants, or divides by zero.
+
+    Returns:
+        Any: The expression value.
+    """
+    if isinstance(node, Literal):
+        if node.value in ("true", "false"):
+            return node.value == "true"
+        return float(node.value) if "." in node.value else int(node.value)
+    if isinstance(node, Name) and node.id in constants:
+        return constants[node.id]
+    if isinstance(node, Index):
+        target = evaluate_constant(node.target, constants)
+        index = evaluate_constant(node.index, constants)
+        if isinstance(target, tuple) and isinstance(index, int) and \
+                0 <= index < len(target):
+            return target[index]
+    if isinstance(node, Unary) and node.op in _CONSTANT_UNARY:
+        return _CONSTANT_UNARY[node.op](
+            evaluate_constant(node.operand, constants),
+        )
+    if isinstance(node, Binary):
+        left = evaluate_constant(node.left, constants)
+        right = evaluate_constant(node.right, constants)
+        if node.op in _CONSTANT_BINARY:
+            return _CONSTANT_BINARY[node.op](left, right)
+        if node.op in ("/", "%") and right != 0:
+            if isinstance(left, int) and isinstance(right, int):
+                quotient = abs(left) // abs(right)
+                if (left < 0) != (right < 0):
+                    quotient = -quotient
+                if node.op == "/":
+                    return quotient
+                return left - quotient * right
+            if node.op == "/":
+                return left / right
+    if isinstance(node, Conditional):
+        if evaluate_constant(node.test, constants):
+            return evaluate_constant(node.body, constants)
+        return evaluate_constant(node.orelse, constants)
+    raise ExpressionError(
+        f"Not a constant expression: {to_source(node)!r}",
+    )
+
+
+def _is_identifier(name: str) -> bool:
+    return name.isidentifier() and not keyword.iskeyword(name)
+
+
+@lru_cache(maxsize=LABEL_CACHE_SIZE)
+def resolve_function(text: str) -> Tuple[bool, str]:
+    """Resolves the model function name of a guard atom or update. Calls
+    to a declared function keep the function name, any other expression
+    gets a generated name. The name is generated from the text as written
+    when that gives a valid identifier, so existing models keep their
+    names, and from the canonical text otherwise, with any character left
+    that is not valid in an identifier replaced by underscores. Results
+    are cached by text.
+
+    Args:
+        text (str): The guard atom or update text.
+
+    Raises:
+        ExpressionError: If the text is not a valid expression.
+
+    Returns:
+        Tuple[bool, str]: Whether the text is a call to a declared
+            function, and the snake_case function name.
+    """
+    node = parse_expression(text)
+    if isinstance(node, Call) and isinstance(node.func, Name):
+        return True, to_snake_case(node.func.id)
+    name = to_snake_case(generate_function_name(text.strip()))
+    if _is_identifier(name):
+        return False, name
+    name = to_snake_case(generate_function_name(to_source(node)))
+    if not _is_identifier(name):
+        name = _INVALID_IDENTIFIER_PATTERN.sub("_", name).strip("_")
+        if not _is_identifier(name):
+            name = f"_{name}"
+    return False, name
@@ -0,0 +1,199 @@
+import glob
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from cosmic.generator.code_generator import CodeGenerator
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NotRequired, TypedDict
+
+
+class BatchResult(TypedDict):
+    """Represents the generation of a single input file of a batch.
+    The `agents` key is the number of agents found in the input file, and
+    `seconds` the wall time spent on it. The `error` key is only present
+    when the generation failed.
+    """
+    input_file: str
+    output_dir: str
+    agents: int
+    seconds: float
+    error: NotRequired[str]
+
+
+def collect_inputs(patterns: Iterable[str]) -> List[Path]:
+    """Resolves the batch inputs. Each pattern may be a file, a directory,
+    which is searched recursively for xml files, or a glob pattern.
+
+    Args:
+        patterns (Iterable[str]): The files, directories or glob patterns.
+
+    Raises:
+        FileNotFoundError: If a pattern does not match any file.
+
+    Returns:
+        List[Path]: The unique input files, in the order they were found.
+    """
+    inputs = dict()
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(path.rglob("*.xml"))
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = [
+                Path(match)
+                for match in sorted(glob.glob(pattern, recursive=True))
+                if Path(match).is_file()
+            ]
+        if len(matches) == 0:
+            raise FileNotFoundError(f"No input files match {pattern}.")
+        for match in matches:
+            inputs.setdefault(match.resolve(), match)
+    return list(inputs.values())
+
+
+def assign_output_dirs(
+    inputs: List[Path],
+    output_root: Path,
+) -> Dict[Path, Path]:
+    """Assigns an output subdirectory to each input file, named after the
+    file stem. Inputs sharing a stem get a numeric suffix.
+
+    Args:
+        inputs (List[Path]): The input files.
+        output_root (Path): The batch output directory.
+
+    Returns:
+        Dict[Path, Path]: The output directory of each input file.
+    """
+    output_dirs = dict()
+    used_names = set()
+    for input_file in inputs:
+        name, suffix = input_file.stem, 1
+        while name in used_names:
+            suffix += 1
+            name = f"{input_file.stem}_{suffix}"
+        used_names.add(name)
+        output_dirs[input_file] = Path(output_root, name)
+    return output_dirs
+
+
+_worker_generator: CodeGenerator = None
+
+
+def _init_worker(generator_options: Dict[str, Any]) -> None:
+    global _worker_generator
+    _worker_generator = CodeGenerator(**generator_options)
+
+
+def generate_file(
+    code_generator: CodeGenerator,
+    input_file: Path,
+    output_dir: Path,
+    incremental: bool = False,
+) -> BatchResult:
+    """Generates the code of a single input file, timing it and catching
+    its errors, so one bad file does not stop the batch.
+
+    Args:
+        code_generator (CodeGenerator): The code generator.
+        input_file (Path): The input file.
+        output_dir (Path): The output directory of the input file.
+        incremental (bool): Use incremental generation. Defaults to False.
+
+    Returns:
+        BatchResult: The generation result.
+    """
+    start = time.perf_counter()
+    result = BatchResult(
+        input_file=str(input_file),
+        output_dir=str(output_dir),
+        agents=0,
+        seconds=0.0,
+    )
+    try:
+        summary = code_generator.generate_code(
+            xml_file=input_file,
+            output_dir=output_dir,
+            incremental=incremental,
+        )
+        result["agents"] = len(summary["generated"]) + len(summary["skipped"])
+    except Exception as e:
+        result["error"] = str(e) or e.__class__.__name__
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _generate_in_worker(
+    input_file: Path,
+    output_dir: Path,
+    incremental: bool,
+) -> BatchResult:
+    return generate_file(
+        _worker_generator,
+        input_file,
+        output_dir,
+        incremental,
+    )
+
+
+def run_batch(
+    inputs: List[Path],
+    output_root: Path,
+    generator_options: Dict[str, Any],
+    jobs: int = 1,
+    incremental: bool = False,
+) -> List[BatchResult]:
+    """Generates the code of many input files in a single run. With one
+    job, a single `CodeGenerator` is reused for every file. With more
+    jobs, the files are scheduled across a process pool, largest first,
+    and each worker process reuses its own `CodeGenerator`.
+
+    Args:
+        inputs (List[Path]): The input files.
+        output_root (Path): The batch output directory. Each input gets
+            its own subdirectory, see `assign_output_dirs`.
+        generator_options (Dict[str, Any]): The `CodeGenerator` arguments.
+        jobs (int): The amount of worker processes. Values lower than 1
+            use every available core. Defaults to 1.
+        incremental (bool): Use incremental generation. Defaults to False.
+
+    Returns:
+        List[BatchResult]: The result of each input file, in input order.
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    jobs = min(jobs, len(inputs))
+    generator_options = dict(generator_options, show_progress=False)
+    output_dirs = assign_output_dirs(inputs, output_root)
+
+    if jobs <= 1:
+        code_generator = CodeGenerator(**generator_options)
+        return [
+            generate_file(
+                code_generator,
+                input_file,
+                output_dirs[input_file],
+                incremental,
+            )
+            for input_file in inputs
+        ]
+
+    schedule = sorted(inputs, key=lambda f: f.stat().st_size, reverse=True)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(generator_options,),
+    ) as executor:
+        futures = {
+            input_file: executor.submit(
+                _generate_in_worker,
+                input_file,
+                output_dirs[input_file],
+                incremental,
+            )
+            for input_file in schedule
+        }
+        return [futures[input_file].result() for input_file in inputs]
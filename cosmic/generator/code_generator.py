@@ -1,25 +1,78 @@
-import shutil
+import hashlib
 
+from concurrent.futures import ThreadPoolExecutor
+from cosmic.adapter.entities.compact_template import CompactMachineTemplate
+from cosmic.adapter.entities.machine_template import MachineTemplate
+from cosmic.adapter.entities.network_template import NetworkTemplate
+from cosmic.adapter.xml.adapter import Adapter
 from cosmic.adapter.xml.model_factory import (
     ModelFactory,
     DIALECTS as XML_DIALECTS,
 )
+from cosmic.generator.manifest import (
+    MANIFEST_VERSION,
+    AgentEntry,
+    Manifest,
+    load_manifest,
+    save_manifest,
+)
+from cosmic.generator.parse_cache import (
+    cosmic_version,
+    load_parsed,
+    parse_cache_key,
+    store_parsed,
+)
+from cosmic.generator.template_cache import load_template
+from cosmic.generator.writer import write_if_changed
+from cosmic.utils.file_oper import user_cache_dir
+from cosmic.utils.profiler import Profiler, profile_phase
 from cosmic.utils.string_oper import to_snake_case
-from mako.template import Template
 from pathlib import Path
 from rich.progress import Progress
-from typing import Literal, Union
+from typing import (
+    Any,
+    Dict,
+    List,
+    Literal,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 
-DIALECTS = Literal["pytransitions", "python-state-machine"]
+DIALECTS = Literal[
+    "pytransitions",
+    "pytransitions-async",
+    "plain",
+    "numpy",
+    "python-state-machine",
+]
 BASE_PATH = Path(__file__).resolve().parent.parent
+NETWORK_FILE = "network.py"
+SYSTEM_FILE = "system.py"
+# the network data is cached next to the agents, under their key with
+# this suffix
+NETWORK_CACHE_SUFFIX = "-network"
+
+
+class GenerationSummary(TypedDict):
+    """Summarizes a code generation.
+    The `generated` key lists the agents whose files were rendered and
+    written, while `skipped` lists the agents left untouched because their
+    template did not change since the previous incremental generation.
+    The `unchanged` key lists the generated agents whose rendered files
+    were identical to the existing ones, and thus were not rewritten.
+    """
+    generated: List[str]
+    skipped: List[str]
+    unchanged: List[str]
 
 
 class CodeGenerator:
     """Class to generate a finite state machine python code from a xml file."""
 
-    temp_folder: Path = Path(BASE_PATH, "generator", "tmp", "mako_modules")
-
     @staticmethod
     def get_template_file(code_dialect: DIALECTS):
         """Return the template file for the code generation.
@@ -37,6 +90,18 @@ class CodeGenerator:
             "pytransitions": Path(
                 BASE_PATH, "adapter", "templates", "pytransitions_machine.mako"
             ),
+            "pytransitions-async": Path(
+                BASE_PATH,
+                "adapter",
+                "templates",
+                "pytransitions_async_machine.mako",
+            ),
+            "plain": Path(
+                BASE_PATH, "adapter", "templates", "plain_machine.mako"
+            ),
+            "numpy": Path(
+                BASE_PATH, "adapter", "templates", "numpy_machine.mako"
+            ),
         }
         if code_dialect not in ref_files.keys():
             raise NotImplementedError("Type not supported yet.")
@@ -59,91 +124,720 @@ class CodeGenerator:
             "pytransitions": Path(
                 BASE_PATH, "adapter", "templates", "pytransitions_model.mako"
             ),
+            "pytransitions-async": Path(
+                BASE_PATH,
+                "adapter",
+                "templates",
+                "pytransitions_async_model.mako",
+            ),
+            # the model stubs do not depend on the machine runtime
+            "plain": Path(
+                BASE_PATH, "adapter", "templates", "pytransitions_model.mako"
+            ),
+            "numpy": Path(
+                BASE_PATH, "adapter", "templates", "numpy_model.mako"
+            ),
         }
         if code_dialect not in ref_files.keys():
             raise NotImplementedError("Type not supported yet.")
         return ref_files.get(code_dialect)
 
+    @staticmethod
+    def get_template_network_file(code_dialect: DIALECTS):
+        """Return the template file for the network module, which runs
+        the agents synchronising on channels. The `numpy` dialect runs
+        many instances of a single agent, and has no network module.
+
+        Args:
+            code_dialect (DIALECTS): The dialect of the code to be generated.
+
+        Raises:
+            NotImplementedError: If the dialect is not supported.
+
+        Returns:
+            Optional[file]: The template file for the network module, or
+                None when the dialect has no network module.
+        """
+        ref_files = {
+            "pytransitions": Path(
+                BASE_PATH, "adapter", "templates", "network.mako"
+            ),
+            "pytransitions-async": Path(
+                BASE_PATH, "adapter", "templates", "network.mako"
+            ),
+            "plain": Path(BASE_PATH, "adapter", "templates", "network.mako"),
+            "numpy": None,
+        }
+        if code_dialect not in ref_files.keys():
+            raise NotImplementedError("Type not supported yet.")
+        return ref_files.get(code_dialect)
+
+    @staticmethod
+    def get_template_system_file(code_dialect: DIALECTS):
+        """Return the template file for the system module, which builds
+        the agent instances declared in the model system. The `numpy`
+        dialect sizes its batches itself, and has no system module.
+
+        Args:
+            code_dialect (DIALECTS): The dialect of the code to be generated.
+
+        Raises:
+            NotImplementedError: If the dialect is not supported.
+
+        Returns:
+            Optional[file]: The template file for the system module, or
+                None when the dialect has no system module.
+        """
+        ref_files = {
+            "pytransitions": Path(
+                BASE_PATH, "adapter", "templates", "system.mako"
+            ),
+            "pytransitions-async": Path(
+                BASE_PATH, "adapter", "templates", "system.mako"
+            ),
+            "plain": Path(BASE_PATH, "adapter", "templates", "system.mako"),
+            "numpy": None,
+        }
+        if code_dialect not in ref_files.keys():
+            raise NotImplementedError("Type not supported yet.")
+        return ref_files.get(code_dialect)
+
+    @staticmethod
+    def get_transition_table(
+        data: MachineTemplate,
+    ) -> Dict[str, Tuple[str, ...]]:
+        """Return the outgoing triggers of each state, in the order the
+        transitions were declared. States without outgoing transitions map
+        to an empty tuple. Transitions that synchronise on a channel are
+        left out, see `get_sync_table`.
+
+        Args:
+            data (MachineTemplate): The agent data.
+
+        Returns:
+            Dict[str, Tuple[str, ...]]: The triggers of each state name.
+        """
+        table = {state["name"]: list() for state in data["states"]}
+        for transition in data["transitions"]:
+            if "send" in transition or "receive" in transition:
+                continue
+            table.setdefault(transition["source"], list()).append(
+                transition["trigger"],
+            )
+        return {state: tuple(triggers) for state, triggers in table.items()}
+
+    @staticmethod
+    def get_sync_table(
+        data: MachineTemplate,
+    ) -> Dict[str, Tuple[Tuple[str, str, bool], ...]]:
+        """Return the outgoing synchronisations of each state, in the
+        order the transitions were declared, as `(trigger, channel,
+        is_send)` tuples. Only states with synchronisations are listed.
+
+        Args:
+            data (MachineTemplate): The agent data.
+
+        Returns:
+            Dict[str, Tuple[Tuple[str, str, bool], ...]]: The
+                synchronisations of each state name.
+        """
+        table = dict()
+        for transition in data["transitions"]:
+            if "send" in transition:
+                synchronisation = (
+                    transition["trigger"],
+                    transition["send"],
+                    True,
+                )
+            elif "receive" in transition:
+                synchronisation = (
+                    transition["trigger"],
+                    transition["receive"],
+                    False,
+                )
+            else:
+                continue
+            table.setdefault(transition["source"], list()).append(
+                synchronisation,
+            )
+        return {state: tuple(syncs) for state, syncs in table.items()}
+
+    @staticmethod
+    def get_alias_table(
+        weights: Sequence[Union[int, float]],
+    ) -> Tuple[Tuple[float, ...], Tuple[int, ...]]:
+        """Return the alias table of a weighted choice, built with Vose's
+        method, as the probability of keeping each column and the column
+        taken otherwise. Picking a column uniformly, then keeping it or
+        taking its alias, picks each column with a probability proportional
+        to its weight, in constant time.
+
+        Args:
+            weights (Sequence[Union[int, float]]): The non-negative weights.
+
+        Raises:
+            ValueError: If the weights do not sum to a positive number.
+
+        Returns:
+            Tuple[Tuple[float, ...], Tuple[int, ...]]: The probabilities
+                and the aliases of the columns.
+        """
+        total = sum(weights)
+        if total <= 0:
+            raise ValueError(f"Invalid branch weights: {tuple(weights)}.")
+        scaled = [weight * len(weights) / total for weight in weights]
+        probabilities = [1.0] * len(weights)
+        aliases = list(range(len(weights)))
+        small = [column for column, value in enumerate(scaled) if value < 1]
+        large = [column for column, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            column, alias = small.pop(), large.pop()
+            probabilities[column] = scaled[column]
+            aliases[column] = alias
+            scaled[alias] += scaled[column] - 1
+            (small if scaled[alias] < 1 else large).append(alias)
+        return tuple(probabilities), tuple(aliases)
+
+    @staticmethod
+    def get_branch_table(
+        data: MachineTemplate,
+    ) -> Dict[str, Tuple[Union[str, Tuple], ...]]:
+        """Return the steps of the states leaving through a probabilistic
+        branchpoint: their outgoing triggers, as in `get_transition_table`,
+        with the branches of each branchpoint grouped in place of its first
+        branch. A group is a `(triggers, probabilities, aliases)` alias
+        table, see `get_alias_table`, or `(triggers, None, weights)` when a
+        weight is read from the model, holding the constant weights and
+        the names of the model functions.
+
+        Args:
+            data (MachineTemplate): The agent data.
+
+        Raises:
+            ValueError: If the constant weights of a branchpoint do not sum
+                to a positive number.
+
+        Returns:
+            Dict[str, Tuple[Union[str, Tuple], ...]]: The steps of each
+                state name.
+        """
+        steps, branches = dict(), dict()
+        for transition in data["transitions"]:
+            if "send" in transition or "receive" in transition:
+                continue
+            source = transition["source"]
+            branchpoint = transition.get("branchpoint")
+            if branchpoint is None:
+                steps.setdefault(source, list()).append(transition["trigger"])
+                continue
+            key = (source, branchpoint)
+            if key not in branches:
+                branches[key] = list()
+                steps.setdefault(source, list()).append(key)
+            branches[key].append(transition)
+
+        def group(key: Tuple[str, str]) -> Tuple:
+            triggers = tuple(branch["trigger"] for branch in branches[key])
+            weights = tuple(branch["weight"] for branch in branches[key])
+            if any(isinstance(weight, str) for weight in weights):
+                return triggers, None, weights
+            return (triggers, *CodeGenerator.get_alias_table(weights))
+
+        return {
+            source: tuple(
+                step if isinstance(step, str) else group(step)
+                for step in steps[source]
+            )
+            for source in dict.fromkeys(source for source, _ in branches)
+        }
+
+    @staticmethod
+    def get_model_slots(
+        data: MachineTemplate,
+        code_dialect: DIALECTS,
+    ) -> Tuple[str, ...]:
+        """Return the `__slots__` of the generated model, that is, the
+        attributes the state machine of the dialect adds to its model,
+        followed by the template parameters. The `pytransitions` machines
+        store the current state and add the trigger and state check
+        methods, while the `plain` and `numpy` machines leave the model
+        untouched. The
+        declared functions are methods of the model, which the machine does
+        not replace, so they are left out.
+
+        Args:
+            data (MachineTemplate): The agent data.
+            code_dialect (DIALECTS): The dialect of the code to be generated.
+
+        Returns:
+            Tuple[str, ...]: The attribute names, without repetitions.
+        """
+        slots = list()
+        if code_dialect not in ("plain", "numpy"):
+            slots.extend(("state", "trigger", "may_trigger"))
+            if code_dialect == "pytransitions":
+                slots.append("get_graph")
+            for state in data["states"]:
+                name = state["name"]
+                slots.extend((f"is_{name}", f"to_{name}", f"may_to_{name}"))
+            for transition in data["transitions"]:
+                trigger = transition["trigger"]
+                slots.extend((trigger, f"may_{trigger}"))
+        slots.extend(
+            parameter["name"] for parameter in data.get("parameters", ())
+        )
+        declared_functions = set(data.get("declared_functions", ()))
+        return tuple(
+            slot for slot in dict.fromkeys(slots)
+            if slot not in declared_functions
+        )
+
+    @staticmethod
+    def get_fingerprint(
+        code_dialect: DIALECTS,
+        xml_adapter: Adapter,
+        *template_files: Optional[Path],
+    ) -> str:
+        """Return a hash identifying the generated code format, built from
+        the dialect name, the adapter and its version, the cosmic version
+        and the content of the dialect template files.
+
+        Args:
+            code_dialect (DIALECTS): The dialect of the code to be generated.
+            xml_adapter (Adapter): The adapter parsing the xml files.
+            *template_files (Path): The template files of the dialect,
+                None for the modules the dialect does not have.
+
+        Returns:
+            str: The hexadecimal sha256 digest of the dialect.
+        """
+        digest = hashlib.sha256()
+        for part in (
+            code_dialect,
+            type(xml_adapter).__name__,
+            str(getattr(xml_adapter, "VERSION", "")),
+            cosmic_version(),
+        ):
+            digest.update(part.encode())
+            digest.update(b"\0")
+        for template_file in template_files:
+            if template_file is not None:
+                digest.update(template_file.read_bytes())
+        return digest.hexdigest()
+
     def __init__(
         self,
         xml_dialect: XML_DIALECTS,
         code_dialect: DIALECTS,
-        generate_model: bool = True
+        generate_model: bool = True,
+        jobs: int = 1,
+        cache_dir: Optional[Path] = None,
+        show_progress: bool = True,
+        write_workers: Optional[int] = None,
+        parse_cache: bool = True,
+        profiler: Optional[Profiler] = None,
     ) -> None:
         self.generate_model = generate_model
+        self.jobs = jobs
+        self.parse_cache = parse_cache
+        self.profiler = profiler
+        self.show_progress = show_progress
+        self.write_workers = write_workers
+        self.cache_dir = cache_dir if cache_dir is not None else (
+            user_cache_dir()
+        )
+        self.code_dialect = code_dialect
         self.xml_adapter = ModelFactory.xml_model_factory(xml_dialect)
         self.template_file = self.get_template_file(code_dialect)
         self.template_model_file = self.get_template_model_file(code_dialect)
-        self.template = Template(
-            filename=self.template_file.as_posix(),
-            module_directory=self.temp_folder,
+        self.template_network_file = self.get_template_network_file(
+            code_dialect,
         )
-        self.template_model = Template(
-            filename=self.template_model_file.as_posix(),
-            module_directory=self.temp_folder,
+        self.template_system_file = self.get_template_system_file(
+            code_dialect,
+        )
+        self.fingerprint = self.get_fingerprint(
+            code_dialect,
+            self.xml_adapter,
+            self.template_file,
+            self.template_model_file,
+            self.template_network_file,
+            self.template_system_file,
+        )
+        with profile_phase(self.profiler, "load_templates"):
+            self.template = load_template(self.template_file, self.cache_dir)
+            self.template_model = load_template(
+                self.template_model_file,
+                self.cache_dir,
+            )
+            self.template_network = None
+            if self.template_network_file is not None:
+                self.template_network = load_template(
+                    self.template_network_file,
+                    self.cache_dir,
+                )
+            self.template_system = None
+            if self.template_system_file is not None:
+                self.template_system = load_template(
+                    self.template_system_file,
+                    self.cache_dir,
+                )
+
+    @property
+    def options(self) -> Dict[str, Any]:
+        """The generation options that change the generated files."""
+        return {"generate_model": self.generate_model}
+
+    def render_agent(
+        self,
+        agent_name: str,
+        data: Union[MachineTemplate, CompactMachineTemplate],
+    ) -> Dict[str, str]:
+        """Render the files of a single agent. Compact agent data is
+        converted to the dictionary form expected by the templates.
+
+        Args:
+            agent_name (str): The agent name.
+            data (Union[MachineTemplate, CompactMachineTemplate]): The
+                agent data.
+
+        Returns:
+            Dict[str, str]: The content of each file, by file name.
+        """
+        with profile_phase(self.profiler, "render", agent_name):
+            if isinstance(data, CompactMachineTemplate):
+                data = data.to_dict()
+            rendered = {
+                f"{to_snake_case(agent_name)}.py": self.template.render(
+                    agent_name=agent_name,
+                    transition_table=self.get_transition_table(data),
+                    branch_table=self.get_branch_table(data),
+                    sync_table=self.get_sync_table(data),
+                    **data,
+                ),
+            }
+            declared_functions = data.get("declared_functions", [])
+            parameters = data.get("parameters", [])
+            if self.generate_model and (declared_functions or parameters):
+                rendered[f"{to_snake_case(agent_name)}_model.py"] = (
+                    self.template_model.render(
+                        agent_name=agent_name,
+                        declared_functions=declared_functions,
+                        parameters=parameters,
+                        model_slots=self.get_model_slots(
+                            data,
+                            self.code_dialect,
+                        ),
+                    )
+                )
+        return rendered
+
+    def render_network(self, network: NetworkTemplate) -> str:
+        """Render the network module, see `NETWORK_FILE`.
+
+        Args:
+            network (NetworkTemplate): The network data.
+
+        Returns:
+            str: The content of the network module.
+        """
+        return self.template_network.render(
+            asynchronous=self.code_dialect == "pytransitions-async",
+            **network,
         )
 
+    def render_system(self, network: NetworkTemplate) -> str:
+        """Render the system module, see `SYSTEM_FILE`.
+
+        Args:
+            network (NetworkTemplate): The network data.
+
+        Returns:
+            str: The content of the system module.
+        """
+        return self.template_system.render(instances=network["instances"])
+
+    def write_agent(
+        self,
+        agent_name: str,
+        data: Union[MachineTemplate, CompactMachineTemplate],
+        output_dir: Path,
+    ) -> Tuple[List[str], bool]:
+        """Render the files of a single agent and write the ones whose
+        content changed, see `write_if_changed`.
+
+        Args:
+            agent_name (str): The agent name.
+            data (Union[MachineTemplate, CompactMachineTemplate]): The
+                agent data.
+            output_dir (Path): The output directory.
+
+        Returns:
+            Tuple[List[str], bool]: The names of the agent files, and
+                whether any of them was written.
+        """
+        written = False
+        rendered = self.render_agent(agent_name, data)
+        with profile_phase(self.profiler, "write", agent_name):
+            for file_name, content in rendered.items():
+                written |= write_if_changed(
+                    Path(output_dir, file_name),
+                    content,
+                )
+        return list(rendered), written
+
+    def parse_changed_templates(
+        self,
+        xml_file: Path,
+        output_dir: Path,
+    ) -> Tuple[
+        Dict[str, CompactMachineTemplate],
+        Dict[str, str],
+        Dict[str, AgentEntry],
+        NetworkTemplate,
+    ]:
+        """Stream the agents of the xml file, parsing only the ones whose
+        template changed since the generation recorded in the output
+        directory manifest. An agent is reused when its template digest,
+        the dialect fingerprint and the options all match the manifest,
+        and its generated files are still in place. The network data is
+        always parsed, from the declarations met along the same stream.
+
+        Args:
+            xml_file (Path): The xml file to be parsed.
+            output_dir (Path): The directory holding the manifest.
+
+        Returns:
+            Tuple[Dict[str, CompactMachineTemplate], Dict[str, str],
+                Dict[str, AgentEntry], NetworkTemplate]: The parsed changed
+                agents, their template digests, the manifest entries of the
+                reused agents, and the network data.
+        """
+        manifest = load_manifest(output_dir)
+        previous_agents = dict()
+        if (
+            manifest is not None
+            and manifest.get("generator") == self.fingerprint
+            and manifest.get("options") == self.options
+        ):
+            previous_agents = manifest.get("agents", {})
+
+        result_dict, digests, reused_agents = dict(), dict(), dict()
+        declarations = dict()
+        for agent_name, template in self.xml_adapter.iter_xml_templates(
+            xml_file,
+            declarations,
+        ):
+            with profile_phase(self.profiler, "template_digest", agent_name):
+                digest = self.xml_adapter.template_digest(template)
+            entry = previous_agents.get(agent_name)
+            if (
+                entry is not None
+                and entry["digest"] == digest
+                and all(Path(output_dir, f).is_file() for f in entry["files"])
+            ):
+                reused_agents[agent_name] = entry
+                continue
+            digests[agent_name] = digest
+            with profile_phase(self.profiler, "parse_template", agent_name):
+                result_dict[agent_name] = CompactMachineTemplate.from_dict(
+                    self.xml_adapter.parse_template(template),
+                )
+        network = self.xml_adapter.parse_network(declarations)
+        return result_dict, digests, reused_agents, network
+
+    def parse_xml(
+        self,
+        xml_file: Path,
+    ) -> Tuple[Dict[str, CompactMachineTemplate], NetworkTemplate]:
+        """Parse every agent of the xml file, along with the network data
+        shared by them. When the parse cache is enabled, the result of a
+        previous run is reused if the file, the adapter and the cosmic
+        version did not change since.
+
+        Args:
+            xml_file (Path): The xml file to be parsed.
+
+        Returns:
+            Tuple[Dict[str, CompactMachineTemplate], NetworkTemplate]: The
+                parsed agents and the network data.
+        """
+        declarations = dict()
+        if not self.parse_cache:
+            result_dict = self.xml_adapter.get_xml_data(
+                xml_file,
+                jobs=self.jobs,
+                compact=True,
+                profiler=self.profiler,
+                declarations=declarations,
+            )
+            return result_dict, self.xml_adapter.parse_network(declarations)
+
+        with profile_phase(self.profiler, "parse_cache_load"):
+            key = parse_cache_key(xml_file, self.xml_adapter)
+            network_key = f"{key}{NETWORK_CACHE_SUFFIX}"
+            result_dict = load_parsed(self.cache_dir, key)
+            network = load_parsed(self.cache_dir, network_key)
+        if result_dict is None or network is None:
+            result_dict = self.xml_adapter.get_xml_data(
+                xml_file,
+                jobs=self.jobs,
+                profiler=self.profiler,
+                declarations=declarations,
+            )
+            network = self.xml_adapter.parse_network(declarations)
+            with profile_phase(self.profiler, "parse_cache_store"):
+                store_parsed(self.cache_dir, key, result_dict)
+                store_parsed(self.cache_dir, network_key, network)
+        with profile_phase(self.profiler, "compact"):
+            for agent_name, machine_template in result_dict.items():
+                result_dict[agent_name] = CompactMachineTemplate.from_dict(
+                    machine_template,
+                )
+        return result_dict, network
+
+    def record_agent_sizes(
+        self,
+        result_dict: Dict[str, Union[MachineTemplate, CompactMachineTemplate]],
+    ) -> None:
+        """Record the amount of states, transitions and declared functions
+        of each agent in the profiler, if any.
+
+        Args:
+            result_dict (Dict[str, Union[MachineTemplate,
+                CompactMachineTemplate]]): The parsed agents.
+        """
+        if self.profiler is None:
+            return
+        for agent_name, data in result_dict.items():
+            if isinstance(data, CompactMachineTemplate):
+                states, transitions = data.states, data.transitions
+                declared_functions = data.declared_functions or ()
+            else:
+                states, transitions = data["states"], data["transitions"]
+                declared_functions = data.get("declared_functions", [])
+            self.profiler.record_agent(
+                agent_name,
+                states=len(states),
+                transitions=len(transitions),
+                declared_functions=len(declared_functions),
+            )
+
     def generate_code(
         self,
         xml_file: Union[Path, str],
         output_dir: Path,
-    ) -> None:
+        incremental: bool = False,
+    ) -> GenerationSummary:
         """Generate code from the xml file.
         From the xml file input, uses the adapter to parse the content into a
         result dictionary containing one or more agents, which will be each
         converted into a python file containing the finite state machine code
         for its logic.
+        In incremental mode, a manifest stored in the output directory keeps
+        the digest of each agent template, and agents whose template did not
+        change are neither parsed, rendered nor written.
 
         Args:
             xml_file (Union[Path, str]): The xml file to be parsed.
             output_dir (Path): The directory where the output files will be
                 saved.
+            incremental (bool): Skip the agents that did not change since
+                the previous incremental generation. Defaults to False.
 
         Raises:
             FileNotFoundError: If the xml file is not found.
+
+        Returns:
+            GenerationSummary: The generated and skipped agents.
         """
         if isinstance(xml_file, str):
             xml_file = Path(xml_file)
         if not xml_file.exists() or not xml_file.is_file():
             raise FileNotFoundError(f"File {xml_file} not found.")
 
-        result_dict = self.xml_adapter.get_xml_data(xml_file.resolve())
+        reused_agents = dict()
+        with profile_phase(self.profiler, "parse"):
+            if incremental:
+                result_dict, digests, reused_agents, network = (
+                    self.parse_changed_templates(
+                        xml_file.resolve(),
+                        output_dir,
+                    )
+                )
+            else:
+                result_dict, network = self.parse_xml(xml_file.resolve())
+        self.record_agent_sizes(result_dict)
 
         if not output_dir.exists():  # pragma: no cover
-            output_dir.mkdir()
+            output_dir.mkdir(parents=True, exist_ok=True)
+
+        generated_files = dict()
+        unchanged_agents = list()
 
-        with Progress() as progress:
+        with profile_phase(self.profiler, "generate"), \
+                Progress(disable=not self.show_progress) as progress, \
+                ThreadPoolExecutor(max_workers=self.write_workers) as writer:
             codegen = progress.add_task(
                 "Generating code...",
                 total=len(result_dict),
             )
-            advance_amount = 100 / len(result_dict)
-            for agent_name, data in result_dict.items():
-                output_file = Path(output_dir).joinpath(
-                    f"{to_snake_case(agent_name)}.py",
-                )
-                model_file = Path(output_dir).joinpath(
-                    f"{to_snake_case(agent_name)}_model.py",
+            advance_amount = 100 / max(len(result_dict), 1)
+            futures = {
+                agent_name: writer.submit(
+                    self.write_agent,
+                    agent_name,
+                    data,
+                    output_dir,
                 )
+                for agent_name, data in result_dict.items()
+            }
+            for agent_name, future in futures.items():
+                files, written = future.result()
+                generated_files[agent_name] = files
+                if not written:
+                    unchanged_agents.append(agent_name)
                 progress.update(
-                    task_description=f"Generating code for {agent_name}...",
+                    task_description=f"Generated code for {agent_name}.",
                     task_id=codegen,
                     advance=advance_amount,
                 )
-                with open(output_file, "w") as file:
-                    file.write(
-                        self.template.render(
-                            agent_name=agent_name,
-                            **data,
-                        ),
-                    )
-                declared_functions = data.get("declared_functions", [])
-                if self.generate_model and len(declared_functions) > 0:
-                    with open(model_file, "w") as mfile:  # pragma: no cover
-                        mfile.write(
-                            self.template_model.render(
-                                agent_name=agent_name,
-                                declared_functions=declared_functions,
-                            ),
-                        )
-        shutil.rmtree(self.temp_folder)
+
+        # the network is rendered on every run, incremental or not, so a
+        # change of the channels alone is never missed
+        with profile_phase(self.profiler, "network"):
+            network_file = Path(output_dir, NETWORK_FILE)
+            if self.template_network is not None and \
+                    len(network["channels"]) > 0:
+                write_if_changed(network_file, self.render_network(network))
+            else:
+                network_file.unlink(missing_ok=True)
+            system_file = Path(output_dir, SYSTEM_FILE)
+            if self.template_system is not None and \
+                    len(network["instances"]) > 0:
+                write_if_changed(system_file, self.render_system(network))
+            else:
+                system_file.unlink(missing_ok=True)
+
+        if incremental:
+            agents = dict(reused_agents)
+            for agent_name, files in generated_files.items():
+                agents[agent_name] = AgentEntry(
+                    digest=digests[agent_name],
+                    files=files,
+                )
+            with profile_phase(self.profiler, "save_manifest"):
+                save_manifest(
+                    output_dir,
+                    Manifest(
+                        version=MANIFEST_VERSION,
+                        generator=self.fingerprint,
+                        options=self.options,
+                        agents=agents,
+                    ),
+                )
+        return GenerationSummary(
+            generated=list(generated_files),
+            skipped=list(reused_agents),
+            unchanged=unchanged_agents,
+        )
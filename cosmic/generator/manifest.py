@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+MANIFEST_FILE = ".cosmic-manifest.json"
+MANIFEST_VERSION = 1
+
+
+class AgentEntry(TypedDict):
+    """Represents a generated agent in the manifest.
+    The `digest` key is the content hash of the agent template subtree,
+    and `files` lists the names of the files generated for it, relative
+    to the output directory.
+    """
+    digest: str
+    files: List[str]
+
+
+class Manifest(TypedDict):
+    """Represents the state of an output directory after a generation.
+    The `generator` key fingerprints the code dialect and its templates,
+    and `options` holds the generation options. An agent can only be
+    reused if both match the current generation.
+    """
+    version: int
+    generator: str
+    options: Dict[str, Any]
+    agents: Dict[str, AgentEntry]
+
+
+def load_manifest(output_dir: Path) -> Optional[Manifest]:
+    """Loads the manifest stored in the output directory.
+
+    Args:
+        output_dir (Path): The output directory.
+
+    Returns:
+        Optional[Manifest]: The manifest, or None if the directory has no
+            valid manifest for the current manifest version.
+    """
+    try:
+        with open(Path(output_dir, MANIFEST_FILE)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_dir: Path, manifest: Manifest) -> None:
+    """Stores the manifest in the output directory. The file is written
+    to a temporary file and renamed into place, so an interrupted run
+    never leaves a truncated manifest behind.
+
+    Args:
+        output_dir (Path): The output directory.
+        manifest (Manifest): The manifest to be stored.
+    """
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=output_dir,
+        prefix=f"{MANIFEST_FILE}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(descriptor, "w") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        os.replace(temp_path, Path(output_dir, MANIFEST_FILE))
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,155 @@
+import hashlib
+import marshal
+import sys
+
+from cosmic.adapter.entities.machine_template import MachineTemplate
+from cosmic.adapter.xml.adapter import Adapter
+from cosmic.utils.file_oper import atomic_write_bytes
+from importlib import metadata
+from pathlib import Path
+from typing import Dict, Optional
+
+
+PARSE_CACHE_DIR = "parsed"
+PARSE_CACHE_SUFFIX = ".marshal"
+# the cached results are evicted, least recently used first, once the
+# parse cache grows above this size.
+PARSE_CACHE_MAX_BYTES = 256 * 2**20
+HASH_CHUNK_SIZE = 2**20
+
+
+def cosmic_version() -> str:
+    """Returns the installed cosmic version, or "unknown" when cosmic runs
+    from a source tree that is not installed.
+
+    Returns:
+        str: The cosmic version.
+    """
+    try:
+        return metadata.version("cosmic")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def parse_cache_key(xml_file: Path, xml_adapter: Adapter) -> str:
+    """Returns the parse cache key of a xml file. The key changes with the
+    file content, the adapter and its version, the cosmic version and the
+    python version, which defines the marshal format.
+
+    Args:
+        xml_file (Path): The xml file.
+        xml_adapter (Adapter): The adapter parsing the xml file.
+
+    Returns:
+        str: The hexadecimal sha256 digest of the cache key.
+    """
+    digest = hashlib.sha256()
+    for part in (
+        type(xml_adapter).__name__,
+        str(getattr(xml_adapter, "VERSION", "")),
+        cosmic_version(),
+        sys.version,
+    ):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    with open(xml_file, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_cache_path(cache_dir: Path, key: str) -> Path:
+    """Returns the file holding the cached result of a key.
+
+    Args:
+        cache_dir (Path): The cosmic cache directory.
+        key (str): The parse cache key, see `parse_cache_key`.
+
+    Returns:
+        Path: The cached result file.
+    """
+    return Path(cache_dir, PARSE_CACHE_DIR, f"{key}{PARSE_CACHE_SUFFIX}")
+
+
+def load_parsed(
+    cache_dir: Path,
+    key: str,
+) -> Optional[Dict[str, MachineTemplate]]:
+    """Loads a cached parse result, marking it as recently used.
+
+    Args:
+        cache_dir (Path): The cosmic cache directory.
+        key (str): The parse cache key, see `parse_cache_key`.
+
+    Returns:
+        Optional[Dict[str, MachineTemplate]]: The parsed agents, or None
+            when the result is not cached or the cached file is invalid.
+    """
+    cache_file = parse_cache_path(cache_dir, key)
+    try:
+        result_dict = marshal.loads(cache_file.read_bytes())
+        cache_file.touch()
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(result_dict, dict):
+        return None
+    return result_dict
+
+
+def evict_parsed(cache_dir: Path, max_bytes: int) -> None:
+    """Removes the least recently used cached results until the parse
+    cache fits in the given size.
+
+    Args:
+        cache_dir (Path): The cosmic cache directory.
+        max_bytes (int): The maximum parse cache size.
+    """
+    entries = list()
+    for cache_file in Path(cache_dir, PARSE_CACHE_DIR).glob(
+        f"*{PARSE_CACHE_SUFFIX}",
+    ):
+        try:
+            stat = cache_file.stat()
+        except OSError:  # pragma: no cover
+            continue  # removed by a concurrent process
+        entries.append((stat.st_mtime_ns, stat.st_size, cache_file))
+
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, cache_file in sorted(entries):
+        if total_size <= max_bytes:
+            break
+        cache_file.unlink(missing_ok=True)
+        total_size -= size
+
+
+def store_parsed(
+    cache_dir: Path,
+    key: str,
+    result_dict: Dict[str, MachineTemplate],
+    max_bytes: int = PARSE_CACHE_MAX_BYTES,
+) -> bool:
+    """Stores a parse result in the cache, evicting older results when the
+    cache grows above `max_bytes`. Failures to write the cache are ignored,
+    since the result can always be parsed again.
+
+    Args:
+        cache_dir (Path): The cosmic cache directory.
+        key (str): The parse cache key, see `parse_cache_key`.
+        result_dict (Dict[str, MachineTemplate]): The parsed agents.
+        max_bytes (int): The maximum parse cache size. Defaults to
+            PARSE_CACHE_MAX_BYTES.
+
+    Returns:
+        bool: Whether the result was stored.
+    """
+    cache_file = parse_cache_path(cache_dir, key)
+    try:
+        data = marshal.dumps(result_dict)
+        if len(data) > max_bytes:
+            return False
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(cache_file, data)
+        evict_parsed(cache_dir, max_bytes)
+    except (OSError, ValueError):
+        return False
+    return True
@@ -0,0 +1,64 @@
+import hashlib
+
+from cosmic.utils.file_oper import atomic_write_bytes
+from mako import __version__ as MAKO_VERSION
+from mako.template import Template
+from pathlib import Path
+from typing import Optional
+
+
+def compiled_module_path(template_file: Path, cache_dir: Path) -> Path:
+    """Returns the content-addressed path of the compiled python module of
+    a Mako template. The path changes whenever the template content or the
+    Mako version changes, so a cached module is never stale.
+
+    Args:
+        template_file (Path): The Mako template file.
+        cache_dir (Path): The cosmic cache directory.
+
+    Returns:
+        Path: The compiled module path.
+    """
+    digest = hashlib.sha256(MAKO_VERSION.encode())
+    digest.update(template_file.read_bytes())
+    return Path(
+        cache_dir,
+        "mako",
+        f"{template_file.stem}-{digest.hexdigest()[:32]}.py",
+    )
+
+
+def _write_module(source: bytes, module_file: str) -> None:
+    # Mako module writers receive the source first
+    atomic_write_bytes(module_file, source)
+
+
+def load_template(
+    template_file: Path,
+    cache_dir: Optional[Path] = None,
+) -> Template:
+    """Loads a Mako template, reusing its compiled module from the cache
+    directory when available. New modules are written with atomic renames,
+    so concurrent cosmic processes can share the same cache. If the cache
+    directory is not usable, the template is compiled in memory.
+
+    Args:
+        template_file (Path): The Mako template file.
+        cache_dir (Optional[Path]): The cosmic cache directory. Defaults to
+            None, which compiles the template in memory.
+
+    Returns:
+        Template: The loaded template.
+    """
+    if cache_dir is not None:
+        try:
+            module_file = compiled_module_path(template_file, cache_dir)
+            module_file.parent.mkdir(parents=True, exist_ok=True)
+            return Template(
+                filename=template_file.as_posix(),
+                module_filename=module_file.as_posix(),
+                module_writer=_write_module,
+            )
+        except OSError:
+            pass
+    return Template(filename=template_file.as_posix())
@@ -0,0 +1,26 @@
+from cosmic.utils.file_oper import atomic_write_bytes
+from pathlib import Path
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """Writes the content to the file, unless the file already holds the
+    exact same bytes. Unchanged files keep their modification time, so
+    regenerating identical code does not invalidate bytecode or test
+    caches downstream. Changed files are replaced atomically, so an
+    interrupted generation never leaves a half-written file behind.
+
+    Args:
+        path (Path): The destination file.
+        content (str): The file content.
+
+    Returns:
+        bool: Whether the file was written.
+    """
+    data = content.encode("utf-8")
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    atomic_write_bytes(path, data)
+    return True
@@ -1,19 +1,17 @@
 from pathlib import Path
-from rich import print
-from rich.console import Console
-from typer import Context, Exit, Option, Typer
-from rich.traceback import install
-from cosmic.generator.code_generator import CodeGenerator
+from typer import Argument, Context, Exit, Option, Typer, echo
+from typing import List, Optional
 
 
+# cosmic is called from build scripts many times per pipeline, so rich, the
+# xml stack and the code generator are only imported by the commands that
+# use them. `tests/test_main.py` enforces the import time budget.
 app = Typer()
-console = Console()
-install(show_locals=True)
 
 
 def version_callback(value: bool):
     if value:
-        console.print('COSMIC v0.1.0')
+        echo('COSMIC v0.1.0')
         raise Exit(code=0)
 
 
@@ -23,12 +21,28 @@ def main(
     version: bool = Option(None, '--version', callback=version_callback, is_eager=True),  # noqa
     xml: str = Option('uppaal', '--xml', '-x', help='The tool from which the XML file was generated'),  # noqa
     code: str = Option('pytransitions', '--code', '-c', help='The dialect of the code to be generated'),  # noqa
-    output: str = Option(..., '--output', '-o', help='The output directory for the generated code'),  # noqa
-    input: str = Option(..., '--input', '-i', help='The path to the XML file'),  # noqa
+    output: Optional[str] = Option(None, '--output', '-o', help='The output directory for the generated code'),  # noqa
+    input: Optional[str] = Option(None, '--input', '-i', help='The path to the XML file'),  # noqa
     generate_model: bool = Option(True, '--generate-model', '-m', help='Generate the model file'),  # noqa
+    jobs: int = Option(1, '--jobs', '-j', help='Worker processes used to parse the agents (0 uses every core)'),  # noqa
+    incremental: bool = Option(False, '--incremental', help='Only regenerate the agents that changed since the last incremental run'),  # noqa
+    no_cache: bool = Option(False, '--no-cache', help='Parse the XML file again instead of reusing the cached result'),  # noqa
+    profile: Optional[str] = Option(None, '--profile', help='Save the time spent in each phase and agent to this JSON file, plus a Chrome trace next to it'),  # noqa
 ):
     if ctx.invoked_subcommand:
         return
+    if input is None:
+        ctx.fail("Missing option '--input' / '-i'.")
+    if output is None:
+        ctx.fail("Missing option '--output' / '-o'.")
+    from rich import print
+    from rich.console import Console
+    from rich.traceback import install
+    from cosmic.generator.code_generator import CodeGenerator
+    from cosmic.utils.profiler import Profiler
+
+    install(show_locals=True)
+    console = Console()
     try:
         console.log('[bold]Welcome to COSMIC. Initializing...[/bold]')
         input_file = Path(input)
@@ -36,10 +50,14 @@ def main(
         if not (input_file.exists() and input_file.is_file()):
             console.log(f'[red]File not found: {input_file}[/red]')
             return
+        profiler = Profiler() if profile is not None else None
         cg = CodeGenerator(
             code_dialect=code,
             xml_dialect=xml,
             generate_model=generate_model,
+            jobs=jobs,
+            parse_cache=not no_cache,
+            profiler=profiler,
         )
         console.log(
             f'COSMIC Initialized using [code]{xml}[/code] and [code]{code}[/code].',  # noqa
@@ -53,10 +71,89 @@ def main(
             f'Generating code in [code]{output_dir}[/code].',
             markup=True,
         )
-        cg.generate_code(
+        summary = cg.generate_code(
             xml_file=input_file,
             output_dir=output_dir,
+            incremental=incremental,
         )
+        if summary['skipped']:
+            console.log(
+                f'Skipped {len(summary["skipped"])} unchanged agent(s).',
+            )
         console.log('[bold]Code generation completed![/bold]')
+        if profiler is not None:
+            trace_file = profiler.save(Path(profile))
+            console.log(
+                f'Profile saved to [code]{profile}[/code], trace saved to '
+                f'[code]{trace_file}[/code].',
+                markup=True,
+            )
     except Exception as e:
         print(f'[red]{e}[/red]')
+
+
+@app.command()
+def batch(
+    inputs: List[str] = Argument(..., help='XML files, directories or glob patterns'),  # noqa
+    output: str = Option(..., '--output', '-o', help='The output directory, with one subdirectory per input file'),  # noqa
+    xml: str = Option('uppaal', '--xml', '-x', help='The tool from which the XML files were generated'),  # noqa
+    code: str = Option('pytransitions', '--code', '-c', help='The dialect of the code to be generated'),  # noqa
+    generate_model: bool = Option(True, '--generate-model', '-m', help='Generate the model files'),  # noqa
+    jobs: int = Option(1, '--jobs', '-j', help='Worker processes used to generate the files (0 uses every core)'),  # noqa
+    incremental: bool = Option(False, '--incremental', help='Only regenerate the agents that changed since the last incremental run'),  # noqa
+    no_cache: bool = Option(False, '--no-cache', help='Parse the XML files again instead of reusing the cached results'),  # noqa
+):
+    """Generate code for many XML files in a single run."""
+    from rich.console import Console
+    from rich.table import Table
+    from cosmic.generator.batch import collect_inputs, run_batch
+
+    console = Console()
+    try:
+        input_files = collect_inputs(inputs)
+    except FileNotFoundError as e:
+        console.print(f'[red]{e}[/red]')
+        raise Exit(code=1)
+
+    console.log(
+        f'Generating code for {len(input_files)} file(s) in '
+        f'[code]{output}[/code].',
+        markup=True,
+    )
+    results = run_batch(
+        input_files,
+        Path(output),
+        generator_options=dict(
+            xml_dialect=xml,
+            code_dialect=code,
+            generate_model=generate_model,
+            parse_cache=not no_cache,
+        ),
+        jobs=jobs,
+        incremental=incremental,
+    )
+
+    table = Table(title='COSMIC batch summary')
+    table.add_column('Input')
+    table.add_column('Output')
+    table.add_column('Agents', justify='right')
+    table.add_column('Time (s)', justify='right')
+    table.add_column('Status')
+    for result in results:
+        table.add_row(
+            result['input_file'],
+            result['output_dir'],
+            str(result['agents']),
+            f'{result["seconds"]:.3f}',
+            f'[red]{result["error"]}[/red]' if 'error' in result else 'ok',
+        )
+    failures = sum('error' in result for result in results)
+    table.caption = (
+        f'{len(results)} file(s), '
+        f'{sum(result["agents"] for result in results)} agent(s), '
+        f'{sum(result["seconds"] for result in results):.3f}s, '
+        f'{failures} failure(s)'
+    )
+    console.print(table)
+    if failures:
+        raise Exit(code=1)
@@ -0,0 +1,475 @@
+import inspect
+import json
+import multiprocessing
+import os
+import signal
+import time
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, wait
+from cosmic.utils.file_oper import atomic_write_bytes
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypedDict,
+    Union,
+)
+
+
+CHECKPOINT_VERSION = 1
+# the shared memory holds signed 64 bit slots: the progress of each agent,
+# then the state id of each agent, -1 until its worker built it, then the
+# sweeps of each shard
+SLOT_FORMAT = "q"
+SLOT_SIZE = 8
+# while no agent of its shard can move, a worker started with
+# `until_idle=False` waits for this long before its next sweep
+IDLE_WAIT = 0.001
+
+
+class Checkpoint(TypedDict):
+    """Represents the state of a fleet at a point of its run.
+    The `states` key lists the state of each agent, None for the agents
+    that were not built yet, and `progress` the amount of transitions each
+    agent fired.
+    """
+    version: int
+    states: List[Optional[str]]
+    progress: List[int]
+
+
+class FleetSummary(TypedDict):
+    """Represents a fleet run.
+    The `sweeps` key is the amount of sweeps over their agents the shards
+    made, `fired` the amount of transitions fired, `elapsed` the wall time
+    of the run, and `stopped` whether it was stopped before its end.
+    """
+    sweeps: int
+    fired: int
+    elapsed: float
+    stopped: bool
+
+
+def restore_state(machine: Any, state: str) -> None:
+    """Puts a generated machine back in a state, without running any
+    callback. The default `restore` of the `FleetRunner`.
+
+    Args:
+        machine (Any): The machine, of the plain or pytransitions dialect.
+        state (str): The state name.
+    """
+    if hasattr(machine, "state_id"):
+        machine.state_id = machine.STATE_IDS[state]
+    else:
+        machine.set_state(state)
+
+
+def load_checkpoint(path: Union[Path, str]) -> Checkpoint:
+    """Loads a checkpoint written by `FleetRunner.checkpoint`.
+
+    Args:
+        path (Union[Path, str]): The checkpoint file.
+
+    Raises:
+        ValueError: If the file is not a checkpoint of the current
+            checkpoint version.
+
+    Returns:
+        Checkpoint: The checkpoint.
+    """
+    with open(path) as file:
+        checkpoint = json.load(file)
+    if (
+        not isinstance(checkpoint, dict)
+        or checkpoint.get("version") != CHECKPOINT_VERSION
+        or not isinstance(checkpoint.get("states"), list)
+        or not isinstance(checkpoint.get("progress"), list)
+        or len(checkpoint["states"]) != len(checkpoint["progress"])
+    ):
+        raise ValueError(f"{path} is not a valid fleet checkpoint.")
+    return checkpoint
+
+
+def get_shards(agents: int, workers: int) -> List[Tuple[int, int]]:
+    """Splits the agents into contiguous shards of balanced sizes.
+
+    Args:
+        agents (int): The amount of agents.
+        workers (int): The amount of shards wanted.
+
+    Returns:
+        List[Tuple[int, int]]: The (start, stop) agent range of each
+            shard. There are never more shards than agents.
+    """
+    workers = max(1, min(workers, agents))
+    size, extra = divmod(agents, workers)
+    shards, start = list(), 0
+    for shard in range(workers):
+        stop = start + size + (1 if shard < extra else 0)
+        shards.append((start, stop))
+        start = stop
+    return shards
+
+
+_stop_event = None
+
+
+def _init_worker(stop_event) -> None:
+    global _stop_event
+    _stop_event = stop_event
+    # the runner process handles the interruptions, and stops the workers
+    # through the stop event
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def _step_shard(
+    slots: memoryview,
+    agents: int,
+    shard: int,
+    start: int,
+    stop: int,
+    build: Callable[[int], Any],
+    restore: Callable[[Any, str], None],
+    states: Sequence[str],
+    max_sweeps: Optional[int],
+    until_idle: bool,
+) -> int:
+    state_ids = {state: state_id for state_id, state in enumerate(states)}
+    steps = list()
+    for index in range(start, stop):
+        machine = build(index)
+        if inspect.iscoroutinefunction(machine.next_state):
+            raise TypeError("The fleet runner needs synchronous machines.")
+        state_slot = agents + index
+        if slots[state_slot] < 0:
+            slots[state_slot] = state_ids[machine.state]
+        else:
+            restore(machine, states[slots[state_slot]])
+        steps.append((machine.next_state, machine, index, state_slot))
+
+    sweeps_slot = 2 * agents + shard
+    fired = sweeps = 0
+    while not _stop_event.is_set() and (
+        max_sweeps is None or sweeps < max_sweeps
+    ):
+        moved = 0
+        for next_state, machine, progress_slot, state_slot in steps:
+            if next_state():
+                moved += 1
+                slots[progress_slot] += 1
+                slots[state_slot] = state_ids[machine.state]
+        sweeps += 1
+        slots[sweeps_slot] = sweeps
+        fired += moved
+        if moved == 0:
+            if until_idle:
+                break
+            _stop_event.wait(IDLE_WAIT)
+    return fired
+
+
+def _run_shard(memory_name: str, *args) -> int:
+    memory = SharedMemory(name=memory_name)
+    try:
+        slots = memory.buf.cast(SLOT_FORMAT)
+        try:
+            return _step_shard(slots, *args)
+        finally:
+            slots.release()
+    finally:
+        memory.close()
+
+
+class FleetRunner:
+    """Runs many generated agents in parallel, across a process pool.
+    The agents are split into contiguous shards, one per worker process,
+    and each worker builds the machines of its shard once, then sweeps
+    over them, calling `next_state` on each, until it is stopped. The
+    workers publish the state and the progress of each agent in a shared
+    memory block, which the runner reads without pickling any machine.
+    Only synchronous machines are supported, and the agents do not
+    synchronise on channels across shards.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[int], Any],
+        agents: int,
+        states: Sequence[str],
+        workers: int = 0,
+        restore: Callable[[Any, str], None] = restore_state,
+        mp_context: Optional[multiprocessing.context.BaseContext] = None,
+    ) -> None:
+        """Constructor of the `FleetRunner` class.
+
+        Args:
+            build (Callable[[int], Any]): Builds the machine of an agent,
+                with its model, from the agent index. It is called in the
+                worker processes, so it must be picklable, such as a
+                module level function or a `functools.partial` of one.
+            agents (int): The amount of agents.
+            states (Sequence[str]): Every state the agents can be in, such
+                as the `STATES` of a plain machine.
+            workers (int): The amount of worker processes. Values lower
+                than 1 use every available core. Defaults to 0.
+            restore (Callable[[Any, str], None]): Puts a machine back in a
+                state, when resuming. Defaults to `restore_state`.
+            mp_context (Optional[multiprocessing.context.BaseContext]): The
+                multiprocessing context of the workers. Defaults to None,
+                the default context.
+        """
+        if workers <= 0:
+            workers = os.cpu_count() or 1
+        self.build = build
+        self.agents = agents
+        self.states = tuple(states)
+        self.restore = restore
+        self.shards = get_shards(agents, workers)
+        self._mp_context = mp_context or multiprocessing.get_context()
+        self._stop_event = self._mp_context.Event()
+        self._memory = SharedMemory(
+            create=True,
+            size=max(1, (2 * agents + len(self.shards)) * SLOT_SIZE),
+        )
+        self._slots = self._memory.buf.cast(SLOT_FORMAT)
+        self._executor = None
+        self._futures = None
+        self._start_time = 0.0
+        self._reset()
+
+    def _reset(self, resume: Optional[Checkpoint] = None) -> None:
+        agents = self.agents
+        state_ids = {
+            state: state_id for state_id, state in enumerate(self.states)
+        }
+        for index in range(agents):
+            progress, state = 0, None
+            if resume is not None:
+                progress = resume["progress"][index]
+                state = resume["states"][index]
+            self._slots[index] = progress
+            self._slots[agents + index] = (
+                state_ids[state] if state is not None else -1
+            )
+        for shard in range(len(self.shards)):
+            self._slots[2 * agents + shard] = 0
+
+    def start(
+        self,
+        max_sweeps: Optional[int] = None,
+        resume: Optional[Checkpoint] = None,
+        until_idle: bool = True,
+    ) -> None:
+        """Method to start the workers, without waiting for them.
+
+        Args:
+            max_sweeps (Optional[int]): The most sweeps of each shard.
+                Defaults to None, no limit.
+            resume (Optional[Checkpoint]): A checkpoint to resume from, such
+                as one returned by `snapshot`. Only the agents state and
+                progress are restored; their models start anew. Defaults
+                to None, starting every agent from its initial state.
+            until_idle (bool): Whether a shard ends once none of its agents
+                can move. Otherwise it waits, by `IDLE_WAIT` steps, until it
+                is stopped. Defaults to True.
+
+        Raises:
+            RuntimeError: If the runner is already running.
+            ValueError: If the checkpoint does not match the fleet.
+        """
+        if self._futures is not None:
+            raise RuntimeError("The fleet is already running.")
+        if resume is not None and len(resume["states"]) != self.agents:
+            raise ValueError(
+                f"The checkpoint has {len(resume['states'])} agents, "
+                f"the fleet has {self.agents}.",
+            )
+        self._reset(resume)
+        self._stop_event.clear()
+        self._executor = ProcessPoolExecutor(
+            max_workers=len(self.shards),
+            mp_context=self._mp_context,
+            initializer=_init_worker,
+            initargs=(self._stop_event,),
+        )
+        self._start_time = time.perf_counter()
+        self._futures = [
+            self._executor.submit(
+                _run_shard,
+                self._memory.name,
+                self.agents,
+                shard,
+                start,
+                stop,
+                self.build,
+                self.restore,
+                self.states,
+                max_sweeps,
+                until_idle,
+            )
+            for shard, (start, stop) in enumerate(self.shards)
+        ]
+
+    def stop(self) -> None:
+        """Method to ask the workers to stop after their current sweep.
+        """
+        self._stop_event.set()
+
+    def _wait(self, timeout: Optional[float] = None) -> bool:
+        _, pending = wait(self._futures, timeout)
+        return len(pending) == 0
+
+    def join(self) -> FleetSummary:
+        """Method to wait for the workers to end.
+
+        Raises:
+            RuntimeError: If the runner is not running.
+
+        Returns:
+            FleetSummary: The run summary.
+        """
+        if self._futures is None:
+            raise RuntimeError("The fleet is not running.")
+        try:
+            fired = sum(future.result() for future in self._futures)
+        finally:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = self._futures = None
+        return FleetSummary(
+            sweeps=sum(self.sweeps()),
+            fired=fired,
+            elapsed=time.perf_counter() - self._start_time,
+            stopped=self._stop_event.is_set(),
+        )
+
+    def run(
+        self,
+        max_sweeps: Optional[int] = None,
+        resume: Optional[Checkpoint] = None,
+        until_idle: bool = True,
+        checkpoint_path: Optional[Union[Path, str]] = None,
+        checkpoint_every: Optional[float] = None,
+    ) -> FleetSummary:
+        """Method to run the fleet until it ends, see `start`. An
+        interruption stops the workers after their current sweep, and the
+        final checkpoint is still written.
+
+        Args:
+            max_sweeps (Optional[int]): The most sweeps of each shard.
+                Defaults to None, no limit.
+            resume (Optional[Checkpoint]): A checkpoint to resume from.
+                Defaults to None.
+            until_idle (bool): Whether a shard ends once none of its agents
+                can move. Defaults to True.
+            checkpoint_path (Optional[Union[Path, str]]): The file where a
+                checkpoint is written at the end of the run. Defaults to
+                None, no checkpoint.
+            checkpoint_every (Optional[float]): The seconds between the
+                checkpoints written while running. Defaults to None, only
+                the final checkpoint.
+
+        Returns:
+            FleetSummary: The run summary.
+        """
+        self.start(max_sweeps, resume, until_idle)
+        try:
+            if checkpoint_path is not None and checkpoint_every:
+                while not self._wait(checkpoint_every):
+                    self.checkpoint(checkpoint_path)
+            summary = self.join()
+        except KeyboardInterrupt:
+            self.stop()
+            summary = self.join()
+        if checkpoint_path is not None:
+            self.checkpoint(checkpoint_path)
+        return summary
+
+    def progress(self) -> List[int]:
+        """Method to get the amount of transitions each agent fired.
+
+        Returns:
+            List[int]: The progress of each agent, by agent index.
+        """
+        return self._slots[:self.agents].tolist()
+
+    def sweeps(self) -> List[int]:
+        """Method to get the amount of sweeps of each shard in the current
+        or last run.
+
+        Returns:
+            List[int]: The sweeps of each shard.
+        """
+        start = 2 * self.agents
+        return self._slots[start:start + len(self.shards)].tolist()
+
+    def counts(self) -> Dict[str, int]:
+        """Method to count the agents in each state. While running, the
+        counts are read as the workers update them, so they may mix
+        consecutive sweeps.
+
+        Returns:
+            Dict[str, int]: The amount of agents in each state, leaving out
+                the agents that were not built yet.
+        """
+        counts = Counter(self._slots[self.agents:2 * self.agents].tolist())
+        return {
+            state: counts[state_id]
+            for state_id, state in enumerate(self.states)
+        }
+
+    def snapshot(self) -> Checkpoint:
+        """Method to get the state and the progress of each agent.
+
+        Returns:
+            Checkpoint: The fleet checkpoint.
+        """
+        return Checkpoint(
+            version=CHECKPOINT_VERSION,
+            states=[
+                self.states[state_id] if state_id >= 0 else None
+                for state_id in self._slots[
+                    self.agents:2 * self.agents
+                ].tolist()
+            ],
+            progress=self.progress(),
+        )
+
+    def checkpoint(self, path: Union[Path, str]) -> None:
+        """Method to write a snapshot of the fleet to a file, atomically,
+        to be loaded with `load_checkpoint`.
+
+        Args:
+            path (Union[Path, str]): The checkpoint file.
+        """
+        atomic_write_bytes(path, json.dumps(self.snapshot()).encode())
+
+    def close(self) -> None:
+        """Method to stop the workers, if running, and release the shared
+        memory.
+        """
+        if self._futures is not None:
+            self.stop()
+            try:
+                self.join()
+            finally:
+                self._release()
+        else:
+            self._release()
+
+    def _release(self) -> None:
+        self._slots.release()
+        self._memory.close()
+        self._memory.unlink()
+
+    def __enter__(self) -> "FleetRunner":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,75 @@
+import os
+import stat
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Union
+
+
+CACHE_DIR_ENV = "COSMIC_CACHE_DIR"
+
+
+def _read_umask() -> int:
+    # the umask can only be read by setting it, which is not thread safe,
+    # so it is read once, when the module is imported
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+
+UMASK = _read_umask()
+
+
+def user_cache_dir() -> Path:
+    """Returns the directory where cosmic keeps its caches. The location
+    can be overridden with the `COSMIC_CACHE_DIR` environment variable,
+    and otherwise follows the platform conventions.
+
+    Returns:
+        Path: The cosmic cache directory. It may not exist yet.
+    """
+    if os.environ.get(CACHE_DIR_ENV):
+        return Path(os.environ[CACHE_DIR_ENV])
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home().joinpath(
+            "AppData", "Local",
+        )
+    elif sys.platform == "darwin":
+        base = Path.home().joinpath("Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home().joinpath(
+            ".cache",
+        )
+    return Path(base, "cosmic")
+
+
+def atomic_write_bytes(path: Union[Path, str], data: bytes) -> None:
+    """Writes the data to a temporary file in the destination directory
+    and renames it into place. Readers either see the previous file or the
+    complete new one, and concurrent writers of the same content never
+    corrupt each other. The file keeps the mode of the file it replaces,
+    and new files get the default mode, as with `open`.
+
+    Args:
+        path (Union[Path, str]): The destination file.
+        data (bytes): The file content.
+    """
+    path = Path(path)
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=path.parent,
+        prefix=f".{path.name}.",
+        suffix=".tmp",
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~UMASK
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
@@ -0,0 +1,255 @@
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    NotRequired,
+    Optional,
+    TypedDict,
+)
+
+
+PROFILE_VERSION = 1
+TRACE_SUFFIX = ".trace.json"
+
+
+class PhaseEvent(TypedDict):
+    """Represents a single timed phase.
+    The `start` key is the time, in seconds, since the profiler was
+    created, while `wall` and `cpu` are the elapsed and the CPU seconds of
+    the phase. The CPU time only counts the thread running the phase,
+    identified by the `thread` key. The `agent` key is only present for
+    phases that handle a single agent.
+    """
+    name: str
+    start: float
+    wall: float
+    cpu: float
+    thread: int
+    agent: NotRequired[str]
+
+
+class PhaseTotals(TypedDict):
+    """Represents the sum of every event of a phase."""
+    count: int
+    wall: float
+    cpu: float
+
+
+class AgentProfile(TypedDict):
+    """Represents the size of an agent and the totals of its phases."""
+    states: int
+    transitions: int
+    declared_functions: int
+    phases: Dict[str, PhaseTotals]
+
+
+class Profile(TypedDict):
+    """Represents a profiled run.
+    The `wall` and `cpu` keys cover the whole run, `phases` holds the
+    totals of each phase name, `agents` the size and phases of each agent,
+    and `events` every timed phase, in the order they finished.
+    """
+    version: int
+    wall: float
+    cpu: float
+    phases: Dict[str, PhaseTotals]
+    agents: Dict[str, AgentProfile]
+    events: List[PhaseEvent]
+
+
+def _add_event(totals: Dict[str, PhaseTotals], event: PhaseEvent) -> None:
+    phase_totals = totals.setdefault(
+        event["name"],
+        PhaseTotals(count=0, wall=0.0, cpu=0.0),
+    )
+    phase_totals["count"] += 1
+    phase_totals["wall"] += event["wall"]
+    phase_totals["cpu"] += event["cpu"]
+
+
+class Profiler:
+    """Records the wall and CPU time of the phases of a code generation,
+    per phase and per agent, along with the size of each agent. Phases
+    may run concurrently on different threads.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.cpu_origin = time.process_time()
+        self.events: List[PhaseEvent] = list()
+        self.agents: Dict[str, Dict[str, int]] = dict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, agent: Optional[str] = None) -> Iterator[None]:
+        """Times the code run inside the context as a phase. The phase is
+        recorded even if the code raises an exception.
+
+        Args:
+            name (str): The phase name.
+            agent (Optional[str]): The agent handled by the phase. Defaults
+                to None.
+        """
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            event = PhaseEvent(
+                name=name,
+                start=start - self.origin,
+                wall=time.perf_counter() - start,
+                cpu=time.thread_time() - cpu_start,
+                thread=threading.get_ident(),
+            )
+            if agent is not None:
+                event["agent"] = agent
+            with self._lock:
+                self.events.append(event)
+
+    def record_agent(
+        self,
+        agent: str,
+        states: int,
+        transitions: int,
+        declared_functions: int,
+    ) -> None:
+        """Records the size of an agent.
+
+        Args:
+            agent (str): The agent name.
+            states (int): The amount of states.
+            transitions (int): The amount of transitions.
+            declared_functions (int): The amount of declared functions.
+        """
+        with self._lock:
+            self.agents[agent] = {
+                "states": states,
+                "transitions": transitions,
+                "declared_functions": declared_functions,
+            }
+
+    def to_dict(self) -> Profile:
+        """Summarizes the recorded phases.
+
+        Returns:
+            Profile: The profiled run.
+        """
+        with self._lock:
+            events = list(self.events)
+            agent_sizes = dict(self.agents)
+
+        phases, agents = dict(), dict()
+        for agent, sizes in agent_sizes.items():
+            agents[agent] = AgentProfile(**sizes, phases=dict())
+        for event in events:
+            _add_event(phases, event)
+            if "agent" in event:
+                agent_profile = agents.setdefault(
+                    event["agent"],
+                    AgentProfile(
+                        states=0,
+                        transitions=0,
+                        declared_functions=0,
+                        phases=dict(),
+                    ),
+                )
+                _add_event(agent_profile["phases"], event)
+        return Profile(
+            version=PROFILE_VERSION,
+            wall=time.perf_counter() - self.origin,
+            cpu=time.process_time() - self.cpu_origin,
+            phases=phases,
+            agents=agents,
+            events=events,
+        )
+
+    def to_chrome_trace(self) -> Dict[str, Any]:
+        """Converts the recorded phases to the Chrome trace-event format,
+        which can be opened in `chrome://tracing` or Perfetto.
+
+        Returns:
+            Dict[str, Any]: The trace, in the JSON object format.
+        """
+        with self._lock:
+            events = list(self.events)
+
+        pid = os.getpid()
+        threads = dict()
+        trace_events = list()
+        for event in events:
+            tid = threads.setdefault(event["thread"], len(threads))
+            args = {"cpu_ms": event["cpu"] * 1000}
+            name = event["name"]
+            if "agent" in event:
+                args["agent"] = event["agent"]
+                name = f"{name} {event['agent']}"
+            trace_events.append({
+                "name": name,
+                "cat": event["name"],
+                "ph": "X",
+                "ts": event["start"] * 1_000_000,
+                "dur": event["wall"] * 1_000_000,
+                "pid": pid,
+                "tid": tid,
+                "args": args,
+            })
+        main_thread = threading.main_thread().ident
+        for thread, tid in threads.items():
+            thread_name = "main" if thread == main_thread else f"worker {tid}"
+            trace_events.append({
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": thread_name},
+            })
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def save(self, path: Path) -> Path:
+        """Saves the profile as JSON to the given path, and the Chrome
+        trace next to it, replacing the path suffix with `.trace.json`.
+
+        Args:
+            path (Path): The profile file.
+
+        Returns:
+            Path: The trace file.
+        """
+        path = Path(path)
+        trace_path = path.with_suffix(TRACE_SUFFIX)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+        trace_path.write_text(json.dumps(self.to_chrome_trace()))
+        return trace_path
+
+
+def profile_phase(
+    profiler: Optional[Profiler],
+    name: str,
+    agent: Optional[str] = None,
+) -> ContextManager:
+    """Returns the context timing a phase, or an empty context when there
+    is no profiler.
+
+    Args:
+        profiler (Optional[Profiler]): The profiler, if any.
+        name (str): The phase name.
+        agent (Optional[str]): The agent handled by the phase. Defaults to
+            None.
+
+    Returns:
+        ContextManager: The phase context.
+    """
+    if profiler is None:
+        return nullcontext()
+    return profiler.phase(name, agent)
@@ -1,7 +1,41 @@
 import re
+from functools import lru_cache
 from num2words import num2words
+from typing import Tuple
 
 
+# location names, guards and updates repeat across edges and agents, so
+# normalized names are cached for the whole run.
+NAME_CACHE_SIZE = 8192
+# numeric tokens up to this value are spelled from a table built once.
+NUMBER_WORDS_LIMIT = 100
+
+OPERATORS_MAP = {
+    "!=": "neq",
+    "==": "eq",
+    ">": "gt",
+    "<": "lt",
+    ">=": "gte",
+    "<=": "lte",
+    "&&": "and",
+    "||": "or",
+    "+": "plus",
+    "-": "minus",
+    "*": "times",
+    "/": "over",
+    "%": "mod",
+    "=": "assign",
+    "+=": "increase",
+    "-=": "decrease",
+    "*=": "multiply",
+    "/=": "divide",
+    "%=": "modulo",
+}
+
+_UPPERCASE_BOUNDARY = re.compile(r'(?<!^)(?=[A-Z])')
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def to_snake_case(name: str) -> str:
     """Converts a given string to snake_case.
 
@@ -11,9 +45,40 @@ def to_snake_case(name: str) -> str:
     Returns:
         str: The string in snake_case.
     """
-    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+    return _UPPERCASE_BOUNDARY.sub('_', name).lower()
+
+
+def _spell_number(number: str) -> str:
+    return to_snake_case(
+        num2words(number).replace(" ", "_").replace("-", "_"),
+    )
+
+
+@lru_cache(maxsize=1)
+def _number_words_table() -> Tuple[str, ...]:
+    return tuple(
+        _spell_number(str(number))
+        for number in range(NUMBER_WORDS_LIMIT + 1)
+    )
+
+
+@lru_cache(maxsize=NAME_CACHE_SIZE)
+def number_to_words(number: str) -> str:
+    """Spells a numeric token as a snake_case identifier, such as
+    `two_hundred_and_fifty_six` for `256`.
+
+    Args:
+        number (str): The numeric token.
+
+    Returns:
+        str: The number spelled in snake_case.
+    """
+    if number.isdecimal() and int(number) <= NUMBER_WORDS_LIMIT:
+        return _number_words_table()[int(number)]
+    return _spell_number(number)
 
 
+@lru_cache(maxsize=NAME_CACHE_SIZE)
 def generate_function_name(condition: str) -> str:
     """Resolve the function name from the condition.
     :Warning: This function is implemented just as a placeholder.
@@ -25,16 +90,6 @@ def generate_function_name(condition: str) -> str:
     Returns:
         str: the function name.
     """
-    operators_map = {
-        "!=": "neq",
-        "==": "eq",
-        ">": "gt",
-        "<": "lt",
-        ">=": "gte",
-        "<=": "lte",
-        "&&": "and",
-        "||": "or",
-    }
     if condition.startswith("!"):
         condition = condition[1:]
     if condition.endswith("++"):
@@ -45,9 +100,7 @@ def generate_function_name(condition: str) -> str:
     components_processed = [None] * len(components)
     for idx, c in enumerate(components):
         if c.isnumeric():
-            components_processed[idx] = to_snake_case(
-                num2words(c).replace(" ", "_").replace("-", "_"),
-            )
+            components_processed[idx] = number_to_words(c)
         else:
-            components_processed[idx] = to_snake_case(operators_map.get(c, c))
+            components_processed[idx] = to_snake_case(OPERATORS_MAP.get(c, c))
     return "_".join(components_processed)
@@ -0,0 +1,99 @@
+import pytest
+import sys
+from cosmic.adapter.entities.compact_template import (
+    CompactMachineTemplate,
+    CompactState,
+    CompactTransition,
+)
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter
+
+
+@pytest.mark.parametrize(
+    'state',
+    [
+        State(name='init'),
+        State(name='init', on_enter=['log_state'], on_exit=['log_exit']),
+    ],
+)
+def test_compact_state_round_trip(state):
+    compact = CompactState.from_dict(state)
+    assert compact.to_dict() == state
+    assert not hasattr(compact, '__dict__')
+
+
+@pytest.mark.parametrize(
+    'transition',
+    [
+        Transition(trigger='a_to_b', source='a', dest='b'),
+        Transition(
+            trigger='a_to_b',
+            source='a',
+            dest='b',
+            conditions=['x_eq_zero'],
+            unless=['activated'],
+            after=['reset_queue'],
+        ),
+        Transition(trigger='a_to_b', source='a', dest='b', send='go'),
+        Transition(
+            trigger='a_to_b',
+            source='a',
+            dest='b',
+            conditions=['ready'],
+            receive='go',
+        ),
+        Transition(
+            trigger='a_to_b',
+            source='a',
+            dest='b',
+            branchpoint='id5',
+            weight=0.25,
+        ),
+        Transition(
+            trigger='a_to_b',
+            source='a',
+            dest='b',
+            branchpoint='id5',
+            weight='failure_weight',
+        ),
+    ],
+)
+def test_compact_transition_round_trip(transition):
+    compact = CompactTransition.from_dict(transition)
+    assert compact.to_dict() == transition
+    assert not hasattr(compact, '__dict__')
+
+
+def test_compact_transition_interns_names():
+    first = CompactTransition(
+        ''.join(['a_to', '_b']), 'a', 'b', conditions=[''.join(['x_', 'y'])],
+    )
+    second = CompactTransition(
+        ''.join(['a_', 'to_b']), 'a', 'b', conditions=[''.join(['x', '_y'])],
+    )
+    assert first.trigger is second.trigger
+    assert first.conditions[0] is second.conditions[0]
+    assert first.conditions[0] is sys.intern('x_y')
+    assert isinstance(first.conditions, tuple)
+    assert first.before is None
+
+
+def test_compact_machine_template_round_trip(xml_file):
+    for machine_template in UppaalAdapter.get_xml_data(xml_file).values():
+        compact = CompactMachineTemplate.from_dict(machine_template)
+        assert compact.to_dict() == machine_template
+
+
+def test_compact_machine_template_without_declared_functions():
+    machine_template = MachineTemplate(
+        initial_state='a',
+        states=[State(name='a')],
+        transitions=[],
+    )
+    compact = CompactMachineTemplate.from_dict(machine_template)
+    assert compact.declared_functions is None
+    assert compact.to_dict() == machine_template
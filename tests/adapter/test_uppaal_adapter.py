@@ -1,5 +1,12 @@
 import pytest
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing import get_context
 from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter
+from cosmic.adapter.xml.uppaal_expression import ExpressionError
+from cosmic.adapter.entities.compact_template import CompactMachineTemplate
+from cosmic.utils.profiler import Profiler
 from cosmic.adapter.entities.machine_template import (
     MachineTemplate,
     State,
@@ -121,7 +128,46 @@ def test_declare_functions(conditions, unless, expected):
                         "halt_op",
                     ],
                 }
-            )
+            ),
+            (
+                "(ready(queue[0]) || retry>3) && !halt_op(f(x), 1)",
+                {
+                    "conditions": ["ready", "retry_gt_three"],
+                    "unless": ["halt_op"],
+                    "declared_functions": [
+                        "ready",
+                        "retry_gt_three",
+                        "halt_op",
+                    ],
+                }
+            ),
+            (
+                "(busy ? retry > 3 : true) && !(x == 0 ? a : b)",
+                {
+                    "conditions": ["busy_retry_gt_three_true"],
+                    "unless": ["x_eq_zero_a_b"],
+                    "declared_functions": [
+                        "busy_retry_gt_three_true",
+                        "x_eq_zero_a_b",
+                    ],
+                }
+            ),
+            (
+                "(forall (i : int[0, 2]) ready[i]) && "
+                "!(exists (r : robot_t) busy(r)) && (sum (s : id_t) q[s]) > 1",
+                {
+                    "conditions": [
+                        "forall_i_int_0_2_ready_i",
+                        "sum_s_id_t_q_s_gt_one",
+                    ],
+                    "unless": ["exists_r_robot_t_busy_r"],
+                    "declared_functions": [
+                        "forall_i_int_0_2_ready_i",
+                        "exists_r_robot_t_busy_r",
+                        "sum_s_id_t_q_s_gt_one",
+                    ],
+                }
+            ),
         ]
 )
 def test_filter_conditions(label_text, expected):
@@ -137,6 +183,11 @@ def test_filter_conditions(label_text, expected):
             assert func in result['declared_functions']
 
 
+def test_filter_updates_keeps_valid_names():
+    result = UppaalAdapter.filter_updates('num_kits ++, ready[i] = true')
+    assert result['after'] == ['num_kits__increment', 'ready_i_assign_true']
+
+
 def test_evalute_transition_without_labels(uppaal_simple_transition_element):
     has_label, content = UppaalAdapter.evaluate_transition(
         uppaal_simple_transition_element,
@@ -159,6 +210,148 @@ def test_evaluate_transition(uppaal_transition_element):
     assert content['after'] == ['y_eq_zero', 'in_op_eq_false', 'reset_queue']
 
 
+@pytest.mark.parametrize(
+    'label_text, expected',
+    [
+        ('generate_ticket!', {'send': 'generate_ticket'}),
+        (' kit_ready ? ', {'receive': 'kit_ready'}),
+        ('go[id]!', {'send': 'go[id]'}),
+        ('', {}),
+        (None, {}),
+    ],
+)
+def test_filter_synchronisation(label_text, expected):
+    assert UppaalAdapter.filter_synchronisation(label_text) == expected
+
+
+@pytest.mark.parametrize('label_text', ['go', '!', 'go!?x'])
+def test_filter_synchronisation_raises_expression_error(label_text):
+    with pytest.raises(ExpressionError):
+        UppaalAdapter.filter_synchronisation(label_text)
+
+
+def test_evaluate_transition_with_synchronisation(
+    uppaal_transition_element,
+):
+    sync_label = ET.SubElement(
+        uppaal_transition_element,
+        'label',
+        kind='synchronisation',
+    )
+    sync_label.text = 'go!'
+    has_label, content = UppaalAdapter.evaluate_transition(
+        uppaal_transition_element,
+    )
+    assert has_label
+    assert content['send'] == 'go'
+    assert content['conditions'] == ['x_eq_zero', 'force_stop']
+
+
+def test_parse_channels():
+    declaration = """
+    // chan commented;
+    chan a, b[3];
+    broadcast chan c; /* chan d; */
+    urgent broadcast chan e;
+    urgent chan f;
+    int chance = 1;
+    """
+    assert UppaalAdapter.parse_channels(declaration) == {
+        'a': 'binary',
+        'b': 'binary',
+        'c': 'broadcast',
+        'e': 'broadcast',
+        'f': 'binary',
+    }
+    assert UppaalAdapter.parse_channels(None) == {}
+
+
+def test_get_network_data(xml_file):
+    network = UppaalAdapter.get_network_data(xml_file)
+    assert len(network['channels']) == 21
+    assert network['channels']['generate_ticket'] == 'broadcast'
+    assert len(network['instances']) == 9
+    assert network['instances'][1] == {
+        'name': 'human_receiver_icu',
+        'agent': 'HumanReceiver',
+        'arguments': ['0'],
+    }
+
+
+def test_parse_parameters():
+    parameters = UppaalAdapter.parse_parameters(
+        'int sectorType, const int &limit, /* flags */ bool flags[3][N]',
+    )
+    assert parameters == [
+        {'name': 'sector_type', 'type': 'int'},
+        {'name': 'limit', 'type': 'const int &'},
+        {'name': 'flags', 'type': 'bool [3][N]'},
+    ]
+    assert UppaalAdapter.parse_parameters('') == []
+
+
+def test_parse_template_keeps_the_parameters(xml_file):
+    result_dict = UppaalAdapter.get_xml_data(xml_file)
+    assert result_dict['Sector']['parameters'] == [
+        {'name': 'sector_type', 'type': 'int'},
+    ]
+    assert 'parameters' not in result_dict['RobotDeliver']
+
+
+def test_parse_parameters_raises_expression_error():
+    with pytest.raises(ExpressionError):
+        UppaalAdapter.parse_parameters('int a, sector')
+
+
+def test_parse_system():
+    system = """
+    // Place template instantiations here.
+    first = Worker(1, true);
+    second = Worker(N + 1, false); /* third = Worker(3); */
+    Partial(int i) = Worker(i, true);
+    system first, second < Robot_Arm;
+    """
+    assert UppaalAdapter.parse_system(system) == [
+        {'name': 'first', 'agent': 'Worker', 'arguments': ['1', 'true']},
+        {
+            'name': 'second',
+            'agent': 'Worker',
+            'arguments': ['N + 1', 'false'],
+        },
+        {'name': 'Robot_Arm', 'agent': 'RobotArm', 'arguments': []},
+    ]
+    assert UppaalAdapter.parse_system(None) == []
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_get_xml_data_collects_the_declarations(xml_file, streaming):
+    declarations = dict()
+    UppaalAdapter.get_xml_data(
+        xml_file,
+        streaming=streaming,
+        declarations=declarations,
+    )
+    assert set(declarations) == set(UppaalAdapter.NETWORK_ELEMENTS)
+    assert UppaalAdapter.parse_network(declarations) == \
+        UppaalAdapter.get_network_data(xml_file)
+
+
+def test_get_xml_data_parses_synchronisations(xml_file):
+    result_dict = UppaalAdapter.get_xml_data(xml_file)
+    transitions = [
+        transition
+        for machine_template in result_dict.values()
+        for transition in machine_template['transitions']
+    ]
+    sends = [t['send'] for t in transitions if 'send' in t]
+    receives = [t['receive'] for t in transitions if 'receive' in t]
+    assert len(sends) + len(receives) == 45
+    assert set(receives) <= set(sends)
+    for machine_template in result_dict.values():
+        for function in machine_template.get('declared_functions', []):
+            assert not function.endswith(('!', '?'))
+
+
 def test_get_xml_data(xml_file):
     result_dict = UppaalAdapter.get_xml_data(xml_file)
     expected_agents = {'RobotAssembler', 'HumanReceiver',
@@ -166,6 +359,102 @@ def test_get_xml_data(xml_file):
     assert set(result_dict.keys()) == expected_agents
 
 
+def test_get_xml_data_streaming_matches_tree_parsing(xml_file):
+    expected = UppaalAdapter.get_xml_data(xml_file)
+    result = UppaalAdapter.get_xml_data(xml_file, streaming=True)
+    assert list(result.keys()) == list(expected.keys())
+    assert result == expected
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_get_xml_data_parallel_matches_serial(
+    xml_file, monkeypatch, streaming,
+):
+    monkeypatch.setattr(UppaalAdapter, 'PARALLEL_MIN_TEMPLATES', 1)
+    expected = UppaalAdapter.get_xml_data(xml_file)
+    result = UppaalAdapter.get_xml_data(
+        xml_file, streaming=streaming, jobs=2,
+    )
+    assert list(result.keys()) == list(expected.keys())
+    assert result == expected
+
+
+def test_get_xml_data_parallel_matches_serial_with_spawn(
+    xml_file, monkeypatch,
+):
+    # spawned workers get a new string hash seed, unlike forked ones
+    monkeypatch.setattr(UppaalAdapter, 'PARALLEL_MIN_TEMPLATES', 1)
+    monkeypatch.setattr(
+        'cosmic.adapter.xml.uppaal_adapter.ProcessPoolExecutor',
+        partial(ProcessPoolExecutor, mp_context=get_context('spawn')),
+    )
+    expected = UppaalAdapter.get_xml_data(xml_file)
+    result = UppaalAdapter.get_xml_data(xml_file, jobs=2)
+    assert list(result.keys()) == list(expected.keys())
+    for agent_name, machine_template in result.items():
+        assert machine_template == expected[agent_name]
+        assert machine_template.get('declared_functions') == \
+            expected[agent_name].get('declared_functions')
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_get_xml_data_parallel_skips_pool_for_small_files(
+    xml_file, mocker, streaming,
+):
+    pool = mocker.patch(
+        'cosmic.adapter.xml.uppaal_adapter.ProcessPoolExecutor',
+    )
+    expected = UppaalAdapter.get_xml_data(xml_file)
+    result = UppaalAdapter.get_xml_data(
+        xml_file, streaming=streaming, jobs=4,
+    )
+    pool.assert_not_called()
+    assert result == expected
+
+
+def test_get_xml_data_all_cores(xml_file, mocker):
+    cpu_count = mocker.patch(
+        'cosmic.adapter.xml.uppaal_adapter.os.cpu_count', return_value=None,
+    )
+    result = UppaalAdapter.get_xml_data(xml_file, jobs=0)
+    cpu_count.assert_called_once()
+    assert result == UppaalAdapter.get_xml_data(xml_file)
+
+
+def test_iter_xml_templates_releases_previous_templates(xml_file):
+    seen = list()
+    for agent_name, template in UppaalAdapter.iter_xml_templates(xml_file):
+        assert template.tag == 'template'
+        assert template.find('location') is not None
+        seen.append((agent_name, template))
+    assert [name for name, _ in seen] == [
+        'RobotAssembler', 'HumanReceiver', 'HumanValidator',
+        'Sector', 'RobotDeliver',
+    ]
+    for _, template in seen:
+        assert len(template) == 0
+
+
+def test_template_digest(uppaal_branchpoint_machine):
+    digest = UppaalAdapter.template_digest(uppaal_branchpoint_machine)
+    assert digest == UppaalAdapter.template_digest(uppaal_branchpoint_machine)
+
+    location = uppaal_branchpoint_machine.find('location')
+    location.set('x', '0')
+    location.find('name').set('y', '0')
+    ET.SubElement(uppaal_branchpoint_machine.find('transition'), 'nail')
+    assert UppaalAdapter.template_digest(uppaal_branchpoint_machine) == digest
+
+    location.find('name').text = 'Begin'
+    assert UppaalAdapter.template_digest(uppaal_branchpoint_machine) != digest
+
+
+def test_get_agent_name(uppaal_branchpoint_machine):
+    assert UppaalAdapter.get_agent_name(
+        uppaal_branchpoint_machine,
+    ) == 'BranchMachine'
+
+
 def test_build_transition(uppaal_transition_element):
     id_to_state = {
         '1d1': 'state1',
@@ -220,6 +509,7 @@ def test_parse_transitions(uppaal_branchpoint_machine):
         id_to_state=id_to_state,
         element_transitions=transitions_list,
         element_branchpoints=branchpoints_list,
+        constants={'systemFailure': (1, 99)},
     )
 
     expected = [
@@ -232,11 +522,15 @@ def test_parse_transitions(uppaal_branchpoint_machine):
             trigger='decision_to_retry',
             source='decision',
             dest='retry',
+            branchpoint='id5',
+            weight=1,
         ),
         Transition(
             trigger='decision_to_success',
             source='decision',
             dest='success',
+            branchpoint='id5',
+            weight=99,
         ),
         Transition(
             trigger='retry_to_decision',
@@ -255,6 +549,110 @@ def test_parse_transitions(uppaal_branchpoint_machine):
         assert result_transition in expected
 
 
+def test_parse_transitions_reads_the_variable_weights(
+    uppaal_branchpoint_machine,
+):
+    result = UppaalAdapter.parse_transitions(
+        id_to_state={
+            'id0': 'start',
+            'id1': 'decision',
+            'id2': 'success',
+            'id3': 'retry',
+            'id4': 'finish',
+        },
+        element_transitions=uppaal_branchpoint_machine.findall('transition'),
+        element_branchpoints=uppaal_branchpoint_machine.findall(
+            'branchpoint',
+        ),
+    )
+    weights = {
+        transition['trigger']: transition['weight']
+        for transition in result if 'weight' in transition
+    }
+    assert weights == {
+        'decision_to_success': 'system_failure_1',
+        'decision_to_retry': 'system_failure_0',
+    }
+    _, declared_functions = UppaalAdapter.filter_declarations(result)
+    assert declared_functions == ['system_failure_1', 'system_failure_0']
+
+
+def test_parse_constants():
+    declaration = """
+    const int N = 2; // int commented = 3;
+    int a = 1, b[N] = {N, a * 3}, c[2][2] = {{1, 2}, {3, 4}};
+    double p = 0.5;
+    bool ok = true;
+    int unset, unknown = f();
+    chan go;
+    int f() { return 1; }
+    """
+    assert UppaalAdapter.parse_constants(declaration) == {
+        'N': 2,
+        'a': 1,
+        'b': (2, 3),
+        'c': ((1, 2), (3, 4)),
+        'p': 0.5,
+        'ok': True,
+    }
+    assert UppaalAdapter.parse_constants(None) == {}
+
+
+@pytest.mark.parametrize(
+    'label_text, expected',
+    [
+        (None, 1),
+        ('', 1),
+        ('3', 3),
+        ('weights[1] / 2', 2),
+        ('0.25', 0.25),
+        ('load()', 'load'),
+        ('weights[i]', 'weights_i'),
+    ]
+)
+def test_evaluate_weight(label_text, expected):
+    constants = {'weights': (1, 4)}
+    assert UppaalAdapter.evaluate_weight(label_text, constants) == expected
+
+
+@pytest.mark.parametrize('label_text', ['-1', 'true', 'weights', 'a +'])
+def test_evaluate_weight_raises_expression_error(label_text):
+    with pytest.raises(ExpressionError):
+        UppaalAdapter.evaluate_weight(label_text, {'weights': (1, 4)})
+
+
+def test_index_edges(uppaal_branchpoint_machine):
+    transitions_list = uppaal_branchpoint_machine.findall('transition')
+    edges, edges_by_source = UppaalAdapter.index_edges(transitions_list)
+    assert [(source, target) for _, source, target in edges] == [
+        ('id2', 'id4'),
+        ('id3', 'id1'),
+        ('id5', 'id2'),
+        ('id5', 'id3'),
+        ('id1', 'id5'),
+        ('id0', 'id1'),
+    ]
+    assert [edge for edge, _, _ in edges] == transitions_list
+    assert [target for _, _, target in edges_by_source['id5']] == [
+        'id2', 'id3',
+    ]
+
+
+def test_find_branchpoint_target(uppaal_branchpoint_machine):
+    transitions_list = uppaal_branchpoint_machine.findall('transition')
+    _, edges_by_source = UppaalAdapter.index_edges(transitions_list)
+    expected = [transitions_list[2], transitions_list[3]]
+    assert UppaalAdapter.find_branchpoint_target(
+        'id5', transitions_list,
+    ) == expected
+    assert UppaalAdapter.find_branchpoint_target(
+        'id5', transitions_list, edges_by_source,
+    ) == expected
+    assert UppaalAdapter.find_branchpoint_target(
+        'id9', transitions_list, edges_by_source,
+    ) == []
+
+
 def test_parse_template(uppaal_branchpoint_machine):
     result = UppaalAdapter.parse_template(
         uppaal_branchpoint_machine,
@@ -283,11 +681,15 @@ def test_parse_template(uppaal_branchpoint_machine):
                 dest='success',
                 source='decision',
                 trigger='decision_to_success',
+                branchpoint='id5',
+                weight=99,
             ),
             Transition(
                 dest='retry',
                 source='decision',
                 trigger='decision_to_retry',
+                branchpoint='id5',
+                weight=1,
             ),
             Transition(
                 dest='decision',
@@ -330,3 +732,43 @@ def test_build_state(uppaal_state_element):
         assert func in result_functions
     for key in expected_state.keys():
         assert result_state[key] == expected_state[key]
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_get_xml_data_compact(xml_file, monkeypatch, jobs):
+    monkeypatch.setattr(UppaalAdapter, 'PARALLEL_MIN_TEMPLATES', 1)
+    expected = UppaalAdapter.get_xml_data(xml_file)
+    result = UppaalAdapter.get_xml_data(xml_file, jobs=jobs, compact=True)
+    assert list(result.keys()) == list(expected.keys())
+    for agent_name, compact in result.items():
+        assert isinstance(compact, CompactMachineTemplate)
+        assert compact.to_dict() == expected[agent_name]
+
+
+@pytest.mark.parametrize(
+    'streaming, jobs, phases',
+    [
+        (False, 1, {'find_xml_root', 'parse_template'}),
+        (True, 1, {'parse_template'}),
+        (True, 2, {'parse_template'}),
+    ],
+)
+def test_get_xml_data_profiles_each_agent(xml_file, streaming, jobs, phases):
+    profiler = Profiler()
+    result = UppaalAdapter.get_xml_data(
+        xml_file, streaming=streaming, jobs=jobs, profiler=profiler,
+    )
+    assert {event['name'] for event in profiler.events} == phases
+    assert [
+        event['agent'] for event in profiler.events
+        if event['name'] == 'parse_template'
+    ] == list(result)
+
+
+def test_get_xml_data_profiles_the_pool_as_a_whole(xml_file, monkeypatch):
+    monkeypatch.setattr(UppaalAdapter, 'PARALLEL_MIN_TEMPLATES', 1)
+    profiler = Profiler()
+    UppaalAdapter.get_xml_data(xml_file, jobs=2, profiler=profiler)
+    assert [event['name'] for event in profiler.events] == [
+        'find_xml_root', 'parse_templates_in_pool',
+    ]
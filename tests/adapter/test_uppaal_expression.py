@@ -0,0 +1,290 @@
+import pytest
+from cosmic.adapter.xml.uppaal_expression import (
+    Binary,
+    Binder,
+    Call,
+    Conditional,
+    ExpressionError,
+    Index,
+    Literal,
+    Member,
+    Name,
+    Postfix,
+    Token,
+    Unary,
+    compile_guard,
+    compile_updates,
+    evaluate_constant,
+    guard_atoms,
+    parse_expression,
+    parse_expression_list,
+    resolve_function,
+    to_source,
+    tokenize,
+)
+
+
+def test_tokenize():
+    assert tokenize('x>=1 && !ok() // done') == [
+        Token('name', 'x'),
+        Token('operator', '>='),
+        Token('number', '1'),
+        Token('operator', '&&'),
+        Token('operator', '!'),
+        Token('name', 'ok'),
+        Token('operator', '('),
+        Token('operator', ')'),
+    ]
+
+
+def test_tokenize_normalizes_keyword_operators():
+    assert [token.text for token in tokenize('a and not b or c := 1')] == [
+        'a', '&&', '!', 'b', '||', 'c', '=', '1',
+    ]
+
+
+def test_tokenize_raises_expression_error():
+    with pytest.raises(ExpressionError):
+        tokenize('x # y')
+
+
+def test_parse_expression_precedence():
+    assert parse_expression('a || b && c == 1 + 2 * 3') == Binary(
+        '||',
+        Name('a'),
+        Binary(
+            '&&',
+            Name('b'),
+            Binary(
+                '==',
+                Name('c'),
+                Binary(
+                    '+',
+                    Literal('1'),
+                    Binary('*', Literal('2'), Literal('3')),
+                ),
+            ),
+        ),
+    )
+
+
+def test_parse_expression_postfix():
+    assert parse_expression('robot.queue[i]++') == Postfix(
+        '++',
+        Index(Member(Name('robot'), 'queue'), Name('i')),
+    )
+    assert parse_expression('!f(a && b, g(c))') == Unary(
+        '!',
+        Call(
+            Name('f'),
+            (
+                Binary('&&', Name('a'), Name('b')),
+                Call(Name('g'), (Name('c'),)),
+            ),
+        ),
+    )
+
+
+def test_parse_expression_conditional():
+    assert parse_expression('x = a || b ? c : d ? e : f') == Binary(
+        '=',
+        Name('x'),
+        Conditional(
+            Binary('||', Name('a'), Name('b')),
+            Name('c'),
+            Conditional(Name('d'), Name('e'), Name('f')),
+        ),
+    )
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [
+        (
+            'forall (i : int[0, N - 1]) ready[i] && ok',
+            Binder(
+                'forall',
+                'i',
+                'int',
+                (Literal('0'), Binary('-', Name('N'), Literal('1'))),
+                Binary('&&', Index(Name('ready'), Name('i')), Name('ok')),
+            ),
+        ),
+        (
+            'exists (r : robot_t) busy(r)',
+            Binder(
+                'exists',
+                'r',
+                'robot_t',
+                (),
+                Call(Name('busy'), (Name('r'),)),
+            ),
+        ),
+        (
+            'sum (i : int[0, 2]) queue[i]',
+            Binder(
+                'sum',
+                'i',
+                'int',
+                (Literal('0'), Literal('2')),
+                Index(Name('queue'), Name('i')),
+            ),
+        ),
+        ('sum(a, b)', Call(Name('sum'), (Name('a'), Name('b')))),
+    ],
+)
+def test_parse_expression_binders(text, expected):
+    assert parse_expression(text) == expected
+
+
+@pytest.mark.parametrize(
+    'text',
+    [
+        '', 'a &&', '(a || b', '(a || b]', 'f(a,)', 'a b', 'robot.1',
+        'a ? b', 'forall (i : 1) a', 'sum (i : int[0]) a',
+    ],
+)
+def test_parse_expression_raises_expression_error(text):
+    with pytest.raises(ExpressionError):
+        parse_expression(text)
+
+
+def test_parse_expression_list():
+    assert parse_expression_list('x = 0,\nreset(a, b)') == (
+        Binary('=', Name('x'), Literal('0')),
+        Call(Name('reset'), (Name('a'), Name('b'))),
+    )
+    assert parse_expression_list('  ') == tuple()
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [
+        ('x>=1', 'x >= 1'),
+        ('(a || b) && c', '(a || b) && c'),
+        ('a - (b - c)', 'a - (b - c)'),
+        ('x = y = 0', 'x = y = 0'),
+        ('!(a && b)', '!(a && b)'),
+        ('-queue[ icu ]', '-queue[icu]'),
+        ('f( a,b )', 'f(a, b)'),
+        ('count ++', 'count++'),
+        ('robot.queue [0]', 'robot.queue[0]'),
+        ('x=a?b:c', 'x = a ? b : c'),
+        ('(a ? b : c) + 1', '(a ? b : c) + 1'),
+        ('a ? b : (c ? d : e)', 'a ? b : c ? d : e'),
+        ('(a ? b : c) ? d : e', '(a ? b : c) ? d : e'),
+        ('forall(i:int[0,3])ready[i]', 'forall (i : int[0, 3]) ready[i]'),
+        (
+            '(exists (r : robot_t) busy(r)) && ok',
+            '(exists (r : robot_t) busy(r)) && ok',
+        ),
+        ('sum (i : id_t) q[i] > 2', 'sum (i : id_t) q[i] > 2'),
+    ],
+)
+def test_to_source(text, expected):
+    assert to_source(parse_expression(text)) == expected
+
+
+def test_guard_atoms():
+    atoms = guard_atoms(parse_expression('!a() && (b || !!c) || !(d && e)'))
+    assert [(negated, to_source(node)) for negated, node in atoms] == [
+        (True, 'a()'),
+        (False, 'b'),
+        (False, 'c'),
+        (True, 'd && e'),
+    ]
+
+
+def test_compile_guard():
+    assert compile_guard('is_ready(queue[0], f(x)) && !(x>=3)') == (
+        ('is_ready(queue[0], f(x))',),
+        ('x >= 3',),
+    )
+    assert compile_guard('') == (tuple(), tuple())
+
+
+def test_compile_guard_keeps_the_text_as_written():
+    assert compile_guard('ok( ) && !(x>=3) || (y ++)', canonical=False) == (
+        ('ok( )', 'y ++'),
+        ('x>=3',),
+    )
+
+
+def test_compile_guard_with_conditionals_and_binders():
+    assert compile_guard(
+        'forall (i : int[0, 2]) ready[i] && !(busy ? a : b)',
+    ) == (
+        ('forall (i : int[0, 2]) ready[i] && !(busy ? a : b)',),
+        tuple(),
+    )
+    assert compile_guard('(exists (r : robot_t) busy(r)) && !(a ? b : c)') \
+        == (('exists (r : robot_t) busy(r)',), ('a ? b : c',))
+
+
+def test_compile_guard_is_cached():
+    compile_guard.cache_clear()
+    for _ in range(10):
+        compile_guard('dependencies_met() && retry > 3')
+    info = compile_guard.cache_info()
+    assert info.misses == 1
+    assert info.hits == 9
+
+
+def test_compile_updates():
+    assert compile_updates('elapsed_time = 0,\nreset(a, b), i++') == (
+        'elapsed_time = 0', 'reset(a, b)', 'i++',
+    )
+    assert compile_updates('x=busy?0:x+1, i ++', canonical=False) == (
+        'x=busy?0:x+1', 'i ++',
+    )
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [
+        ('isValid()', (True, 'is_valid')),
+        ('reset(queue, 0)', (True, 'reset')),
+        ('retry > 3', (False, 'retry_gt_three')),
+        ('elapsed_time>=limit', (False, 'elapsed_time_gte_limit')),
+        ('num_kits ++', (False, 'num_kits__increment')),
+        ('arm_ready = false', (False, 'arm_ready_assign_false')),
+        ('queue[icu] != reset', (False, 'queue_icu_neq_reset')),
+        ('x = busy ? 0 : x + 1', (False, 'x_assign_busy_zero_x_plus_one')),
+        (
+            'forall (i : int[0, 2]) ready[i]',
+            (False, 'forall_i_int_0_2_ready_i'),
+        ),
+        ('0.5 < x', (False, '_0_5_lt_x')),
+    ],
+)
+def test_resolve_function(text, expected):
+    assert resolve_function(text) == expected
+
+
+@pytest.mark.parametrize(
+    'text, expected',
+    [
+        ('weights[1] * 2', 8),
+        ('-7 / 2', -3),
+        ('-7 % 2', -1),
+        ('7 % -2', 1),
+        ('1.5 / 2', 0.75),
+        ('N > 1 ? 0.5 : 2', 0.5),
+        ('N < 1 ? 0.5 : 2', 2),
+        ('!false', True),
+        ('grid[1][0] + N', 5),
+    ],
+)
+def test_evaluate_constant(text, expected):
+    constants = {'N': 2, 'weights': (1, 4), 'grid': ((0, 1), (3, 4))}
+    assert evaluate_constant(parse_expression(text), constants) == expected
+
+
+@pytest.mark.parametrize(
+    'text',
+    ['x', 'weights[N]', 'weights[2]', '7 / 0', '1.5 % 2', 'f()', 'N++'],
+)
+def test_evaluate_constant_raises_expression_error(text):
+    constants = {'N': 2, 'weights': (1, 4)}
+    with pytest.raises(ExpressionError):
+        evaluate_constant(parse_expression(text), constants)
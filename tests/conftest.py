@@ -1,7 +1,21 @@
 import pytest
+from cosmic.utils.file_oper import CACHE_DIR_ENV
 from pathlib import Path
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch) -> Path:
+    """Fixture to keep the cosmic caches of each test in a temporary
+    directory, instead of the user cache directory.
+
+    Returns:
+        Path: The cache directory.
+    """
+    path = tmp_path_factory.mktemp('cosmic_cache')
+    monkeypatch.setenv(CACHE_DIR_ENV, str(path))
+    return path
+
+
 @pytest.fixture
 def xml_file() -> Path:
     """Fixture to return a valid xml file path.
@@ -0,0 +1,143 @@
+import importlib.util
+import pytest
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import NETWORK_FILE, CodeGenerator
+from cosmic.utils.string_oper import to_snake_case
+
+
+# the package each dialect generated code needs
+DIALECT_RUNTIMES = {
+    'pytransitions': 'transitions',
+    'pytransitions-async': 'transitions',
+    'numpy': 'numpy',
+}
+
+
+@pytest.fixture
+def guarded_machine() -> MachineTemplate:
+    """Fixture to return a machine that retries until `is_ok` holds.
+    """
+    return MachineTemplate(
+        initial_state='start',
+        states=[
+            State(name='start'),
+            State(name='decision'),
+            State(name='success'),
+            State(name='retry'),
+            State(name='finished'),
+        ],
+        transitions=[
+            Transition(
+                trigger='start_to_decision',
+                source='start',
+                dest='decision',
+            ),
+            Transition(
+                trigger='decision_to_success',
+                source='decision',
+                dest='success',
+                conditions=['is_ok'],
+            ),
+            Transition(
+                trigger='decision_to_retry',
+                source='decision',
+                dest='retry',
+                unless=['is_ok'],
+                after=['count_retry'],
+            ),
+            Transition(
+                trigger='retry_to_decision',
+                source='retry',
+                dest='decision',
+            ),
+            Transition(
+                trigger='success_to_finished',
+                source='success',
+                dest='finished',
+            ),
+        ],
+        declared_functions=['is_ok', 'count_retry'],
+    )
+
+
+@pytest.fixture
+def waiting_machine() -> MachineTemplate:
+    """Fixture to return a machine that waits until `is_ok` holds.
+    """
+    return MachineTemplate(
+        initial_state='waiting',
+        states=[State(name='waiting'), State(name='finished')],
+        transitions=[
+            Transition(
+                trigger='waiting_to_finished',
+                source='waiting',
+                dest='finished',
+                conditions=['is_ok'],
+            ),
+        ],
+        declared_functions=['is_ok'],
+    )
+
+
+@pytest.fixture
+def generated_module(tmp_path):
+    """Fixture to render an agent with the given code dialect and import
+    its machine module. Skipped when the dialect runtime is missing.
+
+    Returns:
+        Callable: Receives the agent name, the agent data and the code
+            dialect, and returns the imported machine module.
+    """
+    def generate(agent_name, data, code_dialect='pytransitions'):
+        if code_dialect in DIALECT_RUNTIMES:
+            pytest.importorskip(DIALECT_RUNTIMES[code_dialect])
+        code_generator = CodeGenerator(
+            'uppaal',
+            code_dialect,
+            show_progress=False,
+        )
+        code_generator.write_agent(agent_name, data, tmp_path)
+        module_name = to_snake_case(agent_name)
+        spec = importlib.util.spec_from_file_location(
+            f'generated_{module_name}_{id(data)}',
+            tmp_path / f'{module_name}.py',
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return generate
+
+
+@pytest.fixture
+def generated_network(tmp_path):
+    """Fixture to render the network module of the given code dialect and
+    import it. Skipped when the dialect runtime is missing.
+
+    Returns:
+        Callable: Receives the channels and the code dialect, and returns
+            the imported network module.
+    """
+    def generate(channels, code_dialect='pytransitions'):
+        if code_dialect in DIALECT_RUNTIMES:
+            pytest.importorskip(DIALECT_RUNTIMES[code_dialect])
+        code_generator = CodeGenerator(
+            'uppaal',
+            code_dialect,
+            show_progress=False,
+        )
+        network_file = tmp_path / NETWORK_FILE
+        network_file.write_text(
+            code_generator.render_network({'channels': channels}),
+        )
+        spec = importlib.util.spec_from_file_location(
+            f'generated_network_{id(channels)}',
+            network_file,
+        )
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return generate
@@ -0,0 +1,100 @@
+import pytest
+from pathlib import Path
+from cosmic.generator import batch
+from cosmic.generator.batch import (
+    assign_output_dirs,
+    collect_inputs,
+    generate_file,
+    run_batch,
+)
+from cosmic.generator.code_generator import CodeGenerator
+
+
+GENERATOR_OPTIONS = {
+    'xml_dialect': 'uppaal',
+    'code_dialect': 'pytransitions',
+}
+
+
+@pytest.fixture
+def mock_files() -> Path:
+    return Path('tests/mock_files')
+
+
+def test_collect_inputs(mock_files):
+    expected = [
+        mock_files / 'branchpoint_machine.xml',
+        mock_files / 'hcl_teste.xml',
+    ]
+    assert collect_inputs([str(mock_files)]) == expected
+    assert collect_inputs([str(mock_files / '*.xml')]) == expected
+    assert collect_inputs([
+        str(mock_files / 'hcl_teste.xml'),
+        str(mock_files),
+    ]) == expected[::-1]
+
+
+def test_collect_inputs_raises_file_not_found_error(mock_files):
+    with pytest.raises(FileNotFoundError):
+        collect_inputs([str(mock_files / '*.uppaal')])
+
+
+def test_assign_output_dirs(tmp_path):
+    inputs = [Path('a', 'model.xml'), Path('b', 'model.xml'), Path('x.xml')]
+    assert assign_output_dirs(inputs, tmp_path) == {
+        inputs[0]: tmp_path / 'model',
+        inputs[1]: tmp_path / 'model_2',
+        inputs[2]: tmp_path / 'x',
+    }
+
+
+def test_generate_file_records_errors(tmp_path):
+    result = generate_file(
+        CodeGenerator(**GENERATOR_OPTIONS),
+        tmp_path / 'missing.xml',
+        tmp_path / 'output',
+    )
+    assert 'not found' in result['error']
+    assert result['agents'] == 0
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_run_batch(mock_files, tmp_path, jobs):
+    inputs = collect_inputs([str(mock_files)])
+    results = run_batch(inputs, tmp_path, GENERATOR_OPTIONS, jobs=jobs)
+    assert [result['input_file'] for result in results] == [
+        str(input_file) for input_file in inputs
+    ]
+    assert [result['agents'] for result in results] == [1, 5]
+    assert all('error' not in result for result in results)
+    assert (tmp_path / 'branchpoint_machine' / 'branch_machine.py').exists()
+    assert (tmp_path / 'hcl_teste' / 'sector.py').exists()
+
+
+def test_run_batch_reuses_one_code_generator(mock_files, tmp_path, mocker):
+    spy = mocker.spy(CodeGenerator, '__init__')
+    inputs = collect_inputs([str(mock_files)]) * 3
+    results = run_batch(inputs, tmp_path, GENERATOR_OPTIONS, jobs=1)
+    assert len(results) == 6
+    assert spy.call_count == 1
+
+
+def test_worker_reuses_its_code_generator(mock_files, tmp_path, mocker):
+    spy = mocker.spy(CodeGenerator, '__init__')
+    batch._init_worker(GENERATOR_OPTIONS)
+    for name in ('first', 'second'):
+        result = batch._generate_in_worker(
+            mock_files / 'hcl_teste.xml', tmp_path / name, False,
+        )
+        assert result['agents'] == 5
+    assert spy.call_count == 1
+
+
+def test_run_batch_all_cores(mock_files, tmp_path, mocker):
+    cpu_count = mocker.patch(
+        'cosmic.generator.batch.os.cpu_count', return_value=None,
+    )
+    inputs = collect_inputs([str(mock_files)])
+    results = run_batch(inputs, tmp_path, GENERATOR_OPTIONS, jobs=0)
+    cpu_count.assert_called()
+    assert [result['agents'] for result in results] == [1, 5]
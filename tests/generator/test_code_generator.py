@@ -1,6 +1,17 @@
+import json
+import os
 import pytest
+import subprocess
+import sys
 from pathlib import Path
-from cosmic.generator.code_generator import CodeGenerator
+from cosmic.generator.code_generator import (
+    NETWORK_FILE,
+    SYSTEM_FILE,
+    CodeGenerator,
+)
+from cosmic.generator.manifest import MANIFEST_FILE
+from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter
+from cosmic.utils.profiler import Profiler
 from cosmic.adapter.entities.machine_template import (
     MachineTemplate,
     State,
@@ -84,6 +95,98 @@ def test_get_template_file_raises_not_implemented_error():
         CodeGenerator.get_template_file('other_dialect')
 
 
+def test_get_template_network_file_raises_not_implemented_error():
+    with pytest.raises(NotImplementedError):
+        CodeGenerator.get_template_network_file('other_dialect')
+
+
+def test_get_template_system_file_raises_not_implemented_error():
+    with pytest.raises(NotImplementedError):
+        CodeGenerator.get_template_system_file('other_dialect')
+
+
+def test_generate_code_writes_the_system_module(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    code_generator.generate_code(xml_file, tmp_path)
+    namespace = dict()
+    exec((tmp_path / SYSTEM_FILE).read_text(), namespace)
+    assert namespace['INSTANCES'][:2] == (
+        ('human_validator', 'HumanValidator', ()),
+        ('human_receiver_icu', 'HumanReceiver', (0,)),
+    )
+
+    class Machine:
+        def __init__(self, model):
+            self.model = model
+
+    class Model:
+        def __init__(self, *arguments):
+            self.arguments = arguments
+
+    agents = namespace['build_agents'](
+        {agent: Machine for _, agent, _ in namespace['INSTANCES']},
+        {agent: Model for _, agent, _ in namespace['INSTANCES']},
+    )
+    assert len(agents) == 9
+    assert agents['sector_pediatrics'].model.arguments == (2,)
+
+
+def test_render_system_converts_the_literal_arguments(code_generator):
+    content = code_generator.render_system({
+        'channels': {},
+        'instances': [
+            {
+                'name': 'worker',
+                'agent': 'Worker',
+                'arguments': ['-1', 'true', 'N + 1'],
+            },
+        ],
+    })
+    namespace = dict()
+    exec(content, namespace)
+    assert namespace['INSTANCES'] == (
+        ('worker', 'Worker', (-1, True, 'N + 1')),
+    )
+
+
+def test_generate_code_writes_the_model_constructor(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    code_generator.generate_code(xml_file, tmp_path)
+    namespace = dict()
+    exec((tmp_path / 'sector_model.py').read_text(), namespace)
+    model = namespace['SectorModel'](1)
+    assert model.sector_type == 1
+    assert 'sector_type' in namespace['SectorModel'].__slots__
+
+
+def test_generate_code_writes_the_network_module(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    code_generator.generate_code(xml_file, tmp_path)
+    network_file = tmp_path / NETWORK_FILE
+    assert network_file.is_file()
+    content = network_file.read_text()
+    assert "'generate_ticket': 'broadcast'," in content
+    assert 'async def' not in content
+
+
+def test_render_network_of_the_async_dialect():
+    code_generator = CodeGenerator(
+        'uppaal', 'pytransitions-async', show_progress=False,
+    )
+    content = code_generator.render_network({'channels': {'go': 'binary'}})
+    assert "'go': 'binary'," in content
+    assert 'async def step(self)' in content
+
+
 def test_generate_code_raises_file_not_found_error(code_generator):
     with pytest.raises(FileNotFoundError):
         code_generator.generate_code(
@@ -113,3 +216,284 @@ def test_generated_code_is_saved_in_output_dir(
     )
 
     assert len(list(output_path.iterdir())) == 1
+
+
+def test_generate_code_leaves_identical_files_untouched(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    first = code_generator.generate_code(xml_file, output_path)
+    assert first['unchanged'] == []
+    mtimes = {f.name: f.stat().st_mtime_ns for f in output_path.iterdir()}
+    (output_path / 'sector.py').write_text('edited by hand')
+
+    second = code_generator.generate_code(xml_file, output_path)
+    assert second['generated'] == first['generated']
+    assert second['unchanged'] == [
+        agent for agent in first['generated'] if agent != 'Sector'
+    ]
+    for generated_file in output_path.iterdir():
+        if generated_file.name != 'sector.py':
+            assert generated_file.stat().st_mtime_ns == \
+                mtimes[generated_file.name]
+    assert 'edited by hand' not in (output_path / 'sector.py').read_text()
+
+
+def test_render_agent(code_generator, result_dict_mock):
+    rendered = code_generator.render_agent(
+        'MockMachine', result_dict_mock['MockMachine'],
+    )
+    assert list(rendered) == ['mock_machine.py']
+    assert 'class MockMachine(GraphMachine):' in rendered['mock_machine.py']
+
+
+def test_generate_code_incremental_skips_unchanged_agents(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    first = code_generator.generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    assert first['skipped'] == []
+    assert len(first['generated']) == 5
+    manifest = json.loads((output_path / MANIFEST_FILE).read_text())
+    assert set(manifest['agents']) == set(first['generated'])
+    mtimes = {f.name: f.stat().st_mtime_ns for f in output_path.iterdir()}
+
+    second = code_generator.generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    assert second['generated'] == []
+    assert second['skipped'] == first['generated']
+    for generated_file in output_path.iterdir():
+        if generated_file.name != MANIFEST_FILE:
+            assert generated_file.stat().st_mtime_ns == \
+                mtimes[generated_file.name]
+
+
+def test_generate_code_incremental_regenerates_changed_agents(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    code_generator.generate_code(xml_file, output_path, incremental=True)
+
+    changed_file = tmp_path / 'changed.xml'
+    changed_file.write_text(
+        xml_file.read_text().replace(
+            '<name x="-909" y="-178">waiting_ticket</name>',
+            '<name x="-900" y="-100">waiting_new_ticket</name>',
+        ),
+    )
+    summary = code_generator.generate_code(
+        changed_file, output_path, incremental=True,
+    )
+    assert summary['generated'] == ['Sector']
+    assert 'waiting_new_ticket' in (output_path / 'sector.py').read_text()
+
+
+def test_generate_code_incremental_regenerates_missing_files(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    code_generator.generate_code(xml_file, output_path, incremental=True)
+    (output_path / 'sector.py').unlink()
+
+    summary = code_generator.generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    assert summary['generated'] == ['Sector']
+    assert (output_path / 'sector.py').exists()
+
+
+@pytest.mark.parametrize(
+    'target, value',
+    [
+        ('cosmic.adapter.xml.uppaal_adapter.UppaalAdapter.VERSION', '0'),
+        ('cosmic.generator.code_generator.cosmic_version', lambda: '0.0.0'),
+    ],
+)
+def test_generate_code_incremental_regenerates_on_new_versions(
+    xml_file,
+    tmp_path,
+    monkeypatch,
+    target,
+    value,
+):
+    output_path = tmp_path / 'output'
+    CodeGenerator('uppaal', 'pytransitions').generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    monkeypatch.setattr(target, value)
+    summary = CodeGenerator('uppaal', 'pytransitions').generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    assert summary['skipped'] == []
+
+
+def test_generate_code_incremental_reads_the_xml_file_once(
+    code_generator,
+    xml_file,
+    tmp_path,
+    mocker,
+):
+    iter_elements = mocker.spy(UppaalAdapter, '_iter_top_level_elements')
+    code_generator.generate_code(xml_file, tmp_path, incremental=True)
+    assert iter_elements.call_count == 1
+    assert (tmp_path / NETWORK_FILE).is_file()
+
+
+def test_generate_code_incremental_regenerates_changed_channels(
+    code_generator,
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    code_generator.generate_code(xml_file, output_path, incremental=True)
+
+    changed_file = tmp_path / 'changed.xml'
+    changed_file.write_text(
+        xml_file.read_text().replace(
+            'broadcast chan generate_ticket;',
+            'chan generate_ticket;',
+        ),
+    )
+    summary = code_generator.generate_code(
+        changed_file, output_path, incremental=True,
+    )
+    assert summary['generated'] == []
+    assert "'generate_ticket': 'binary'," in \
+        (output_path / NETWORK_FILE).read_text()
+
+
+def test_generate_code_removes_the_network_without_channels(
+    code_generator,
+    tmp_path,
+):
+    xml_file = Path('tests/mock_files/branchpoint_machine.xml')
+    (tmp_path / NETWORK_FILE).write_text('stale')
+    code_generator.generate_code(xml_file, tmp_path)
+    assert not (tmp_path / NETWORK_FILE).exists()
+    assert (tmp_path / SYSTEM_FILE).is_file()
+
+
+def test_generate_code_removes_the_system_without_instances(
+    code_generator,
+    tmp_path,
+):
+    xml_file = tmp_path / 'no_system.xml'
+    xml_file.write_text(
+        Path('tests/mock_files/branchpoint_machine.xml').read_text().replace(
+            'system Process;',
+            '',
+        ),
+    )
+    output_path = tmp_path / 'output'
+    output_path.mkdir()
+    (output_path / SYSTEM_FILE).write_text('stale')
+    code_generator.generate_code(xml_file, output_path)
+    assert not (output_path / SYSTEM_FILE).exists()
+
+
+def test_generate_code_incremental_regenerates_on_new_options(
+    xml_file,
+    tmp_path,
+):
+    output_path = tmp_path / 'output'
+    CodeGenerator('uppaal', 'pytransitions').generate_code(
+        xml_file, output_path, incremental=True,
+    )
+    summary = CodeGenerator(
+        'uppaal', 'pytransitions', generate_model=False,
+    ).generate_code(xml_file, output_path, incremental=True)
+    assert summary['skipped'] == []
+
+
+def test_generate_code_reuses_the_parsed_result(
+    xml_file,
+    tmp_path,
+    mocker,
+):
+    first = CodeGenerator('uppaal', 'pytransitions', show_progress=False)
+    first.generate_code(xml_file, tmp_path / 'first')
+
+    second = CodeGenerator('uppaal', 'pytransitions', show_progress=False)
+    get_xml_data = mocker.spy(second.xml_adapter, 'get_xml_data')
+    second.generate_code(xml_file, tmp_path / 'second')
+    get_xml_data.assert_not_called()
+    for generated_file in (tmp_path / 'first').iterdir():
+        assert generated_file.read_text() == \
+            (tmp_path / 'second' / generated_file.name).read_text()
+
+
+def test_generate_code_is_reproducible_across_processes(xml_file, tmp_path):
+    script = (
+        'import sys; from pathlib import Path; '
+        'from cosmic.generator.code_generator import CodeGenerator; '
+        'CodeGenerator("uppaal", "pytransitions", show_progress=False, '
+        'parse_cache=False).generate_code(Path(sys.argv[1]), '
+        'Path(sys.argv[2]))'
+    )
+    for hash_seed in ('1', '2'):
+        subprocess.run(
+            [sys.executable, '-c', script, xml_file, tmp_path / hash_seed],
+            env={**os.environ, 'PYTHONHASHSEED': hash_seed},
+            check=True,
+        )
+    for generated_file in (tmp_path / '1').iterdir():
+        assert generated_file.read_bytes() == \
+            (tmp_path / '2' / generated_file.name).read_bytes()
+
+
+def test_generate_code_without_parse_cache(
+    xml_file,
+    cache_dir,
+    tmp_path,
+    mocker,
+):
+    code_generator = CodeGenerator(
+        'uppaal',
+        'pytransitions',
+        show_progress=False,
+        parse_cache=False,
+    )
+    get_xml_data = mocker.spy(code_generator.xml_adapter, 'get_xml_data')
+    code_generator.generate_code(xml_file, tmp_path / 'first')
+    code_generator.generate_code(xml_file, tmp_path / 'second')
+    assert get_xml_data.call_count == 2
+    assert not (cache_dir / 'parsed').exists()
+
+
+@pytest.mark.parametrize('incremental', [False, True])
+def test_generate_code_with_profiler(xml_file, tmp_path, incremental):
+    profiler = Profiler()
+    code_generator = CodeGenerator(
+        'uppaal', 'pytransitions', show_progress=False, profiler=profiler,
+    )
+    summary = code_generator.generate_code(
+        xml_file, tmp_path / 'output', incremental=incremental,
+    )
+    profile = profiler.to_dict()
+    for phase in ['load_templates', 'parse', 'parse_template', 'render',
+                  'write', 'generate']:
+        assert phase in profile['phases']
+    assert ('save_manifest' in profile['phases']) == incremental
+    assert list(profile['agents']) == summary['generated']
+    sector = profile['agents']['Sector']
+    assert sector['states'] > 0 and sector['transitions'] > 0
+    assert {'parse_template', 'render', 'write'} <= set(sector['phases'])
+
+
+def test_record_agent_sizes_of_dictionaries(code_generator, result_dict_mock):
+    code_generator.profiler = Profiler()
+    code_generator.record_agent_sizes(result_dict_mock)
+    assert code_generator.profiler.agents['MockMachine'] == {
+        'states': 5, 'transitions': 5, 'declared_functions': 0,
+    }
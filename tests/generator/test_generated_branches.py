@@ -0,0 +1,183 @@
+import asyncio
+import pytest
+from collections import Counter
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import CodeGenerator
+
+
+class BranchModel:
+
+    def __init__(self, failure=1):
+        self.failure = failure
+
+    def failure_weight(self):
+        return self.failure
+
+
+class AsyncBranchModel(BranchModel):
+
+    async def failure_weight(self):
+        await asyncio.sleep(0)
+        return self.failure
+
+
+def branch_machine(failure_weight) -> MachineTemplate:
+    return MachineTemplate(
+        initial_state='decision',
+        states=[
+            State(name='decision'),
+            State(name='success'),
+            State(name='retry'),
+        ],
+        transitions=[
+            Transition(
+                trigger='decision_to_success',
+                source='decision',
+                dest='success',
+                branchpoint='id5',
+                weight=3,
+            ),
+            Transition(
+                trigger='decision_to_retry',
+                source='decision',
+                dest='retry',
+                branchpoint='id5',
+                weight=failure_weight,
+            ),
+            Transition(
+                trigger='retry_to_decision',
+                source='retry',
+                dest='decision',
+            ),
+            Transition(
+                trigger='success_to_decision',
+                source='success',
+                dest='decision',
+            ),
+        ],
+        declared_functions=['failure_weight'],
+    )
+
+
+def alias_distribution(probabilities, aliases):
+    distribution = [0.0] * len(probabilities)
+    for column, probability in enumerate(probabilities):
+        distribution[column] += probability / len(probabilities)
+        distribution[aliases[column]] += \
+            (1 - probability) / len(probabilities)
+    return distribution
+
+
+@pytest.mark.parametrize(
+    'weights',
+    [[1], [1, 1], [1, 99], [0, 2, 1], [0.5, 0.25, 0.125, 0.125], [5, 1, 4]],
+)
+def test_get_alias_table(weights):
+    probabilities, aliases = CodeGenerator.get_alias_table(weights)
+    assert len(probabilities) == len(aliases) == len(weights)
+    assert alias_distribution(probabilities, aliases) == pytest.approx(
+        [weight / sum(weights) for weight in weights],
+    )
+
+
+@pytest.mark.parametrize('weights', [[], [0, 0]])
+def test_get_alias_table_raises_value_error(weights):
+    with pytest.raises(ValueError):
+        CodeGenerator.get_alias_table(weights)
+
+
+def test_get_branch_table():
+    table = CodeGenerator.get_branch_table(branch_machine(1))
+    assert list(table) == ['decision']
+    (triggers, probabilities, aliases), = table['decision']
+    assert triggers == ('decision_to_success', 'decision_to_retry')
+    assert alias_distribution(probabilities, aliases) == \
+        pytest.approx([0.75, 0.25])
+
+
+def test_get_branch_table_with_model_weights():
+    machine = branch_machine('failure_weight')
+    machine['transitions'].insert(
+        0,
+        Transition(trigger='decision_to_retry_now', source='decision',
+                   dest='retry', conditions=['failure_weight']),
+    )
+    assert CodeGenerator.get_branch_table(machine) == {
+        'decision': (
+            'decision_to_retry_now',
+            (
+                ('decision_to_success', 'decision_to_retry'),
+                None,
+                (3, 'failure_weight'),
+            ),
+        ),
+    }
+
+
+def run_branches(machine, steps=4000):
+    picks = Counter()
+    for _ in range(steps):
+        assert machine.next_state()
+        picks[machine.state] += 1
+        assert machine.next_state()
+    return picks
+
+
+@pytest.mark.parametrize('code_dialect', ['pytransitions', 'plain'])
+@pytest.mark.parametrize('failure_weight', [1, 'failure_weight'])
+def test_generated_machine_picks_the_branches_by_weight(
+    generated_module,
+    code_dialect,
+    failure_weight,
+):
+    module = generated_module(
+        'Branch', branch_machine(failure_weight), code_dialect,
+    )
+    picks = run_branches(module.Branch(BranchModel(), seed=7))
+    assert picks['success'] / sum(picks.values()) == \
+        pytest.approx(0.75, abs=0.03)
+    assert run_branches(module.Branch(BranchModel(), seed=7)) == picks
+
+
+@pytest.mark.parametrize('code_dialect', ['pytransitions', 'plain'])
+def test_generated_machine_reads_the_model_weights(
+    generated_module,
+    code_dialect,
+):
+    module = generated_module(
+        'Branch', branch_machine('failure_weight'), code_dialect,
+    )
+    model = BranchModel(failure=0)
+    assert run_branches(module.Branch(model), 50) == {'success': 50}
+
+
+def test_generated_async_machine_picks_the_branches_by_weight(
+    generated_module,
+):
+    module = generated_module(
+        'Branch', branch_machine('failure_weight'), 'pytransitions-async',
+    )
+
+    async def run(seed):
+        machine = module.Branch(AsyncBranchModel(), seed=seed)
+        picks = Counter()
+        for _ in range(2000):
+            assert await machine.next_state()
+            picks[machine.state] += 1
+            assert await machine.next_state()
+        return picks
+
+    picks = asyncio.run(run(3))
+    assert picks['success'] / 2000 == pytest.approx(0.75, abs=0.04)
+    assert asyncio.run(run(3)) == picks
+
+    constant = generated_module(
+        'ConstantBranch', branch_machine(1), 'pytransitions-async',
+    )
+    machine = constant.ConstantBranch(AsyncBranchModel(), seed=3)
+    assert asyncio.run(machine.next_state())
+    assert machine.state in ('success', 'retry')
@@ -0,0 +1,247 @@
+import asyncio
+import pytest
+import threading
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import CodeGenerator
+
+
+class SenderModel:
+
+    def __init__(self, shared, ready=True):
+        self.shared = shared
+        self.ready = ready
+
+    def is_ready(self):
+        return self.ready
+
+    def close(self):
+        self.shared['open'] = False
+
+
+class ReceiverModel:
+
+    def __init__(self, shared, accept=True):
+        self.shared = shared
+        self.accept = accept
+        self.checks = 0
+
+    def accepts(self):
+        self.checks += 1
+        return self.accept and self.shared['open']
+
+
+@pytest.fixture
+def sender_machine() -> MachineTemplate:
+    return MachineTemplate(
+        initial_state='idle',
+        states=[State(name='idle'), State(name='sent')],
+        transitions=[
+            Transition(
+                trigger='idle_to_sent',
+                source='idle',
+                dest='sent',
+                conditions=['is_ready'],
+                after=['close'],
+                send='go',
+            ),
+        ],
+        declared_functions=['is_ready', 'close'],
+    )
+
+
+@pytest.fixture
+def receiver_machine() -> MachineTemplate:
+    return MachineTemplate(
+        initial_state='waiting',
+        states=[State(name='waiting'), State(name='received')],
+        transitions=[
+            Transition(
+                trigger='waiting_to_received',
+                source='waiting',
+                dest='received',
+                conditions=['accepts'],
+                receive='go',
+            ),
+        ],
+        declared_functions=['accepts'],
+    )
+
+
+@pytest.fixture(params=['pytransitions', 'plain'])
+def network_factory(
+    request,
+    sender_machine,
+    receiver_machine,
+    generated_module,
+    generated_network,
+):
+    """Fixture to build a network with a sender and the given receivers,
+    on a channel of the given kind.
+    """
+    code_dialect = request.param
+    sender_module = generated_module('Sender', sender_machine, code_dialect)
+    receiver_module = generated_module(
+        'Receiver',
+        receiver_machine,
+        code_dialect,
+    )
+
+    def build(kind, accepts, ready=True):
+        module = generated_network({'go': kind}, code_dialect)
+        shared = {'open': True}
+        models = [ReceiverModel(shared, accept) for accept in accepts]
+        agents = {'sender': sender_module.Sender(SenderModel(shared, ready))}
+        for index, model in enumerate(models):
+            agents[f'receiver_{index}'] = receiver_module.Receiver(model)
+        return module.Network(agents), models
+    return build
+
+
+def states(network):
+    return {name: agent.state for name, agent in network.agents.items()}
+
+
+def test_get_sync_table(sender_machine, receiver_machine):
+    assert CodeGenerator.get_sync_table(sender_machine) == {
+        'idle': (('idle_to_sent', 'go', True),),
+    }
+    assert CodeGenerator.get_sync_table(receiver_machine) == {
+        'waiting': (('waiting_to_received', 'go', False),),
+    }
+    assert CodeGenerator.get_transition_table(sender_machine) == {
+        'idle': (),
+        'sent': (),
+    }
+
+
+def test_machine_does_not_fire_synchronisations_alone(network_factory):
+    network, _ = network_factory('binary', [True])
+    sender = network.agents['sender']
+    assert not sender.next_state()
+    assert sender.state == 'idle'
+
+
+def test_binary_send_fires_with_one_receiver(network_factory):
+    network, models = network_factory('binary', [False, True, True])
+    assert network.step() == 1
+    assert states(network) == {
+        'sender': 'sent',
+        'receiver_0': 'waiting',
+        'receiver_1': 'received',
+        'receiver_2': 'waiting',
+    }
+    # the third receiver was not needed
+    assert models[2].checks == 0
+
+
+def test_binary_send_waits_for_a_receiver(network_factory):
+    network, _ = network_factory('binary', [False])
+    assert network.step() == 0
+    assert states(network) == {'sender': 'idle', 'receiver_0': 'waiting'}
+
+
+def test_broadcast_send_fires_with_every_receiver(network_factory):
+    network, models = network_factory('broadcast', [True, False, True])
+    assert network.step() == 1
+    assert states(network) == {
+        'sender': 'sent',
+        'receiver_0': 'received',
+        'receiver_1': 'waiting',
+        'receiver_2': 'received',
+    }
+    # the sender closed the channel after the receivers were checked
+    assert models[0].shared['open'] is False
+    assert [model.checks for model in models] == [1, 1, 1]
+
+
+def test_broadcast_send_fires_without_receivers(network_factory):
+    network, _ = network_factory('broadcast', [])
+    assert network.step() == 1
+    assert states(network) == {'sender': 'sent'}
+
+
+def test_waiting_receivers_are_not_stepped(network_factory):
+    network, models = network_factory('broadcast', [True], ready=False)
+    for _ in range(3):
+        assert network.step() == 0
+    assert models[0].checks == 0
+    assert list(network._active) == ['sender']
+
+
+def test_network_run_stops_when_no_agent_can_move(network_factory):
+    network, _ = network_factory('broadcast', [True, True])
+    network.run()
+    assert set(states(network).values()) == {'sent', 'received'}
+    assert network.run_stats['steps'] == 1
+    assert network.run_stats['fired'] == 1
+    assert not network._active
+
+
+def test_network_run_until(network_factory):
+    network, _ = network_factory('binary', [False], ready=True)
+    calls = list()
+
+    def until():
+        calls.append(None)
+        return len(calls) > 3
+    network.run(until=until, max_wait=0)
+    assert network.run_stats['steps'] == 3
+    assert states(network)['sender'] == 'idle'
+
+
+def test_network_run_waits_until_notified(network_factory):
+    network, models = network_factory('binary', [False], ready=True)
+
+    def release():
+        models[0].accept = True
+        network.notify()
+    timer = threading.Timer(0.05, release)
+    timer.start()
+    network.run(max_wait=None)
+    timer.join()
+    assert states(network) == {'sender': 'sent', 'receiver_0': 'received'}
+    assert network.run_stats['steps'] == 2
+    assert network.run_stats['idle_time'] > 0.03
+
+
+def test_async_network(
+    sender_machine,
+    receiver_machine,
+    generated_module,
+    generated_network,
+):
+    sender_module = generated_module(
+        'Sender',
+        sender_machine,
+        'pytransitions-async',
+    )
+    receiver_module = generated_module(
+        'Receiver',
+        receiver_machine,
+        'pytransitions-async',
+    )
+    module = generated_network({'go': 'binary'}, 'pytransitions-async')
+    shared = {'open': True}
+    receiver_model = ReceiverModel(shared, accept=False)
+
+    async def run():
+        network = module.Network({
+            'sender': sender_module.Sender(SenderModel(shared)),
+            'receiver': receiver_module.Receiver(receiver_model),
+        })
+        assert await network.step() == 0
+        asyncio.get_running_loop().call_later(0.02, release, network)
+        await network.run(max_wait=0.01)
+        return network
+
+    def release(network):
+        receiver_model.accept = True
+        network.notify()
+
+    network = asyncio.run(run())
+    assert states(network) == {'sender': 'sent', 'receiver': 'received'}
+    assert network.run_stats['idle_time'] > 0.0
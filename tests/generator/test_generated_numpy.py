@@ -0,0 +1,221 @@
+import pytest
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import (
+    NETWORK_FILE,
+    SYSTEM_FILE,
+    CodeGenerator,
+)
+from pathlib import Path
+
+
+class GuardedBatchModel:
+
+    def __init__(self, np, size, ok_every=2):
+        self.size = size
+        self.np = np
+        self.ok = np.arange(size) % ok_every == 0
+        self.retries = np.zeros(size, dtype=int)
+        self.visits = np.zeros(size, dtype=int)
+        self.checked = list()
+
+    def is_ok(self, index):
+        self.checked.append(index.copy())
+        return self.ok[index]
+
+    def count_retry(self, index):
+        self.retries[index] += 1
+        self.ok[index] = True
+
+    def visit(self, index):
+        self.visits[index] += 1
+
+
+class BranchBatchModel:
+
+    def __init__(self, np, size, failure=1):
+        self.size = size
+        self.failure = np.full(size, failure)
+
+    def failure_weight(self, index):
+        return self.failure[index]
+
+
+def branch_machine(failure_weight, success_weight=3) -> MachineTemplate:
+    return MachineTemplate(
+        initial_state='decision',
+        states=[
+            State(name='decision'),
+            State(name='success'),
+            State(name='retry'),
+        ],
+        transitions=[
+            Transition(
+                trigger='decision_to_success',
+                source='decision',
+                dest='success',
+                branchpoint='id5',
+                weight=success_weight,
+            ),
+            Transition(
+                trigger='decision_to_retry',
+                source='decision',
+                dest='retry',
+                branchpoint='id5',
+                weight=failure_weight,
+            ),
+        ],
+        declared_functions=['failure_weight'],
+    )
+
+
+@pytest.fixture
+def np():
+    return pytest.importorskip('numpy')
+
+
+@pytest.fixture
+def numpy_machine(guarded_machine, generated_module):
+    guarded_machine['states'][1]['on_enter'] = ['visit']
+    return generated_module('Guarded', guarded_machine, 'numpy').Guarded
+
+
+def test_get_numpy_template_files():
+    assert CodeGenerator.get_template_file('numpy').is_file()
+    assert CodeGenerator.get_template_model_file('numpy').is_file()
+    assert CodeGenerator.get_template_network_file('numpy') is None
+    assert CodeGenerator.get_template_system_file('numpy') is None
+
+
+def test_generate_code_numpy(tmp_path):
+    xml_file = Path('tests/mock_files/hcl_teste.xml')
+    (tmp_path / NETWORK_FILE).write_text('stale')
+    (tmp_path / SYSTEM_FILE).write_text('stale')
+    code_generator = CodeGenerator('uppaal', 'numpy', show_progress=False)
+    code_generator.generate_code(xml_file, tmp_path)
+    assert not (tmp_path / NETWORK_FILE).exists()
+    assert not (tmp_path / SYSTEM_FILE).exists()
+    for generated_file in tmp_path.glob('*.py'):
+        compile(generated_file.read_text(), str(generated_file), 'exec')
+    model = (tmp_path / 'sector_model.py').read_text()
+    assert 'def __init__(self, size: int, sector_type) -> None:' in model
+    assert "'sector_type'," in model
+
+
+def test_numpy_model_stubs(guarded_machine):
+    code_generator = CodeGenerator('uppaal', 'numpy', show_progress=False)
+    rendered = code_generator.render_agent('Guarded', guarded_machine)
+    model = rendered['guarded_model.py']
+    assert 'def is_ok(self, index: np.ndarray):' in model
+    assert CodeGenerator.get_model_slots(guarded_machine, 'numpy') == ()
+
+
+def test_numpy_machine_tables(numpy_machine):
+    assert numpy_machine.STEPS.tolist() == [
+        [0, -1], [1, 2], [4, -1], [3, -1], [-1, -1],
+    ]
+    assert numpy_machine.TRANSITIONS[2] == (
+        'decision_to_retry', 1, 3, (), ('is_ok',), (), ('count_retry',),
+    )
+
+
+def test_numpy_machine_steps_every_instance(np, numpy_machine):
+    model = GuardedBatchModel(np, 6)
+    machine = numpy_machine(model)
+    assert machine.counts() == {
+        'start': 6, 'decision': 0, 'success': 0, 'retry': 0, 'finished': 0,
+    }
+    assert machine.step() == 6
+    assert machine.is_state('decision').all()
+    assert model.visits.tolist() == [1] * 6
+
+    model.checked.clear()
+    assert machine.step() == 6
+    # `is_ok` is both a condition and an unless guard, and is evaluated
+    # once per instance
+    assert len(model.checked) == 1
+    assert model.checked[0].tolist() == list(range(6))
+    assert machine.state_ids.tolist() == [2, 3, 2, 3, 2, 3]
+    assert model.retries.tolist() == [0, 1, 0, 1, 0, 1]
+
+
+def test_numpy_machine_run(np, numpy_machine):
+    model = GuardedBatchModel(np, 1000, ok_every=3)
+    machine = numpy_machine(model)
+    machine.run()
+    assert machine.counts()['finished'] == 1000
+    assert machine.run_stats['steps'] == 5
+    assert machine.run_stats['fired'] == 1000 * 3 + 666 * 2
+    assert model.visits.sum() == 1000 + 666
+
+    machine = numpy_machine(GuardedBatchModel(np, 10), size=4)
+    machine.run(max_steps=1)
+    assert machine.counts()['decision'] == 4
+    assert machine.run_stats['steps'] == 1
+
+
+def test_numpy_machine_stops_when_no_instance_moves(
+    np,
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine, 'numpy')
+
+    class WaitingModel:
+        size = 3
+        is_ok = np.array([True, False, False])
+
+    machine = module.Waiting(WaitingModel())
+    machine.run()
+    assert machine.run_stats['steps'] == 2
+    assert machine.counts() == {'waiting': 2, 'finished': 1}
+
+    WaitingModel.is_ok = True
+    machine.run()
+    assert machine.counts() == {'waiting': 0, 'finished': 3}
+
+
+@pytest.mark.parametrize('failure_weight', [1, 'failure_weight'])
+def test_numpy_machine_picks_the_branches_by_weight(
+    np,
+    generated_module,
+    failure_weight,
+):
+    module = generated_module(
+        'Branch', branch_machine(failure_weight), 'numpy',
+    )
+    machine = module.Branch(BranchBatchModel(np, 20000), seed=7)
+    assert machine.step() == 20000
+    assert machine.counts()['success'] / 20000 == \
+        pytest.approx(0.75, abs=0.02)
+    again = module.Branch(BranchBatchModel(np, 20000), seed=7)
+    again.step()
+    assert (again.state_ids == machine.state_ids).all()
+
+
+def test_numpy_machine_reads_the_model_weights(np, generated_module):
+    module = generated_module(
+        'Branch', branch_machine('failure_weight'), 'numpy',
+    )
+    model = BranchBatchModel(np, 4, failure=0)
+    model.failure[0] = 1000000
+    machine = module.Branch(model, seed=1)
+    machine.step()
+    assert machine.state_ids.tolist() == [2, 1, 1, 1]
+
+
+def test_numpy_machine_raises_value_error_without_weights(
+    np,
+    generated_module,
+):
+    module = generated_module(
+        'Branch',
+        branch_machine('failure_weight', 'failure_weight'),
+        'numpy',
+    )
+    machine = module.Branch(BranchBatchModel(np, 4, failure=0))
+    with pytest.raises(ValueError):
+        machine.step()
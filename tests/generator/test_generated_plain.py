@@ -0,0 +1,159 @@
+import ast
+import pytest
+import threading
+
+
+class GuardedModel:
+
+    def __init__(self, ok=False):
+        self.ok = ok
+        self.retries = 0
+        self.checks = 0
+        self.visits = 0
+
+    def is_ok(self):
+        self.checks += 1
+        return self.ok
+
+    def count_retry(self):
+        self.retries += 1
+
+    def visit(self):
+        self.visits += 1
+
+
+@pytest.fixture
+def plain_machine(guarded_machine, generated_module):
+    guarded_machine['states'][1]['on_enter'] = ['visit']
+    module = generated_module('Guarded', guarded_machine, 'plain')
+    return module
+
+
+def test_plain_machine_has_no_dependencies(guarded_machine, tmp_path):
+    from cosmic.generator.code_generator import CodeGenerator
+    code_generator = CodeGenerator('uppaal', 'plain', show_progress=False)
+    code_generator.write_agent('Guarded', guarded_machine, tmp_path)
+    tree = ast.parse((tmp_path / 'guarded.py').read_text())
+    modules = {
+        node.module.split('.')[0]
+        for node in ast.walk(tree)
+        if isinstance(node, ast.ImportFrom)
+    }
+    assert not any(isinstance(node, ast.Import) for node in ast.walk(tree))
+    assert modules == {
+        'functools', 'logging', 'random', 'threading', 'time', 'typing',
+    }
+
+
+def test_plain_machine_tables(plain_machine):
+    machine_class = plain_machine.Guarded
+    assert machine_class.STATES == (
+        'start', 'decision', 'success', 'retry', 'finished',
+    )
+    assert machine_class.INITIAL_STATE == 0
+    assert machine_class.TRANSITIONS[1] == (
+        ('decision_to_success', 2, ('is_ok',), (), (), ()),
+        ('decision_to_retry', 3, (), ('is_ok',), (), ('count_retry',)),
+    )
+    assert machine_class.TRANSITIONS[4] == ()
+    assert machine_class.ON_ENTER[1] == ('visit',)
+
+
+def test_plain_machine_has_slots(plain_machine):
+    machine = plain_machine.Guarded(GuardedModel())
+    assert not hasattr(machine, '__dict__')
+
+
+def test_plain_next_state_follows_the_guards(plain_machine):
+    model = GuardedModel()
+    machine = plain_machine.Guarded(model)
+
+    assert machine.state == 'start'
+    assert machine.next_state()
+    assert machine.is_state('decision')
+    assert model.visits == 1
+    # both transitions of `decision` depend on `is_ok`
+    assert machine.next_state()
+    assert machine.state == 'retry'
+    assert model.retries == 1
+    assert model.checks == 1
+    machine.next_state()
+    assert model.visits == 2
+    model.ok = True
+    assert machine.next_state()
+    assert machine.state == 'success'
+    assert model.checks == 2
+    machine.next_state()
+    assert machine.state == 'finished'
+    assert not machine.next_state()
+
+
+def test_plain_trigger(plain_machine):
+    model = GuardedModel(ok=True)
+    machine = plain_machine.Guarded(model)
+
+    assert not machine.trigger('decision_to_success')
+    assert machine.trigger('start_to_decision')
+    assert not machine.trigger('decision_to_retry')
+    assert machine.trigger('decision_to_success')
+    assert machine.state == 'success'
+    with pytest.raises(KeyError):
+        machine.trigger('unknown')
+
+
+def test_plain_guards_accept_attributes(plain_machine):
+    model = GuardedModel()
+    model.is_ok = True
+    machine = plain_machine.Guarded(model)
+    machine.next_state()
+    machine.next_state()
+    assert machine.state == 'success'
+
+
+def test_plain_run(plain_machine):
+    machine = plain_machine.Guarded(GuardedModel(ok=True))
+    machine.run()
+    assert machine.state == 'finished'
+    assert machine.run_stats['steps'] == 3
+    assert machine.run_stats['fired'] == 3
+    assert machine.run_stats['idle_time'] == 0.0
+
+
+def test_plain_run_blocks_until_notified(
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine, 'plain')
+    model = GuardedModel()
+    machine = module.Waiting(model)
+
+    def release():
+        model.ok = True
+        machine.notify()
+    timer = threading.Timer(0.05, release)
+    timer.start()
+    machine.run(max_wait=None)
+    timer.join()
+    assert machine.state == 'finished'
+    assert machine.run_stats['steps'] == 2
+    assert machine.run_stats['idle_time'] > 0.03
+
+
+def test_plain_run_backs_off_and_can_step_continuously(
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine, 'plain')
+    for max_wait in (0.01, 0):
+        model = GuardedModel()
+        machine = module.Waiting(model)
+        timer = threading.Timer(0.02, setattr, (model, 'ok', True))
+        timer.start()
+        machine.run(max_wait=max_wait)
+        timer.join()
+        assert machine.state == 'finished'
+        if max_wait:
+            assert machine.run_stats['steps'] < 30
+            assert machine.run_stats['idle_time'] > 0.01
+        else:
+            assert machine.run_stats['idle_time'] == 0.0
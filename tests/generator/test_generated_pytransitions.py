@@ -0,0 +1,252 @@
+import importlib.util
+import threading
+from cosmic.adapter.entities.machine_template import State
+from cosmic.generator.code_generator import CodeGenerator
+
+
+class GuardedModel:
+
+    def __init__(self, ok=False):
+        self.ok = ok
+        self.retries = 0
+        self.checks = 0
+
+    def is_ok(self):
+        self.checks += 1
+        return self.ok
+
+    def count_retry(self):
+        self.retries += 1
+
+
+def test_get_transition_table(guarded_machine):
+    assert CodeGenerator.get_transition_table(guarded_machine) == {
+        'start': ('start_to_decision',),
+        'decision': ('decision_to_success', 'decision_to_retry'),
+        'success': ('success_to_finished',),
+        'retry': ('retry_to_decision',),
+        'finished': (),
+    }
+
+
+def test_generated_machine_has_transition_table(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module('Guarded', guarded_machine)
+    assert module.Guarded.TRANSITION_TABLE == \
+        CodeGenerator.get_transition_table(guarded_machine)
+
+
+def test_generated_next_state_follows_the_guards(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module('Guarded', guarded_machine)
+    model = GuardedModel()
+    machine = module.Guarded(model)
+
+    assert machine.next_state()
+    assert model.state == 'decision'
+    assert machine.next_state()
+    assert model.state == 'retry'
+    assert model.retries == 1
+    machine.next_state()
+    model.ok = True
+    machine.next_state()
+    assert model.state == 'success'
+    machine.next_state()
+    assert model.state == 'finished'
+    assert not machine.next_state()
+    assert model.state == 'finished'
+
+
+def test_generated_next_state_evaluates_each_guard_once(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module('Guarded', guarded_machine)
+    model = GuardedModel()
+    machine = module.Guarded(model)
+    machine.next_state()
+
+    # both transitions of `decision` depend on `is_ok`
+    assert machine.next_state()
+    assert model.state == 'retry'
+    assert model.checks == 1
+
+    machine.next_state()
+    model.ok = True
+    assert machine.next_state()
+    assert model.state == 'success'
+    assert model.checks == 2
+
+
+def test_generated_guards_outside_of_steps(guarded_machine, generated_module):
+    module = generated_module('Guarded', guarded_machine)
+    model = GuardedModel(ok=True)
+    machine = module.Guarded(model)
+    machine.next_state()
+
+    assert not model.decision_to_retry()
+    assert not model.may_decision_to_retry()
+    assert model.checks == 2
+    assert model.decision_to_success()
+    assert model.state == 'success'
+
+
+def test_generated_guards_accept_attributes(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module('Guarded', guarded_machine)
+    model = GuardedModel()
+    model.is_ok = True
+    machine = module.Guarded(model)
+    machine.next_state()
+    machine.next_state()
+    assert model.state == 'success'
+
+
+def test_get_model_slots(guarded_machine):
+    slots = CodeGenerator.get_model_slots(guarded_machine, 'pytransitions')
+    assert slots[:4] == ('state', 'trigger', 'may_trigger', 'get_graph')
+    assert {'is_start', 'to_retry', 'may_to_finished'} <= set(slots)
+    assert {'decision_to_retry', 'may_decision_to_retry'} <= set(slots)
+    assert len(slots) == len(set(slots))
+    async_slots = CodeGenerator.get_model_slots(
+        guarded_machine,
+        'pytransitions-async',
+    )
+    assert set(slots) - set(async_slots) == {'get_graph'}
+    assert CodeGenerator.get_model_slots(guarded_machine, 'plain') == ()
+
+
+def test_get_model_slots_skips_the_declared_functions(
+    guarded_machine,
+    tmp_path,
+):
+    # the `is_ok` guard is also the state check of the `ok` state
+    guarded_machine['states'].append(State(name='ok'))
+    slots = CodeGenerator.get_model_slots(guarded_machine, 'pytransitions')
+    assert 'is_ok' not in slots
+    assert 'to_ok' in slots
+
+    CodeGenerator(
+        'uppaal',
+        'pytransitions',
+        show_progress=False,
+    ).write_agent('Guarded', guarded_machine, tmp_path)
+    spec = importlib.util.spec_from_file_location(
+        'generated_guarded_model',
+        tmp_path / 'guarded_model.py',
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert 'is_ok' not in module.GuardedModel.__slots__
+
+
+def test_generated_machine_binds_the_callbacks(
+    guarded_machine,
+    generated_module,
+    tmp_path,
+):
+    module = generated_module('Guarded', guarded_machine)
+    assert '__getattr__' not in vars(module.Guarded)
+    spec = importlib.util.spec_from_file_location(
+        'generated_guarded_model',
+        tmp_path / 'guarded_model.py',
+    )
+    model_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(model_module)
+
+    class SlottedModel(model_module.GuardedModel):
+        __slots__ = ('retries',)
+
+        def __init__(self):
+            self.retries = 0
+
+        def is_ok(self):
+            return self.retries > 0
+
+        def count_retry(self):
+            self.retries += 1
+
+    model = SlottedModel()
+    machine = module.Guarded(model)
+    assert not hasattr(model, '__dict__')
+    machine.run()
+    assert model.state == 'finished'
+    assert model.retries == 1
+
+
+def release_later(machine, model, notify, delay=0.05):
+    def release():
+        model.ok = True
+        if notify:
+            machine.notify()
+    timer = threading.Timer(delay, release)
+    timer.start()
+    return timer
+
+
+def test_generated_run_fires_without_waiting(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module('Guarded', guarded_machine)
+    model = GuardedModel(ok=True)
+    machine = module.Guarded(model)
+    machine.run()
+    assert model.state == 'finished'
+    assert machine.run_stats['steps'] == 3
+    assert machine.run_stats['fired'] == 3
+    assert machine.run_stats['idle_time'] == 0.0
+
+
+def test_generated_run_blocks_until_notified(
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine)
+    model = GuardedModel()
+    machine = module.Waiting(model)
+    timer = release_later(machine, model, notify=True)
+    machine.run(max_wait=None)
+    timer.join()
+    assert model.state == 'finished'
+    assert machine.run_stats['steps'] == 2
+    assert machine.run_stats['fired'] == 1
+    assert machine.run_stats['idle_time'] > 0.03
+    assert 0 < machine.run_stats['steps_per_second']
+
+
+def test_generated_run_backs_off_while_idle(
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine)
+    model = GuardedModel()
+    machine = module.Waiting(model)
+    timer = release_later(machine, model, notify=False)
+    machine.run(max_wait=0.01)
+    timer.join()
+    assert model.state == 'finished'
+    # the waits grow from 1ms to 10ms, instead of stepping continuously
+    assert machine.run_stats['steps'] < 30
+    assert machine.run_stats['idle_time'] > 0.03
+
+
+def test_generated_run_can_step_continuously(
+    waiting_machine,
+    generated_module,
+):
+    module = generated_module('Waiting', waiting_machine)
+    model = GuardedModel()
+    machine = module.Waiting(model)
+    timer = release_later(machine, model, notify=False, delay=0.02)
+    machine.run(max_wait=0)
+    timer.join()
+    assert model.state == 'finished'
+    assert machine.run_stats['steps'] > 30
+    assert machine.run_stats['idle_time'] == 0.0
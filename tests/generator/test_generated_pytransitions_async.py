@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import CodeGenerator
+
+
+class AsyncGuardedModel:
+
+    def __init__(self, ok=False):
+        self.ok = ok
+        self.retries = 0
+        self.checks = 0
+
+    async def is_ok(self):
+        self.checks += 1
+        await asyncio.sleep(0)
+        return self.ok
+
+    async def count_retry(self):
+        await asyncio.sleep(0)
+        self.retries += 1
+
+
+@pytest.fixture
+def waiting_machine():
+    return MachineTemplate(
+        initial_state='waiting',
+        states=[State(name='waiting'), State(name='finished')],
+        transitions=[
+            Transition(
+                trigger='waiting_to_finished',
+                source='waiting',
+                dest='finished',
+                conditions=['is_ok'],
+            ),
+        ],
+        declared_functions=['is_ok'],
+    )
+
+
+def test_get_async_template_files():
+    assert CodeGenerator.get_template_file(
+        'pytransitions-async',
+    ).is_file()
+    assert CodeGenerator.get_template_model_file(
+        'pytransitions-async',
+    ).is_file()
+
+
+def test_generated_async_model_stubs(guarded_machine, tmp_path):
+    code_generator = CodeGenerator(
+        'uppaal', 'pytransitions-async', show_progress=False,
+    )
+    rendered = code_generator.render_agent('Guarded', guarded_machine)
+    assert 'async def is_ok(self):' in rendered['guarded_model.py']
+    assert 'async def count_retry(self):' in rendered['guarded_model.py']
+
+
+def test_generated_async_next_state(guarded_machine, generated_module):
+    module = generated_module(
+        'Guarded', guarded_machine, 'pytransitions-async',
+    )
+    model = AsyncGuardedModel()
+    machine = module.Guarded(model)
+
+    async def steps():
+        assert await machine.next_state()
+        assert model.state == 'decision'
+        assert await machine.next_state()
+        assert model.state == 'retry'
+        assert model.retries == 1
+        assert model.checks == 1
+        await machine.next_state()
+        model.ok = True
+        assert await machine.next_state()
+        assert model.state == 'success'
+        assert model.checks == 2
+        assert await machine.next_state()
+        assert not await machine.next_state()
+
+    asyncio.run(steps())
+    assert model.state == 'finished'
+
+
+def test_generated_async_guards_may_be_plain_values(
+    guarded_machine,
+    generated_module,
+):
+    module = generated_module(
+        'Guarded', guarded_machine, 'pytransitions-async',
+    )
+    model = AsyncGuardedModel()
+    model.is_ok = True
+    machine = module.Guarded(model)
+    asyncio.run(machine.run())
+    assert model.state == 'finished'
+    assert machine.run_stats['fired'] == 3
+
+
+def test_generated_async_machines_share_the_event_loop(
+    guarded_machine,
+    waiting_machine,
+    generated_module,
+):
+    guarded = generated_module(
+        'Guarded', guarded_machine, 'pytransitions-async',
+    )
+    waiting = generated_module(
+        'Waiting', waiting_machine, 'pytransitions-async',
+    )
+    guarded_model = AsyncGuardedModel(ok=True)
+    waiting_model = AsyncGuardedModel()
+    guarded_machine = guarded.Guarded(guarded_model)
+    waiting_machine = waiting.Waiting(waiting_model)
+
+    async def release():
+        await asyncio.sleep(0.05)
+        waiting_model.ok = True
+        waiting_machine.notify()
+
+    async def main():
+        await asyncio.gather(
+            guarded_machine.run(),
+            waiting_machine.run(max_wait=None),
+            release(),
+        )
+
+    asyncio.run(main())
+    assert guarded_model.state == 'finished'
+    assert waiting_model.state == 'finished'
+    assert waiting_machine.run_stats['steps'] == 2
+    assert waiting_machine.run_stats['idle_time'] > 0.03
+
+
+@pytest.mark.parametrize('max_wait, max_steps', [(0.01, 30), (0, None)])
+def test_generated_async_run_without_notify(
+    waiting_machine,
+    generated_module,
+    max_wait,
+    max_steps,
+):
+    module = generated_module(
+        'Waiting', waiting_machine, 'pytransitions-async',
+    )
+    model = AsyncGuardedModel()
+    machine = module.Waiting(model)
+
+    async def release():
+        await asyncio.sleep(0.03)
+        model.ok = True
+
+    async def main():
+        await asyncio.gather(machine.run(max_wait=max_wait), release())
+
+    asyncio.run(main())
+    assert model.state == 'finished'
+    if max_steps is not None:
+        assert machine.run_stats['steps'] < max_steps
+    else:
+        assert machine.run_stats['idle_time'] == 0.0
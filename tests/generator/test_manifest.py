@@ -0,0 +1,59 @@
+import pytest
+from cosmic.generator.manifest import (
+    MANIFEST_FILE,
+    MANIFEST_VERSION,
+    AgentEntry,
+    Manifest,
+    load_manifest,
+    save_manifest,
+)
+
+
+@pytest.fixture
+def manifest():
+    return Manifest(
+        version=MANIFEST_VERSION,
+        generator='fingerprint',
+        options={'generate_model': True},
+        agents={
+            'Sector': AgentEntry(
+                digest='digest',
+                files=['sector.py', 'sector_model.py'],
+            ),
+        },
+    )
+
+
+def test_save_and_load_manifest(manifest, tmp_path):
+    save_manifest(tmp_path, manifest)
+    assert load_manifest(tmp_path) == manifest
+    assert [f.name for f in tmp_path.iterdir()] == [MANIFEST_FILE]
+
+
+def test_load_manifest_missing_file(tmp_path):
+    assert load_manifest(tmp_path) is None
+
+
+@pytest.mark.parametrize(
+    'content',
+    ['{not json', '[]', '{"version": 0}'],
+)
+def test_load_manifest_invalid_content(content, tmp_path):
+    (tmp_path / MANIFEST_FILE).write_text(content)
+    assert load_manifest(tmp_path) is None
+
+
+def test_save_manifest_keeps_previous_file_on_failure(
+    manifest,
+    tmp_path,
+    mocker,
+):
+    save_manifest(tmp_path, manifest)
+    mocker.patch(
+        'cosmic.generator.manifest.json.dump',
+        side_effect=RuntimeError('interrupted'),
+    )
+    with pytest.raises(RuntimeError):
+        save_manifest(tmp_path, Manifest(manifest, generator='other'))
+    assert load_manifest(tmp_path) == manifest
+    assert [f.name for f in tmp_path.iterdir()] == [MANIFEST_FILE]
@@ -0,0 +1,118 @@
+import os
+import pytest
+from cosmic.adapter.xml.uppaal_adapter import UppaalAdapter
+from cosmic.generator import parse_cache
+from cosmic.generator.parse_cache import (
+    PARSE_CACHE_DIR,
+    cosmic_version,
+    evict_parsed,
+    load_parsed,
+    parse_cache_key,
+    parse_cache_path,
+    store_parsed,
+)
+
+
+@pytest.fixture
+def result_dict(xml_file):
+    return UppaalAdapter.get_xml_data(xml_file)
+
+
+def test_parse_cache_key_changes_with_content(tmp_path):
+    xml_file = tmp_path / 'model.xml'
+    xml_file.write_text('<nta/>')
+    first = parse_cache_key(xml_file, UppaalAdapter())
+    assert first == parse_cache_key(xml_file, UppaalAdapter())
+
+    xml_file.write_text('<nta></nta>')
+    assert parse_cache_key(xml_file, UppaalAdapter()) != first
+
+
+def test_parse_cache_key_changes_with_adapter_version(
+    xml_file,
+    monkeypatch,
+):
+    first = parse_cache_key(xml_file, UppaalAdapter())
+    monkeypatch.setattr(UppaalAdapter, 'VERSION', 'next')
+    assert parse_cache_key(xml_file, UppaalAdapter()) != first
+
+
+def test_parse_cache_key_changes_with_cosmic_version(xml_file, mocker):
+    first = parse_cache_key(xml_file, UppaalAdapter())
+    mocker.patch(
+        'cosmic.generator.parse_cache.cosmic_version',
+        return_value='next',
+    )
+    assert parse_cache_key(xml_file, UppaalAdapter()) != first
+
+
+def test_cosmic_version_without_installed_package(mocker):
+    mocker.patch(
+        'cosmic.generator.parse_cache.metadata.version',
+        side_effect=parse_cache.metadata.PackageNotFoundError('cosmic'),
+    )
+    assert cosmic_version() == 'unknown'
+
+
+def test_cosmic_version_of_installed_package(mocker):
+    mocker.patch(
+        'cosmic.generator.parse_cache.metadata.version',
+        return_value='1.0.0',
+    )
+    assert cosmic_version() == '1.0.0'
+
+
+def test_store_and_load_parsed(cache_dir, result_dict):
+    assert load_parsed(cache_dir, 'key') is None
+    assert store_parsed(cache_dir, 'key', result_dict)
+    assert load_parsed(cache_dir, 'key') == result_dict
+    assert [f.name for f in (cache_dir / PARSE_CACHE_DIR).iterdir()] == [
+        parse_cache_path(cache_dir, 'key').name,
+    ]
+
+
+@pytest.mark.parametrize('content', [b'', b'not marshal', b'\xe9\x00'])
+def test_load_parsed_invalid_content(cache_dir, content):
+    cache_file = parse_cache_path(cache_dir, 'key')
+    cache_file.parent.mkdir()
+    cache_file.write_bytes(content)
+    assert load_parsed(cache_dir, 'key') is None
+
+
+def test_load_parsed_rejects_non_dict_content(cache_dir):
+    store_parsed(cache_dir, 'key', ['not', 'a', 'dict'])
+    assert load_parsed(cache_dir, 'key') is None
+
+
+def test_store_parsed_ignores_unserializable_results(cache_dir):
+    assert not store_parsed(cache_dir, 'key', {'agent': object()})
+    assert load_parsed(cache_dir, 'key') is None
+
+
+def test_store_parsed_skips_results_larger_than_the_cache(
+    cache_dir,
+    result_dict,
+):
+    assert not store_parsed(cache_dir, 'key', result_dict, max_bytes=10)
+    assert load_parsed(cache_dir, 'key') is None
+
+
+def test_store_parsed_evicts_least_recently_used(cache_dir, result_dict):
+    for index, key in enumerate(['first', 'second', 'third']):
+        store_parsed(cache_dir, key, result_dict)
+        os.utime(parse_cache_path(cache_dir, key), ns=(index, index))
+    load_parsed(cache_dir, 'first')
+    entry_size = parse_cache_path(cache_dir, 'first').stat().st_size
+
+    store_parsed(cache_dir, 'fourth', result_dict, max_bytes=3 * entry_size)
+    assert sorted(
+        f.name for f in (cache_dir / PARSE_CACHE_DIR).iterdir()
+    ) == sorted(
+        parse_cache_path(cache_dir, key).name
+        for key in ['first', 'third', 'fourth']
+    )
+
+
+def test_evict_parsed_without_cache_dir(tmp_path):
+    evict_parsed(tmp_path, 0)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,83 @@
+from concurrent.futures import ProcessPoolExecutor
+from cosmic.generator.code_generator import CodeGenerator
+from cosmic.generator.template_cache import (
+    compiled_module_path,
+    load_template,
+)
+
+
+def test_compiled_module_path_is_content_addressed(tmp_path, cache_dir):
+    template_file = tmp_path / 'machine.mako'
+    template_file.write_text('${name}')
+    first = compiled_module_path(template_file, cache_dir)
+    assert first == compiled_module_path(template_file, cache_dir)
+    assert first.parent == cache_dir / 'mako'
+    assert first.name.startswith('machine-')
+
+    template_file.write_text('${name}!')
+    assert compiled_module_path(template_file, cache_dir) != first
+
+
+def test_load_template_reuses_compiled_module(tmp_path, cache_dir):
+    template_file = tmp_path / 'machine.mako'
+    template_file.write_text('hello ${name}')
+    module_file = compiled_module_path(template_file, cache_dir)
+
+    template = load_template(template_file, cache_dir)
+    assert template.render(name='cosmic') == 'hello cosmic'
+    assert module_file.exists()
+    assert [f.name for f in module_file.parent.iterdir()] == [
+        module_file.name,
+    ]
+    mtime = module_file.stat().st_mtime_ns
+
+    template = load_template(template_file, cache_dir)
+    assert template.render(name='again') == 'hello again'
+    assert module_file.stat().st_mtime_ns == mtime
+
+
+def render_from_cache(template_file, cache_dir):
+    return load_template(template_file, cache_dir).render(name='worker')
+
+
+def test_load_template_concurrent_writers(tmp_path, cache_dir):
+    template_file = tmp_path / 'machine.mako'
+    template_file.write_text('hello ${name}')
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            render_from_cache,
+            [template_file] * 8,
+            [cache_dir] * 8,
+        ))
+    assert results == ['hello worker'] * 8
+    assert [f.name for f in (cache_dir / 'mako').iterdir()] == [
+        compiled_module_path(template_file, cache_dir).name,
+    ]
+
+
+def test_load_template_without_cache_dir(tmp_path):
+    template_file = tmp_path / 'machine.mako'
+    template_file.write_text('hello ${name}')
+    assert load_template(template_file).render(name='x') == 'hello x'
+
+
+def test_load_template_with_unusable_cache_dir(tmp_path):
+    template_file = tmp_path / 'machine.mako'
+    template_file.write_text('hello ${name}')
+    cache_file = tmp_path / 'not_a_directory'
+    cache_file.write_text('')
+    template = load_template(template_file, cache_file)
+    assert template.render(name='x') == 'hello x'
+
+
+def test_code_generator_keeps_cache_across_runs(cache_dir, xml_file, tmp_path):
+    CodeGenerator('uppaal', 'pytransitions').generate_code(
+        xml_file, tmp_path / 'first',
+    )
+    modules = sorted(f.name for f in (cache_dir / 'mako').iterdir())
+    assert len(modules) == 4
+
+    CodeGenerator('uppaal', 'pytransitions').generate_code(
+        xml_file, tmp_path / 'second',
+    )
+    assert sorted(f.name for f in (cache_dir / 'mako').iterdir()) == modules
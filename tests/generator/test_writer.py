@@ -0,0 +1,28 @@
+from cosmic.generator.writer import write_if_changed
+
+
+def test_write_if_changed_creates_file(tmp_path):
+    target = tmp_path / 'agent.py'
+    assert write_if_changed(target, 'content\n')
+    assert target.read_text() == 'content\n'
+
+
+def test_write_if_changed_keeps_identical_file(tmp_path, mocker):
+    target = tmp_path / 'agent.py'
+    write_if_changed(target, 'content\n')
+    mtime = target.stat().st_mtime_ns
+    atomic_write = mocker.patch(
+        'cosmic.generator.writer.atomic_write_bytes',
+    )
+    assert not write_if_changed(target, 'content\n')
+    atomic_write.assert_not_called()
+    assert target.stat().st_mtime_ns == mtime
+
+
+def test_write_if_changed_replaces_changed_file(tmp_path):
+    target = tmp_path / 'agent.py'
+    write_if_changed(target, 'content\n')
+    assert write_if_changed(target, 'contents\n')
+    assert write_if_changed(target, 'Contents\n')
+    assert target.read_text() == 'Contents\n'
+    assert [f.name for f in tmp_path.iterdir()] == ['agent.py']
@@ -0,0 +1,314 @@
+import importlib.util
+import json
+import pytest
+import threading
+import time
+from array import array
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from types import SimpleNamespace
+from cosmic.adapter.entities.machine_template import (
+    MachineTemplate,
+    State,
+    Transition,
+)
+from cosmic.generator.code_generator import CodeGenerator
+from cosmic.runtime import fleet
+from cosmic.runtime.fleet import (
+    CHECKPOINT_VERSION,
+    FleetRunner,
+    get_shards,
+    load_checkpoint,
+    restore_state,
+)
+
+
+STATES = ('start', 'middle', 'finished')
+
+_modules = dict()
+
+
+def build_generated(path, agent_name, index):
+    """Builds an agent of a generated module. The modules are loaded once
+    per process, and inherited by the forked workers.
+    """
+    if path not in _modules:
+        spec = importlib.util.spec_from_file_location(
+            f'fleet_{agent_name.lower()}_{len(_modules)}',
+            path,
+        )
+        _modules[path] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_modules[path])
+    return getattr(_modules[path], agent_name)(SimpleNamespace())
+
+
+def generate(output_dir, agent_name, transitions, code_dialect='plain'):
+    """Generates an agent without callbacks, and returns its picklable
+    `build` function.
+    """
+    data = MachineTemplate(
+        initial_state='start',
+        states=[State(name=state) for state in STATES],
+        transitions=[
+            Transition(
+                trigger=f'{source}_to_{dest}',
+                source=source,
+                dest=dest,
+            )
+            for source, dest in transitions
+        ],
+    )
+    code_generator = CodeGenerator('uppaal', code_dialect, show_progress=False)
+    code_generator.write_agent(agent_name, data, output_dir)
+    return partial(
+        build_generated,
+        str(output_dir / f'{agent_name.lower()}.py'),
+        agent_name,
+    )
+
+
+def shared_slots(values):
+    """Creates a shared memory block holding the given fleet slots.
+    """
+    data = array('q', values).tobytes()
+    memory = SharedMemory(create=True, size=len(data))
+    memory.buf[:len(data)] = data
+    return memory
+
+
+@pytest.fixture
+def linear_build(tmp_path):
+    """Fixture to return the `build` of agents that go from `start` to
+    `finished` in two transitions.
+    """
+    return generate(
+        tmp_path,
+        'Linear',
+        [('start', 'middle'), ('middle', 'finished')],
+    )
+
+
+@pytest.fixture
+def cycle_build(tmp_path):
+    """Fixture to return the `build` of agents that cycle between `start`
+    and `middle` forever.
+    """
+    return generate(
+        tmp_path,
+        'Cycle',
+        [('start', 'middle'), ('middle', 'start')],
+    )
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """Fixture to set up the current process as a fleet worker.
+
+    Returns:
+        threading.Event: The worker stop event.
+    """
+    monkeypatch.setattr(fleet.signal, 'signal', lambda *args: None)
+    stop_event = threading.Event()
+    fleet._init_worker(stop_event)
+    yield stop_event
+    fleet._stop_event = None
+
+
+def test_get_shards():
+    assert get_shards(10, 3) == [(0, 4), (4, 7), (7, 10)]
+    assert get_shards(2, 8) == [(0, 1), (1, 2)]
+    assert get_shards(4, 1) == [(0, 4)]
+
+
+def test_restore_state(linear_build, tmp_path):
+    machine = linear_build(0)
+    restore_state(machine, 'finished')
+    assert machine.state == 'finished'
+    pytest.importorskip('transitions')
+    build = generate(
+        tmp_path,
+        'Graph',
+        [('start', 'middle')],
+        'pytransitions',
+    )
+    machine = build(0)
+    restore_state(machine, 'middle')
+    assert machine.state == 'middle'
+
+
+def test_run_shard_in_process(linear_build, worker):
+    agents = 3
+    memory = shared_slots([0, 0, 0, -1, 1, 2, 0])
+    slots = memory.buf.cast('q')
+    try:
+        fired = fleet._run_shard(
+            memory.name, agents, 0, 0, agents,
+            linear_build, restore_state, STATES, None, True,
+        )
+        assert fired == 3
+        assert slots.tolist() == [2, 1, 0, 2, 2, 2, 3]
+        # restored agents that cannot move keep waiting until stopped
+        fired = fleet._run_shard(
+            memory.name, agents, 0, 0, agents,
+            linear_build, restore_state, STATES, 2, False,
+        )
+        assert fired == 0
+        assert slots[-1] == 2
+    finally:
+        slots.release()
+        memory.close()
+        memory.unlink()
+
+
+def test_run_shard_stops_on_the_stop_event(cycle_build, worker):
+    worker.set()
+    memory = shared_slots([0, -1, 0])
+    slots = memory.buf.cast('q')
+    try:
+        fired = fleet._run_shard(
+            memory.name, 1, 0, 0, 1,
+            cycle_build, restore_state, STATES, None, False,
+        )
+        assert fired == 0
+        assert slots.tolist() == [0, 0, 0]
+    finally:
+        slots.release()
+        memory.close()
+        memory.unlink()
+
+
+def test_run_shard_rejects_asynchronous_machines(worker):
+    class AsyncMachine:
+        state = 'start'
+
+        async def next_state(self):
+            return False
+
+    memory = shared_slots([0, -1, 0])
+    slots = memory.buf.cast('q')
+    try:
+        with pytest.raises(TypeError):
+            fleet._run_shard(
+                memory.name, 1, 0, 0, 1,
+                lambda index: AsyncMachine(), restore_state, STATES,
+                None, True,
+            )
+    finally:
+        slots.release()
+        memory.close()
+        memory.unlink()
+
+
+def test_fleet_runner_runs_every_agent(linear_build, tmp_path):
+    checkpoint_path = tmp_path / 'fleet.json'
+    with FleetRunner(linear_build, 10, STATES, workers=3) as runner:
+        assert runner.shards == [(0, 4), (4, 7), (7, 10)]
+        summary = runner.run(
+            checkpoint_path=checkpoint_path,
+            checkpoint_every=60,
+        )
+        assert summary['fired'] == 20
+        assert summary['stopped'] is False
+        # two sweeps fire the transitions, and a third finds them idle
+        assert runner.sweeps() == [3, 3, 3]
+        assert summary['sweeps'] == 9
+        assert runner.counts() == {'start': 0, 'middle': 0, 'finished': 10}
+        assert runner.progress() == [2] * 10
+    assert load_checkpoint(checkpoint_path) == {
+        'version': CHECKPOINT_VERSION,
+        'states': ['finished'] * 10,
+        'progress': [2] * 10,
+    }
+
+
+def test_fleet_runner_all_cores(linear_build, mocker):
+    mocker.patch.object(fleet.os, 'cpu_count', return_value=None)
+    with FleetRunner(linear_build, 4, STATES) as runner:
+        assert runner.shards == [(0, 4)]
+
+
+def test_fleet_runner_stops_and_resumes(cycle_build):
+    with FleetRunner(cycle_build, 4, STATES, workers=2) as runner:
+        runner.start(until_idle=False)
+        while min(runner.sweeps()) == 0:
+            time.sleep(0.01)
+        runner.stop()
+        summary = runner.join()
+        assert summary['stopped'] is True
+        snapshot = runner.snapshot()
+        assert summary['fired'] == sum(snapshot['progress'])
+        summary = runner.run(max_sweeps=1, resume=snapshot)
+        assert summary['stopped'] is False
+        assert runner.progress() == [
+            progress + 1 for progress in snapshot['progress']
+        ]
+        assert runner.snapshot()['states'] == [
+            'middle' if state == 'start' else 'start'
+            for state in snapshot['states']
+        ]
+        # without a checkpoint, the agents start anew
+        runner.run(max_sweeps=1)
+        assert runner.counts() == {'start': 0, 'middle': 4, 'finished': 0}
+
+
+def test_fleet_runner_checkpoints_while_running(
+    linear_build,
+    tmp_path,
+    mocker,
+):
+    checkpoint_path = tmp_path / 'fleet.json'
+    with FleetRunner(linear_build, 2, STATES, workers=1) as runner:
+        mocker.patch.object(runner, '_wait', side_effect=[False, True])
+        checkpoint = mocker.spy(runner, 'checkpoint')
+        runner.run(checkpoint_path=checkpoint_path, checkpoint_every=0.1)
+        assert checkpoint.call_count == 2
+    assert load_checkpoint(checkpoint_path)['states'] == ['finished'] * 2
+
+
+def test_fleet_runner_stops_on_interruptions(cycle_build, tmp_path, mocker):
+    checkpoint_path = tmp_path / 'fleet.json'
+    with FleetRunner(cycle_build, 2, STATES, workers=1) as runner:
+        mocker.patch.object(runner, '_wait', side_effect=KeyboardInterrupt)
+        summary = runner.run(
+            until_idle=False,
+            checkpoint_path=checkpoint_path,
+            checkpoint_every=0.1,
+        )
+        assert summary['stopped'] is True
+        assert load_checkpoint(checkpoint_path) == runner.snapshot()
+
+
+def test_fleet_runner_state_errors(linear_build):
+    with FleetRunner(linear_build, 2, STATES, workers=1) as runner:
+        with pytest.raises(RuntimeError):
+            runner.join()
+        with pytest.raises(ValueError):
+            runner.start(resume={
+                'version': CHECKPOINT_VERSION,
+                'states': ['start'],
+                'progress': [0],
+            })
+        runner.start()
+        with pytest.raises(RuntimeError):
+            runner.start()
+
+
+def test_fleet_runner_close_stops_the_workers(cycle_build):
+    runner = FleetRunner(cycle_build, 2, STATES, workers=1)
+    runner.start(until_idle=False)
+    runner.close()
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=runner._memory.name)
+
+
+@pytest.mark.parametrize('content', [
+    [],
+    {'version': CHECKPOINT_VERSION + 1, 'states': [], 'progress': []},
+    {'version': CHECKPOINT_VERSION, 'states': ['start'], 'progress': []},
+    {'version': CHECKPOINT_VERSION, 'states': None, 'progress': []},
+])
+def test_load_checkpoint_raises_value_error(content, tmp_path):
+    checkpoint_path = tmp_path / 'fleet.json'
+    checkpoint_path.write_text(json.dumps(content))
+    with pytest.raises(ValueError):
+        load_checkpoint(checkpoint_path)
@@ -0,0 +1,78 @@
+import subprocess
+import sys
+
+from typer.testing import CliRunner
+
+from cosmic.main import app
+
+
+# cumulative import time of the cosmic entry point once typer is loaded, in
+# microseconds. Eagerly importing rich or the code generator costs an
+# order of magnitude more than this.
+IMPORT_TIME_BUDGET = 30_000
+HEAVY_MODULES = [
+    'rich',
+    'mako',
+    'num2words',
+    'xml.etree.ElementTree',
+    'cosmic.generator.code_generator',
+]
+
+
+def import_times(code: str) -> dict:
+    """Runs `code` in a fresh interpreter with `-X importtime`, returning
+    the cumulative import time of each module in microseconds.
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = dict()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line.split('|')
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def test_entry_point_import_time_budget():
+    times = import_times('import typer; import cosmic.main')
+    assert times['cosmic.main'] < IMPORT_TIME_BUDGET
+
+
+def test_entry_point_does_not_import_heavy_modules():
+    times = import_times('import cosmic.main')
+    assert [module for module in HEAVY_MODULES if module in times] == []
+
+
+def test_generate_requires_input_and_output():
+    result = CliRunner().invoke(app, ['--output', 'output'])
+    assert result.exit_code == 2
+    assert '--input' in result.output
+
+
+def test_batch(tmp_path):
+    result = CliRunner().invoke(
+        app,
+        ['batch', 'tests/mock_files', '--output', str(tmp_path)],
+    )
+    assert result.exit_code == 0
+    assert '2 file(s), 6 agent(s)' in result.output
+    assert (tmp_path / 'hcl_teste' / 'sector.py').exists()
+
+
+def test_batch_without_inputs(tmp_path):
+    result = CliRunner().invoke(
+        app,
+        ['batch', str(tmp_path / '*.xml'), '--output', str(tmp_path)],
+    )
+    assert result.exit_code == 1
+
+
+def test_version():
+    result = CliRunner().invoke(app, ['--version'])
+    assert result.exit_code == 0
+    assert 'COSMIC v0.1.0' in result.output
@@ -0,0 +1,75 @@
+import pytest
+import stat
+from pathlib import Path
+from cosmic.utils.file_oper import (
+    CACHE_DIR_ENV,
+    UMASK,
+    atomic_write_bytes,
+    user_cache_dir,
+)
+
+
+def test_user_cache_dir_from_environment(cache_dir):
+    assert user_cache_dir() == cache_dir
+
+
+@pytest.mark.parametrize(
+    'platform, environment, expected',
+    [
+        ('linux', {}, Path('home', '.cache', 'cosmic')),
+        ('linux', {'XDG_CACHE_HOME': 'xdg'}, Path('xdg', 'cosmic')),
+        ('darwin', {}, Path('home', 'Library', 'Caches', 'cosmic')),
+        ('win32', {}, Path('home', 'AppData', 'Local', 'cosmic')),
+        ('win32', {'LOCALAPPDATA': 'local'}, Path('local', 'cosmic')),
+    ],
+)
+def test_user_cache_dir_platform_defaults(
+    platform, environment, expected, monkeypatch, mocker,
+):
+    monkeypatch.delenv(CACHE_DIR_ENV)
+    for variable in ('XDG_CACHE_HOME', 'LOCALAPPDATA'):
+        monkeypatch.delenv(variable, raising=False)
+    for variable, value in environment.items():
+        monkeypatch.setenv(variable, value)
+    mocker.patch('cosmic.utils.file_oper.sys.platform', platform)
+    mocker.patch(
+        'cosmic.utils.file_oper.Path.home', return_value=Path('home'),
+    )
+    assert user_cache_dir() == expected
+
+
+def test_atomic_write_bytes(tmp_path):
+    target = tmp_path / 'file.txt'
+    atomic_write_bytes(target, b'first')
+    atomic_write_bytes(str(target), b'second')
+    assert target.read_bytes() == b'second'
+    assert [f.name for f in tmp_path.iterdir()] == ['file.txt']
+
+
+def test_atomic_write_bytes_keeps_previous_file_on_failure(
+    tmp_path, mocker,
+):
+    target = tmp_path / 'file.txt'
+    atomic_write_bytes(target, b'first')
+    mocker.patch(
+        'cosmic.utils.file_oper.os.replace',
+        side_effect=RuntimeError('interrupted'),
+    )
+    with pytest.raises(RuntimeError):
+        atomic_write_bytes(target, b'second')
+    assert target.read_bytes() == b'first'
+    assert [f.name for f in tmp_path.iterdir()] == ['file.txt']
+
+
+def test_atomic_write_bytes_uses_the_default_mode_for_new_files(tmp_path):
+    target = tmp_path / 'file.txt'
+    atomic_write_bytes(target, b'first')
+    assert stat.S_IMODE(target.stat().st_mode) == 0o666 & ~UMASK
+
+
+def test_atomic_write_bytes_keeps_the_mode_of_the_replaced_file(tmp_path):
+    target = tmp_path / 'file.txt'
+    atomic_write_bytes(target, b'first')
+    target.chmod(0o640)
+    atomic_write_bytes(target, b'second')
+    assert stat.S_IMODE(target.stat().st_mode) == 0o640
@@ -0,0 +1,103 @@
+import json
+import pytest
+import threading
+from cosmic.utils.profiler import (
+    PROFILE_VERSION,
+    Profiler,
+    profile_phase,
+)
+
+
+@pytest.fixture
+def profiler():
+    profiler = Profiler()
+    with profiler.phase('parse'):
+        with profiler.phase('parse_template', 'Sector'):
+            pass
+        with profiler.phase('parse_template', 'Robot'):
+            pass
+    profiler.record_agent(
+        'Sector', states=3, transitions=4, declared_functions=2,
+    )
+    return profiler
+
+
+def test_phase_records_events_in_finishing_order(profiler):
+    assert [event['name'] for event in profiler.events] == [
+        'parse_template', 'parse_template', 'parse',
+    ]
+    template, _, parse = profiler.events
+    assert template['agent'] == 'Sector'
+    assert 'agent' not in parse
+    assert parse['start'] <= template['start']
+    assert parse['wall'] >= template['wall'] >= 0
+    assert template['cpu'] >= 0
+
+
+def test_phase_is_recorded_when_the_code_raises():
+    profiler = Profiler()
+    with pytest.raises(RuntimeError):
+        with profiler.phase('write', 'Sector'):
+            raise RuntimeError('disk full')
+    assert [event['name'] for event in profiler.events] == ['write']
+
+
+def test_to_dict_totals_phases_and_agents(profiler):
+    profile = profiler.to_dict()
+    assert profile['version'] == PROFILE_VERSION
+    assert profile['phases']['parse_template']['count'] == 2
+    assert profile['phases']['parse']['count'] == 1
+    assert profile['agents']['Sector']['states'] == 3
+    assert profile['agents']['Sector']['transitions'] == 4
+    assert profile['agents']['Sector']['declared_functions'] == 2
+    assert list(profile['agents']['Sector']['phases']) == ['parse_template']
+    # agents without recorded sizes still get their phases
+    assert profile['agents']['Robot']['states'] == 0
+    assert profile['agents']['Robot']['phases']['parse_template'][
+        'count'
+    ] == 1
+    assert profile['wall'] >= profile['phases']['parse']['wall']
+
+
+def test_to_chrome_trace_names_threads(profiler):
+    worker = threading.Thread(target=_run_phase, args=(profiler,))
+    worker.start()
+    worker.join()
+
+    trace = profiler.to_chrome_trace()
+    complete = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+    metadata = [e for e in trace['traceEvents'] if e['ph'] == 'M']
+    assert len(complete) == len(profiler.events)
+    assert complete[0]['name'] == 'parse_template Sector'
+    assert complete[0]['cat'] == 'parse_template'
+    assert complete[0]['args']['agent'] == 'Sector'
+    assert complete[0]['dur'] >= 0
+    assert {e['tid'] for e in complete} == {0, 1}
+    assert sorted(e['args']['name'] for e in metadata) == [
+        'main', 'worker 1',
+    ]
+
+
+def _run_phase(profiler):
+    with profiler.phase('write', 'Sector'):
+        pass
+
+
+def test_save_writes_profile_and_trace(profiler, tmp_path):
+    path = tmp_path / 'profiles' / 'run.json'
+    trace_path = profiler.save(path)
+    assert trace_path == tmp_path / 'profiles' / 'run.trace.json'
+    assert json.loads(path.read_text())['phases']['parse']['count'] == 1
+    assert 'traceEvents' in json.loads(trace_path.read_text())
+
+
+def test_profile_phase_without_profiler():
+    with profile_phase(None, 'parse'):
+        pass
+
+
+def test_profile_phase_with_profiler():
+    profiler = Profiler()
+    with profile_phase(profiler, 'render', 'Sector'):
+        pass
+    assert profiler.events[0]['agent'] == 'Sector'
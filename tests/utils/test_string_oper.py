@@ -1,7 +1,9 @@
 import pytest
 from cosmic.utils.string_oper import (
+    NUMBER_WORDS_LIMIT,
     to_snake_case,
     generate_function_name,
+    number_to_words,
 )
 
 
@@ -43,8 +45,33 @@ def test_to_snake_case(name, expected):
             "upsala_gte_two_hundred_and_fifty_six",
         ),
         ("aalborg++", "aalborg_increment"),
+        ("aalborg = 1", "aalborg_assign_one"),
+        ("aalborg += upsala * 2", "aalborg_increase_upsala_times_two"),
         ("aalborg--", "aalborg_decrement"),
     ],
 )
 def test_generate_function_name(condition, expected):
     assert generate_function_name(condition) == expected
+
+
+@pytest.mark.parametrize(
+    "number, expected",
+    [
+        ("0", "zero"),
+        ("7", "seven"),
+        ("42", "forty_two"),
+        (str(NUMBER_WORDS_LIMIT), "one_hundred"),
+        ("256", "two_hundred_and_fifty_six"),
+    ],
+)
+def test_number_to_words(number, expected):
+    assert number_to_words(number) == expected
+
+
+def test_to_snake_case_is_cached():
+    to_snake_case.cache_clear()
+    for _ in range(5):
+        to_snake_case("RobotAssembler")
+    info = to_snake_case.cache_info()
+    assert info.misses == 1
+    assert info.hits == 4